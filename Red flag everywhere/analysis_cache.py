@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+analysis_cache.py
+
+analyze_blobs 的增量分析缓存。
+
+每个批次文件解析后的列（id / height / time / 局部 signer_code 及 size / fee / gas 等，
+以及非整数 id 的局部编码表 id_names）和文件级摘要
+（记录数、最早/最晚时间）存成缓存目录下的一个 npz，索引 index.json 以文件的
+绝对路径为键，记录 size、mtime_ns 和内容哈希：
+- size 与 mtime 都没变：直接命中
+- 变了但内容哈希相同（例如被 touch）：命中并刷新 mtime
+- 否则重新解析并覆盖缓存
+源文件已不存在的缓存条目会被清除。
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# (列式块, 局部 signer 编码表)，与 analyze_blobs._load_file_chunk 的返回值一致
+Chunk = Tuple[Dict[str, np.ndarray], List[str]]
+
+_ROW_COLUMNS = ("id", "height", "time", "signer_code", "size", "fee", "gas_used", "gas_wanted", "position")
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """文件内容的 blake2b 摘要"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    """以批次文件指纹为键的解析结果缓存"""
+
+    VERSION = 3
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.files: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == self.VERSION:
+                self.files = index.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+        # 本次运行的统计
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    # ------------------------------ 条目 ------------------------------
+
+    @staticmethod
+    def _key(fp: str) -> str:
+        return os.path.abspath(fp)
+
+    def _entry_path(self, key: str) -> str:
+        name = hashlib.blake2b(key.encode("utf-8"), digest_size=10).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.npz")
+
+    def lookup(self, fp: str) -> Optional[Dict[str, Any]]:
+        """返回仍然有效的缓存条目；文件已改变或未缓存时返回None"""
+        key = self._key(fp)
+        entry = self.files.get(key)
+        if entry is None or not os.path.exists(self._entry_path(key)):
+            return None
+        try:
+            st = os.stat(fp)
+        except OSError:
+            return None
+        if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry
+        if entry["size"] == st.st_size and entry["sha"] == hash_file(fp):
+            entry["mtime_ns"] = st.st_mtime_ns
+            return entry
+        return None
+
+    def _load_entry(self, fp: str) -> Chunk:
+        with np.load(self._entry_path(self._key(fp)), allow_pickle=False) as z:
+            chunk = {c: z[c] for c in _ROW_COLUMNS}
+            if "id_names" in z.files:
+                chunk["id_names"] = z["id_names"].tolist()
+            signers = z["signers"].tolist()
+        return chunk, signers
+
+    def store(self, fp: str, chunk: Dict[str, np.ndarray], signers: List[str]):
+        key = self._key(fp)
+        st = os.stat(fp)
+        path = self._entry_path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            extra = {"id_names": np.array(chunk["id_names"], dtype=str)} if chunk.get("id_names") else {}
+            np.savez(f, signers=np.array(signers, dtype=str), **extra, **{c: chunk[c] for c in _ROW_COLUMNS})
+        os.replace(tmp, path)
+
+        t = chunk["time"]
+        self.files[key] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha": hash_file(fp),
+            # 文件级摘要，流式分析用它来排定文件顺序
+            "count": int(t.size),
+            "min_time": int(t.min()) if t.size else None,
+            "max_time": int(t.max()) if t.size else None,
+        }
+
+    def time_range(self, fp: str) -> Optional[Tuple[int, int]]:
+        entry = self.lookup(fp)
+        if entry is None or entry["min_time"] is None:
+            return None
+        return entry["min_time"], entry["max_time"]
+
+    # ------------------------------ 批量接口 ------------------------------
+
+    def get_chunks(self, files: List[str],
+                   parse_many: Callable[[List[str]], List[Optional[Chunk]]]) -> List[Optional[Chunk]]:
+        """
+        按 files 的顺序返回每个文件的解析结果：命中的从缓存读取，
+        其余交给 parse_many 一次性解析（可以是进程池）并写入缓存。
+        """
+        results: List[Optional[Chunk]] = [None] * len(files)
+        missing: List[int] = []
+        for i, fp in enumerate(files):
+            if self.lookup(fp) is not None:
+                try:
+                    results[i] = self._load_entry(fp)
+                    self.hits += 1
+                    continue
+                except (OSError, ValueError, KeyError):
+                    pass
+            missing.append(i)
+
+        if missing:
+            parsed = parse_many([files[i] for i in missing])
+            for i, res in zip(missing, parsed):
+                results[i] = res
+                self.misses += 1
+                if res is not None:
+                    self.store(files[i], *res)
+        return results
+
+    def evict_missing(self):
+        """清除源文件已被删除的条目"""
+        for key in [k for k in self.files if not os.path.exists(k)]:
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            del self.files[key]
+            self.evicted += 1
+
+    def save(self):
+        """原子写入索引"""
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "files": self.files}, f)
+        os.replace(tmp, self.index_path)
+
+    def summary(self) -> str:
+        return f"cache: {self.hits} hit, {self.misses} parsed, {self.evicted} evicted"
@@ -7,41 +7,71 @@ analyze_blobs.py
 - 可从两种来源读取数据：
   1) 单个 result.json（含 {"blobs": [...]}）
   2) data/ 目录下的 blob_batch_*.json（自动遍历并解析混合 JSON/NDJSON）
+     或下载器列式输出的 blob_batch_*.npz（只读取需要的列）
+     或下载器追加写的 gzip NDJSON 分段 blob_batch_*.ndjson.gz
+  3) 下载器维护的 SQLite 索引（--index_db，见 blob_index.py）
 - 计算相邻 blob 发布间隔，并输出：
   - 时间线图（随时间的间隔，标出异常点，左上角摘要框）
+  - 可缩放的交互式时间线 gaps_interactive.html（默认不生成，用 --only 点名 pyramid）：
+    按分钟 / 小时 / 天预聚合的间隔金字塔（gap_pyramid.npz，见 gap_pyramid.py），
+    浏览器按缩放级别选层，不需要逐点数据
   - 直方图（间隔分布）
   - Markdown 报告（含统计与“显著间隔”表）
   - 证明列表 CSV（逐条间隔复核）
+  - 吞吐与费用汇总（默认不生成，用 --only 点名 rollups）：按小时 / 天 / signer 的 blob 数、
+    字节数、fee、gas 效率与大小分位数（rollup_*.csv 与报告小节）
 - 异常判定默认为 mean + 2*std（与示例一致），可通过参数调整
-- 使用 Matplotlib 非交互后端 Agg，避免 Windows/命令行卡住
+- 使用 Matplotlib 非交互后端 Agg，避免 Windows/命令行卡住；matplotlib 只在画图时才导入，
+  导入本模块（作为库使用）没有副作用
+- 子命令 stats / report / csv / plot 只做对应的部分；不带子命令时生成默认输出
 
 用法：
   python analyze_blobs.py                      # 默认从 ./result.json 读取，否则退回 ./data/*.json
+  python analyze_blobs.py stats --data_dir data --json     # 只打印统计（不导入 matplotlib，适合定时任务）
+  python analyze_blobs.py report --data_dir data           # 只生成报告；csv / plot 同理
   python analyze_blobs.py --result_json my.json
   python analyze_blobs.py --data_dir data --out_dir output --std_k 2.5
+  python analyze_blobs.py --data_dir data --stream           # 单遍流式分析，常数内存
+  python analyze_blobs.py --data_dir data --cache_dir output/.cache   # 增量：只解析新增/改动的文件
+  python analyze_blobs.py --data_dir data --group_by signer            # 按 signer 分组分析
+  python analyze_blobs.py --data_dir data --detector mad,changepoint   # 稳健 / 变点检测器
+  python analyze_blobs.py --data_dir data --fast_plot --dpi 150        # 大数据量快速出图
+  python analyze_blobs.py --data_dir data --only report,csv           # 只生成报告与 CSV
+  python analyze_blobs.py --data_dir data --only report,pyramid       # 报告 + 可缩放的交互式时间线
+  python analyze_blobs.py --data_dir data --only report,rollups       # 报告 + 吞吐与费用汇总
+  python analyze_blobs.py --namespace_dir ecl3=data/ecl3 --namespace_dir foo=data/foo --group_by namespace
+  python analyze_blobs.py --index_db blobs.sqlite --group_by signer     # 从 SQLite 索引读取
+  python analyze_blobs.py --data_dir data --metrics_file output/metrics.prom --profile output/profile
 
 依赖：numpy、matplotlib
 """
 
 import argparse
+import contextlib
 import csv
 import glob
 import json
 import math
 import os
+import re
 import sys
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 
-# —— 关键：非交互式后端，防止命令行环境卡住（必须在导入 pyplot 之前设置）
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-plt.ioff()
-import matplotlib.dates as mdates
+import blob_store
+from blob_index import BlobIndex
+from analysis_cache import AnalysisCache
+from detectors import DETECTORS, run_detectors
+from gap_pyramid import write_gap_viewer
+from grouped_gaps import group_outliers, grouped_gap_stats
+from metrics import MetricsRegistry, StageMetrics, profiled
+from rollups import DAY_NS, HOUR_NS, ROLLUP_COLUMNS, rollup, size_order, time_rollup
+from stream_stats import GapSketch, RunningStats, TopK
 
 
 # ============================== 数据结构 ==============================
@@ -52,6 +82,113 @@ class BlobRecord:
     time: datetime   # 统一为“UTC 无时区（naive）时间”，便于画图
     height: int
     signer: str
+    # 吞吐与费用字段（缺失为 -1）
+    size: int = -1
+    fee: int = -1          # utia
+    gas_used: int = -1
+    gas_wanted: int = -1
+    position: int = -1     # blob 在交易中的位置（tx.position）
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(eq=False)
+class BlobTable:
+    """
+    列式 blob 表（struct-of-arrays），分析流程中替代 List[BlobRecord]：
+    - id / height / time(UTC epoch 纳秒) : int64
+    - signer_code : int32，signers[signer_code] 为原始 signer 地址（字典编码）
+    - signers     : 编码表（按首次出现顺序）
+    - id_names    : 非整数 id（如 commitment 字符串）的编码表；这类 id 在 id 列中记为 -2 - 编码，
+                    缺失的 id 为 -1。id_labels() 还原为原始 id
+    - size / fee / gas_used / gas_wanted / position : int64，缺失为 -1（用于吞吐与费用汇总）
+
+    每条 68 字节（其中间隔分析用到的 4 列共 28 字节），而 BlobRecord 每条需要数百字节的对象开销。
+    """
+    id: np.ndarray
+    height: np.ndarray
+    time: np.ndarray
+    signer_code: np.ndarray
+    signers: np.ndarray
+    size: np.ndarray
+    fee: np.ndarray
+    gas_used: np.ndarray
+    gas_wanted: np.ndarray
+    position: np.ndarray
+    id_names: np.ndarray = field(default_factory=lambda: np.array([], dtype=object))
+
+    METRIC_COLUMNS = ("size", "fee", "gas_used", "gas_wanted", "position")
+    ROW_COLUMNS = ("id", "height", "time", "signer_code") + METRIC_COLUMNS
+
+    def __len__(self) -> int:
+        return int(self.id.size)
+
+    def __getitem__(self, i: int) -> BlobRecord:
+        """按下标取出一条 BlobRecord（兼容旧代码的逐条访问）"""
+        return BlobRecord(id=self.id_labels(slice(i, i + 1))[0],
+                          time=_EPOCH + timedelta(microseconds=int(self.time[i]) // 1000),
+                          height=int(self.height[i]),
+                          signer=str(self.signers[self.signer_code[i]]),
+                          **{c: int(getattr(self, c)[i]) for c in self.METRIC_COLUMNS})
+
+    @classmethod
+    def empty(cls) -> "BlobTable":
+        return cls(signers=np.array([], dtype=object),
+                   **{c: np.array([], dtype=dtype) for c, dtype in _COLUMN_DTYPES.items()})
+
+    @classmethod
+    def from_records(cls, records: List[BlobRecord]) -> "BlobTable":
+        signer_index: Dict[str, int] = {}
+        return _merge_chunks([_records_chunk(records, signer_index)], signer_index)
+
+    def to_records(self) -> List[BlobRecord]:
+        return [self[i] for i in range(len(self))]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """time 列的 datetime64[ns] 视图（不复制）"""
+        return self.time.view("datetime64[ns]")
+
+    def signer_names(self) -> np.ndarray:
+        """逐行的 signer 地址（object 数组）"""
+        if not len(self.signers):
+            return np.full(len(self), "", dtype=object)
+        return self.signers[self.signer_code]
+
+    def id_labels(self, idx=slice(None)) -> np.ndarray:
+        """逐行的原始 id（object 数组）：整数 id 原样，非整数 id 从 id_names 取回，缺失为 None"""
+        ids = self.id[idx]
+        out = ids.astype(object)
+        named = ids <= -2
+        if named.any():
+            out[named] = self.id_names[-2 - ids[named]]
+        out[ids == -1] = None
+        return out
+
+    def take(self, idx: np.ndarray) -> "BlobTable":
+        return BlobTable(signers=self.signers, id_names=self.id_names,
+                         **{c: getattr(self, c)[idx] for c in self.ROW_COLUMNS})
+
+    def sorted_by_time(self) -> "BlobTable":
+        """按 (time, height) 排序（np.lexsort，稳定）"""
+        return self.take(np.lexsort((self.height, self.time)))
+
+    @property
+    def nbytes(self) -> int:
+        """数组本身占用的字节数（含 signer 编码表）"""
+        return (sum(getattr(self, c).nbytes for c in self.ROW_COLUMNS)
+                + sum(sys.getsizeof(x) for x in self.signers) + self.signers.nbytes)
+
+
+# 各行列的 dtype（空表与合并时使用）
+_COLUMN_DTYPES = {"id": np.int64, "height": np.int64, "time": np.int64, "signer_code": np.int32,
+                  **{c: np.int64 for c in BlobTable.METRIC_COLUMNS}}
+
+
+def as_blob_table(records) -> BlobTable:
+    """BlobTable 原样返回；List[BlobRecord] 转为 BlobTable"""
+    return records if isinstance(records, BlobTable) else BlobTable.from_records(records)
 
 
 # ============================== 解析工具 ==============================
@@ -139,9 +276,16 @@ def json_fragments_to_list(text: str) -> List[Dict[str, Any]]:
     return out
 
 
+def _int_or(v, default=-1) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return default
+
+
 def normalize_record(raw: Dict[str, Any]) -> BlobRecord:
     """
-    统一提取 id、time、height、signer。
+    统一提取 id、time、height、signer，以及 size 与 tx 的 fee / gas_used / gas_wanted / position。
     time 优先 'time'，回退 'tx.time'。转换为 UTC-naive。
     """
     blob_id = coalesce(raw, ["id", "tx.id", "commitment", "tx.hash"])
@@ -159,12 +303,17 @@ def normalize_record(raw: Dict[str, Any]) -> BlobRecord:
         height = -1
 
     signer = coalesce(raw, ["signer.hash", "signer.address", "signer"], "")
-    return BlobRecord(id=blob_id, time=dt, height=height, signer=str(signer))
+    return BlobRecord(id=blob_id, time=dt, height=height, signer=str(signer),
+                      size=_int_or(coalesce(raw, ["size"])),
+                      fee=_int_or(coalesce(raw, ["tx.fee", "fee"])),
+                      gas_used=_int_or(coalesce(raw, ["tx.gas_used", "gas_used"])),
+                      gas_wanted=_int_or(coalesce(raw, ["tx.gas_wanted", "gas_wanted"])),
+                      position=_int_or(coalesce(raw, ["tx.position", "position"])))
 
 
 # ============================== 数据加载 ==============================
 
-def load_from_result_json(path: str) -> List[BlobRecord]:
+def load_from_result_json(path: str) -> BlobTable:
     blobs_raw: List[Dict[str, Any]] = []
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -178,7 +327,7 @@ def load_from_result_json(path: str) -> List[BlobRecord]:
             blobs_raw = data.get("items", []) if isinstance(data, dict) else blobs_raw
     except Exception as e:
         print(f"[WARN] 打开 {path} 失败：{e}", file=sys.stderr)
-        return []
+        return BlobTable.empty()
 
     out: List[BlobRecord] = []
     for o in blobs_raw:
@@ -186,59 +335,310 @@ def load_from_result_json(path: str) -> List[BlobRecord]:
             out.append(normalize_record(o))
         except Exception as e:
             print(f"[WARN] 跳过1条记录（{e}）", file=sys.stderr)
-    return out
+    return BlobTable.from_records(out)
 
 
-def load_from_data_dir(data_dir: str) -> List[BlobRecord]:
-    pattern = os.path.join(data_dir, "blob_batch_*.json")
-    files = sorted(glob.glob(pattern))
-    if not files:
-        print(f"[WARN] 未在 {data_dir} 找到 blob_batch_*.json", file=sys.stderr)
-    out: List[BlobRecord] = []
-    for fp in files:
+def load_from_segments(data_dir: str) -> BlobTable:
+    """
+    读取下载器写出的列式分段 blob_batch_*.npz，只解压分析需要的 4 列。
+    """
+    return _merge_file_chunks([_load_file_chunk(fp) for fp in blob_store.list_segments(data_dir)])
+
+
+# ============================== 快速加载（列式） ==============================
+#
+# 单个文件解析为一个“块”：BlobTable.ROW_COLUMNS 各列的 dict，
+# 多个块由 _merge_chunks 按文件顺序拼成 BlobTable。
+
+def _encode_signers(signers: List[str], signer_index: Dict[str, int]) -> np.ndarray:
+    """把 signer 字符串编码为整数，signer_index 在所有文件间共享"""
+    return np.fromiter((signer_index.setdefault(s, len(signer_index)) for s in signers),
+                       dtype=np.int32, count=len(signers))
+
+
+def parse_batch_strict(text: str, signer_index: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """
+    严格解析下载器原样写出的批次文件：一个 JSON 数组，每条记录都有
+    id / height / time / signer.hash / size 与 tx.fee / gas_used / gas_wanted / position。
+    不做 coalesce 回退，结构不符直接抛异常，由调用方改走 json_fragments_to_list 容错路径。
+    """
+    data = json.loads(text)
+    if not isinstance(data, list):
+        raise ValueError("batch file is not a JSON array")
+    n = len(data)
+    txs = [b["tx"] for b in data]
+    return {
+        "id": np.fromiter((b["id"] for b in data), dtype=np.int64, count=n),
+        "height": np.fromiter((b["height"] for b in data), dtype=np.int64, count=n),
+        "time": blob_store.iso_to_ns([b["time"] for b in data]),
+        "signer_code": _encode_signers([b["signer"]["hash"] for b in data], signer_index),
+        "size": np.fromiter((b["size"] for b in data), dtype=np.int64, count=n),
+        # fee 在 API 中是字符串
+        "fee": np.array([tx["fee"] for tx in txs]).astype(np.int64),
+        "gas_used": np.fromiter((tx["gas_used"] for tx in txs), dtype=np.int64, count=n),
+        "gas_wanted": np.fromiter((tx["gas_wanted"] for tx in txs), dtype=np.int64, count=n),
+        "position": np.fromiter((tx["position"] for tx in txs), dtype=np.int64, count=n),
+    }
+
+
+def _parse_batch_tolerant(fp: str, text: str, signer_index: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """容错路径：json_fragments_to_list + normalize_record，非整数 id 放入块的 id_names"""
+    recs: List[BlobRecord] = []
+    for obj in json_fragments_to_list(text):
         try:
-            with open(fp, "r", encoding="utf-8") as f:
-                text = f.read()
-            for obj in json_fragments_to_list(text):
-                try:
-                    out.append(normalize_record(obj))
-                except Exception as e:
-                    print(f"[WARN] 跳过无效记录（{fp}）：{e}", file=sys.stderr)
+            recs.append(normalize_record(obj))
+        except Exception as e:
+            print(f"[WARN] 跳过无效记录（{fp}）：{e}", file=sys.stderr)
+    return _records_chunk(recs, signer_index)
+
+
+def _encode_ids(values: List[Any]) -> Tuple[np.ndarray, List[str]]:
+    """
+    id 列编码：整数（或整数字符串）原样，缺失为 -1，其余（如 commitment）按首次出现
+    编码为 -2 - k，返回 (id 列, 块内的非整数 id 表)
+    """
+    names: Dict[str, int] = {}
+    ids = np.empty(len(values), dtype=np.int64)
+    for i, v in enumerate(values):
+        n = _int_or(v, None)
+        if n is not None:
+            ids[i] = n
+        elif v is None:
+            ids[i] = -1
+        else:
+            ids[i] = -2 - names.setdefault(str(v), len(names))
+    return ids, list(names)
+
+
+def _remap_ids(chunk: Dict[str, Any], id_index: Dict[str, int]) -> Dict[str, Any]:
+    """块内的非整数 id 编码 -> 全局编码（id_index 在合并的各块之间共享）"""
+    names = chunk.pop("id_names", None)
+    if names is not None and len(names):
+        remap = _encode_signers(list(names), id_index)
+        ids = chunk["id"].copy()
+        named = ids <= -2
+        ids[named] = -2 - remap[-2 - ids[named]]
+        chunk["id"] = ids
+    return chunk
+
+
+def _id_table(id_index: Dict[str, int]) -> np.ndarray:
+    names = np.empty(len(id_index), dtype=object)
+    names[:] = list(id_index)
+    return names
+
+
+def _records_chunk(recs: List[BlobRecord], signer_index: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """BlobRecord 列表 -> 列式块（非整数 id 见 _encode_ids）"""
+    ids, id_names = _encode_ids([r.id for r in recs])
+    return {
+        "id": ids,
+        "id_names": id_names,
+        "height": np.array([r.height for r in recs], dtype=np.int64),
+        "time": np.array([(r.time - _EPOCH) // timedelta(microseconds=1) * 1000 for r in recs], dtype=np.int64),
+        "signer_code": _encode_signers([r.signer for r in recs], signer_index),
+        **{c: np.array([getattr(r, c) for r in recs], dtype=np.int64) for c in BlobTable.METRIC_COLUMNS},
+    }
+
+
+def _merge_chunks(chunks: List[Dict[str, np.ndarray]], signer_index: Dict[str, int]) -> BlobTable:
+    id_index: Dict[str, int] = {}
+    chunks = [_remap_ids(dict(c), id_index) for c in chunks]
+    out: Dict[str, np.ndarray] = {}
+    for key, dtype in _COLUMN_DTYPES.items():
+        parts = [c[key] for c in chunks]
+        out[key] = np.concatenate(parts) if parts else np.array([], dtype=dtype)
+    signers = np.empty(len(signer_index), dtype=object)
+    signers[:] = list(signer_index)
+    return BlobTable(signers=signers, id_names=_id_table(id_index), **out)
+
+
+def _load_file_chunk(fp: str) -> Optional[Tuple[Dict[str, np.ndarray], List[str]]]:
+    """
+    解析单个批次文件（JSON、npz 分段或 NDJSON 分段），返回 (列式块, 本文件的 signer 编码表)。
+    signer_code 是文件内的局部编码，由调用方按文件顺序重映射到全局编码；
+    串行与进程池两种模式都走这里，保证结果完全一致。
+    """
+    local_index: Dict[str, int] = {}
+    if fp.endswith(".npz"):
+        try:
+            seg = blob_store.load_segment(fp, ["id", "time", "height", "signer", *BlobTable.METRIC_COLUMNS])
         except Exception as e:
             print(f"[WARN] 读取失败 {fp}：{e}", file=sys.stderr)
-    return out
+            return None
+        missing = np.full(seg["id"].size, -1, dtype=np.int64)   # 旧分段没有 position 列
+        chunk = {
+            "id": seg["id"],
+            "height": seg["height"],
+            "time": seg["time"],
+            "signer_code": _encode_signers([x.decode("utf-8") for x in seg["signer"]], local_index),
+            **{c: seg.get(c, missing) for c in BlobTable.METRIC_COLUMNS},
+        }
+        return chunk, list(local_index)
+
+    try:
+        if fp.endswith(".ndjson.gz"):
+            # 拼成一个 JSON 数组，同样走一次 json.loads 的快速路径
+            text = "[" + ",".join(blob_store.read_ndjson_lines(fp)) + "]"
+        else:
+            with open(fp, "r", encoding="utf-8") as f:
+                text = f.read()
+    except Exception as e:
+        print(f"[WARN] 读取失败 {fp}：{e}", file=sys.stderr)
+        return None
+    try:
+        chunk = parse_batch_strict(text, local_index)
+    except (ValueError, KeyError, TypeError):
+        local_index.clear()
+        chunk = _parse_batch_tolerant(fp, text, local_index)
+    return chunk, list(local_index)
+
+
+def _parse_files(files: List[str], workers: int = 1) -> List[Optional[Tuple[Dict[str, np.ndarray], List[str]]]]:
+    """按文件顺序解析；workers > 1 时用进程池"""
+    if workers > 1 and len(files) > 1:
+        chunksize = max(1, len(files) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(_load_file_chunk, files, chunksize=chunksize))
+    return [_load_file_chunk(fp) for fp in files]
+
+
+def load_from_data_dir(data_dir: str, workers: int = 1,
+                       cache: Optional[AnalysisCache] = None) -> BlobTable:
+    """
+    读取 data_dir 下的全部批次文件（JSON 与 npz 分段），直接得到 BlobTable。
+    每个 JSON 文件先走 parse_batch_strict；解析失败的文件才回退到容错路径。
+    workers > 1 时用进程池并行解析文件，按文件顺序合并，结果与串行相同。
+    给定 cache 时只解析新增或改动过的文件，其余直接读缓存的列。
+    """
+    files = list_batch_files(data_dir)
+
+    if cache is None:
+        return _merge_file_chunks(_parse_files(files, workers))
+    results = cache.get_chunks(files, lambda missing: _parse_files(missing, workers))
+    cache.evict_missing()
+    cache.save()
+    return _merge_file_chunks(results)
+
+
+def list_batch_files(data_dir: str) -> List[str]:
+    """data_dir 下的批次文件：npz 分段、NDJSON 分段（按序号）在前，JSON 文件（按文件名）在后"""
+    files = (blob_store.list_segments(data_dir) + blob_store.list_ndjson_segments(data_dir)
+             + sorted(glob.glob(os.path.join(data_dir, "blob_batch_*.json"))))
+    if not files:
+        print(f"[WARN] 未在 {data_dir} 找到 blob_batch_*.json / *.npz / *.ndjson.gz", file=sys.stderr)
+    return files
+
+
+def _remap_signers(chunk: Dict[str, np.ndarray], local_signers: List[str],
+                   signer_index: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """局部 signer 编码 -> 全局编码（按处理顺序首次出现）"""
+    remap = _encode_signers(local_signers, signer_index)
+    if remap.size:
+        chunk["signer_code"] = remap[chunk["signer_code"]]
+    return chunk
+
+
+def _merge_file_chunks(results: List[Optional[Tuple[Dict[str, np.ndarray], List[str]]]]) -> BlobTable:
+    signer_index: Dict[str, int] = {}
+    chunks = [_remap_signers(chunk, local, signer_index) for chunk, local in filter(None, results)]
+    return _merge_chunks(chunks, signer_index)
 
 
-def load_blobs_auto(result_json: str, data_dir: str) -> List[BlobRecord]:
+def load_blobs_auto(result_json: str, data_dir: str, workers: int = 1,
+                    cache: Optional[AnalysisCache] = None) -> BlobTable:
     if result_json and os.path.exists(result_json):
         recs = load_from_result_json(result_json)
-        if recs:
+        if len(recs):
             return recs
     # 回退 data_dir
-    return load_from_data_dir(data_dir)
+    return load_from_data_dir(data_dir, workers=workers, cache=cache)
+
+
+def load_namespace_dirs(specs: List[str], workers: int = 1,
+                        cache: Optional[AnalysisCache] = None) -> Tuple[BlobTable, np.ndarray, List[str]]:
+    """
+    读取多个 namespace 各自的数据目录并合并
+
+    Args:
+        specs: ["名称=目录", ...]；省略名称时用目录名
+
+    Returns:
+        (合并后的 BlobTable, 逐行 namespace 编码, namespace 名称表)
+    """
+    names: List[str] = []
+    tables: List[BlobTable] = []
+    for spec in specs:
+        name, sep, d = spec.partition("=")
+        if not sep:
+            d, name = name, os.path.basename(os.path.normpath(name))
+        names.append(name)
+        tables.append(load_from_data_dir(d, workers=workers, cache=cache))
+
+    signer_index: Dict[str, int] = {}
+    chunks = [_remap_signers({"id_names": t.id_names, **{c: getattr(t, c) for c in BlobTable.ROW_COLUMNS}},
+                             list(t.signers), signer_index)
+              for t in tables]
+    ns_codes = np.repeat(np.arange(len(tables), dtype=np.int32), [len(t) for t in tables])
+    return _merge_chunks(chunks, signer_index), ns_codes, names
+
+
+def load_from_index(path: str) -> Tuple[BlobTable, np.ndarray, List[str]]:
+    """
+    从 SQLite 索引读取（已按时间排序）
+
+    Returns:
+        (BlobTable, 逐行 namespace 编码, namespace 名称表)，与 load_namespace_dirs 一致
+    """
+    with BlobIndex(path) as index:
+        cols = index.load_columns()
+    signers = np.empty(len(cols["signers"]), dtype=object)
+    signers[:] = cols["signers"]
+    table = BlobTable(signers=signers, **{c: cols[c] for c in BlobTable.ROW_COLUMNS})
+    return table, cols["namespace_code"], cols["namespaces"]
+
+
+def unique_rows(table: BlobTable) -> np.ndarray:
+    """
+    按 id 去重：返回保留行的下标（升序，重复时保留首次出现）。
+    按 offset 分页的实时降序接口会在相邻批次间产生重复 blob，不去重会得到 0 秒的假间隔。
+    非整数 id 按编码（即按原始字符串）去重；id 缺失（-1）的行全部保留。排序去重，千万级记录也只需一次 np.unique。
+    """
+    _, first = np.unique(table.id, return_index=True)
+    keep = np.zeros(len(table), dtype=bool)
+    keep[first] = True
+    keep |= table.id == -1
+    return np.flatnonzero(keep)
 
 
 # ============================== 统计与检测 ==============================
 
-def compute_gaps(records: List[BlobRecord]) -> Tuple[List[float], List[datetime]]:
+def parse_timestamps_ns(values: List[str]) -> np.ndarray:
     """
-    返回：gaps_seconds（list[float]），timestamps_sorted（list[datetime]）
-    gaps[i] = timestamps[i] 与 timestamps[i-1] 的差（秒），对应于 timestamps[i]
+    批量解析 ISO8601 时间为 datetime64[ns]（UTC-naive），逐条版本见 parse_timestamp_to_utc_naive。
     """
-    if not records:
-        return [], []
-    recs = sorted(records, key=lambda r: (r.time, r.height))
-    ts = [r.time for r in recs]
-    if len(ts) < 2:
-        return [], ts
+    return blob_store.iso_to_ns(values).view("datetime64[ns]")
+
 
-    gaps = []
-    for i in range(1, len(ts)):
-        gaps.append((ts[i] - ts[i-1]).total_seconds())
+def gaps_from_sorted(records_sorted: BlobTable) -> Tuple[np.ndarray, np.ndarray]:
+    """已按时间排序的 BlobTable -> (gaps_seconds, timestamps datetime64[ns])"""
+    ts = records_sorted.timestamps
+    if ts.size < 2:
+        return np.array([], dtype=float), ts
+    gaps = np.diff(records_sorted.time).astype(np.float64) / 1e9
     return gaps, ts
 
 
-def analyze_gaps(gaps: List[float], std_k: float = 2.0) -> Dict[str, Any]:
+def compute_gaps(records) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    返回：gaps_seconds（ndarray[float64]），timestamps_sorted（ndarray[datetime64[ns]]）
+    gaps[i] = timestamps[i+1] 与 timestamps[i] 的差（秒），对应于 timestamps[i+1]
+    records 可以是 BlobTable 或 List[BlobRecord]。
+    """
+    return gaps_from_sorted(as_blob_table(records).sorted_by_time())
+
+
+def analyze_gaps(gaps: np.ndarray, std_k: float = 2.0) -> Dict[str, Any]:
     """
     统计 + 异常（阈值 = mean + std_k * std，与示例保持一致）
     """
@@ -261,43 +661,379 @@ def analyze_gaps(gaps: List[float], std_k: float = 2.0) -> Dict[str, Any]:
     }
 
 
+GROUP_LABELS = {
+    "signer": "Signer",
+    "namespace": "Namespace",
+    "namespace_signer": "Namespace / Signer",
+}
+
+
+def group_codes(records: BlobTable,
+                ns_codes: np.ndarray,
+                ns_names: List[str],
+                group_by: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐行分组编码及分组名称表
+
+    group_by: signer / namespace / namespace_signer（namespace 与 signer 的组合）
+    """
+    if group_by == "signer":
+        return records.signer_code, records.signers
+    names = np.empty(len(ns_names), dtype=object)
+    names[:] = ns_names
+    if group_by == "namespace":
+        return ns_codes, names
+    # 组合编码只保留实际出现的 (namespace, signer) 对
+    n_signers = max(len(records.signers), 1)
+    combo, codes = np.unique(ns_codes.astype(np.int64) * n_signers + records.signer_code, return_inverse=True)
+    labels = np.empty(combo.size, dtype=object)
+    labels[:] = [f"{names[k // n_signers]}/{records.signers[k % n_signers]}" for k in combo.tolist()]
+    return codes, labels
+
+
+def analyze_groups(records: BlobTable,
+                   codes: np.ndarray,
+                   names: np.ndarray,
+                   std_k: float = 2.0) -> Dict[str, Any]:
+    """在 grouped_gap_stats 的结果上附加分组名称"""
+    stats = grouped_gap_stats(records.time, records.height, codes, len(names), std_k=std_k)
+    stats["names"] = names
+    return stats
+
+
+def apply_detectors(analysis: Dict[str, Any], gaps: np.ndarray, detection: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    用 detectors.run_detectors 的结果替换 analysis 中的异常判定。
+    阈值逐间隔变化，outlier_threshold 改为阈值的中位数，仅作报告展示。
+    """
+    mask = detection["mask"]
+    analysis.update({
+        "outlier_mask": mask,
+        "outliers": gaps[mask],
+        "outlier_count": int(mask.sum()),
+        "outlier_threshold": float(np.median(detection["threshold"])),
+        "detector": detection["description"],
+        "change_points": detection["change_points"],
+    })
+    return analysis
+
+
+def outlier_mask(gaps: np.ndarray, analysis: Dict[str, Any]) -> np.ndarray:
+    """逐间隔的异常标记：检测器给出的 mask，否则为 gaps > outlier_threshold"""
+    mask = analysis.get("outlier_mask")
+    return mask if mask is not None else np.asarray(gaps, dtype=float) > analysis["outlier_threshold"]
+
+
 # ============================== 输出：CSV / 报告 ==============================
 
-def save_proof_list_csv(path: str, records_sorted: List[BlobRecord], gaps: List[float]):
+def _fmt_times(ts: np.ndarray, sep: str = " ") -> np.ndarray:
+    """datetime64 数组 -> 与 datetime.isoformat(sep=' ') 相同格式的字符串（整秒时省略微秒）"""
+    ts_us = ts.astype("datetime64[us]")
+    full = np.char.replace(np.datetime_as_string(ts_us, unit="us"), "T", sep)
+    whole = ts_us.astype(np.int64) % 1_000_000 == 0
+    return np.where(whole, full.astype("U19"), full)
+
+
+def _fmt_ts(t) -> str:
+    """单个 datetime64 -> 'YYYY-mm-dd HH:MM:SS'"""
+    return str(np.datetime64(t, "s")).replace("T", " ")
+
+
+def save_proof_list_csv(path: str, records_sorted, gaps):
+    """
+    records_sorted 为按时间排序的 BlobTable（或 List[BlobRecord]）；
+    时间列整体格式化为字符串后按行一次性写出。
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = records_sorted if isinstance(records_sorted, BlobTable) else BlobTable.from_records(records_sorted).sorted_by_time()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        _write_proof_header(f)
+        _write_proof_rows(f, table, gaps, start_index=0)
+
+
+# proof_list.csv 每次格式化的行数
+PROOF_CHUNK_ROWS = 100_000
+
+
+def _fmt_floats(values: np.ndarray, fmt: str = "%.6f") -> List[str]:
+    """按 fmt 格式化的字符串列表（默认与 f"{v:.6f}" 相同）"""
+    return [fmt % v for v in values.tolist()]
+
+
+def _write_proof_header(f):
+    csv.writer(f).writerow([
+        "index",
+        "prev_time_utc", "next_time_utc",
+        "gap_seconds", "gap_minutes", "gap_hours",
+        "prev_id", "next_id", "prev_height", "next_height",
+        "prev_signer", "next_signer"
+    ])
+
+
+def _write_proof_rows(f, table: BlobTable, gaps, start_index: int, chunk: int = PROOF_CHUNK_ROWS):
+    """写出 table 中相邻记录之间的间隔行，index 从 start_index 开始编号"""
+    g = np.asarray(gaps, dtype=float)
+    writer = csv.writer(f)
+    # 分块格式化：时间字符串与 tolist() 产生的 Python 对象只在块内存在，峰值内存与总行数无关
+    for lo in range(0, g.size, chunk):
+        hi = min(lo + chunk, g.size)
+        part = table.take(slice(lo, hi + 1))
+        times = _fmt_times(part.timestamps)
+        signers = part.signer_names()
+        ids, heights = part.id_labels(), part.height
+        pg = g[lo:hi]
+        # 非整数 id 与 signer 来自原始数据，可能含逗号或引号，交给 csv.writer 转义
+        writer.writerows(zip(
+            range(start_index + lo, start_index + hi),
+            times[:-1].tolist(), times[1:].tolist(),
+            _fmt_floats(pg), _fmt_floats(pg / 60.0), _fmt_floats(pg / 3600.0),
+            ids[:-1].tolist(), ids[1:].tolist(), heights[:-1].tolist(), heights[1:].tolist(),
+            signers[:-1].tolist(), signers[1:].tolist(),
+        ))
+
+
+def _group_order(stats: Dict[str, Any]) -> np.ndarray:
+    """有间隔的分组，按最大间隔降序"""
+    has = np.flatnonzero(stats["gaps"] > 0)
+    return has[np.argsort(-stats["max"][has], kind="stable")]
+
+
+def save_group_summary_csv(path: str, records: BlobTable, stats: Dict[str, Any]):
+    """每组一行的汇总表，按最大间隔降序；没有间隔（<2 条记录）的组排在最后"""
     os.makedirs(os.path.dirname(path), exist_ok=True)
+    order = _group_order(stats)
+    order = np.concatenate([order, np.flatnonzero(stats["gaps"] == 0)])
+    ts = records.timestamps
+    before = np.full(stats["n_groups"], "", dtype=object)
+    after = np.full(stats["n_groups"], "", dtype=object)
+    has = stats["max_prev_row"] >= 0
+    before[has] = _fmt_times(ts[stats["max_prev_row"][has]])
+    after[has] = _fmt_times(ts[stats["max_next_row"][has]])
+
     with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            "index",
-            "prev_time_utc", "next_time_utc",
-            "gap_seconds", "gap_minutes", "gap_hours",
-            "prev_id", "next_id", "prev_height", "next_height",
-            "prev_signer", "next_signer"
+        writer = csv.writer(f)
+        writer.writerow([
+            "group", "blobs", "gaps",
+            "mean_gap_seconds", "median_gap_seconds", "p95_gap_seconds", "std_gap_seconds",
+            "min_gap_seconds", "max_gap_seconds", "max_gap_before_utc", "max_gap_after_utc",
+            "outlier_threshold", "outlier_count",
         ])
-        for i in range(1, len(records_sorted)):
-            a, b = records_sorted[i-1], records_sorted[i]
-            g = gaps[i-1]
-            w.writerow([
-                i-1,
-                a.time.isoformat(sep=' '), b.time.isoformat(sep=' '),
-                f"{g:.6f}", f"{g/60.0:.6f}", f"{g/3600.0:.6f}",
-                a.id, b.id, a.height, b.height, a.signer, b.signer
-            ])
+        # 分组名（signer / namespace）来自原始数据，可能含逗号或引号，交给 csv.writer 转义
+        writer.writerows(zip(
+            stats["names"][order].tolist(), stats["blobs"][order].tolist(), stats["gaps"][order].tolist(),
+            *(_fmt_floats(stats[c][order]) for c in ("mean", "median", "p95", "std", "min", "max")),
+            before[order].tolist(), after[order].tolist(),
+            _fmt_floats(stats["threshold"][order]), stats["outlier_count"][order].tolist(),
+        ))
+
+
+def render_group_sections(records: BlobTable,
+                          stats: Dict[str, Any],
+                          group_by: str,
+                          csv_name: str = "group_summary.csv",
+                          top_n: int = 20,
+                          sections: int = 10) -> List[str]:
+    """
+    分组报告：最大间隔最长的 top_n 组的汇总表 + 前 sections 组各自的小节
+    （统计量与组内显著间隔）。完整结果见 csv_name。
+    """
+    label = GROUP_LABELS[group_by]
+    order = _group_order(stats)
+    names = stats["names"]
+    ts = records.timestamps
+
+    lines = [f"## Per-{label} Analysis\n"]
+    lines.append(f"**Groups:** {stats['n_groups']} ({order.size} with at least 2 blobs). "
+                 f"Each group is analyzed as its own series; the outlier threshold is the group's "
+                 f"mean + k·std. Full table: `{csv_name}`.\n")
+    if not order.size:
+        lines.append("No group has enough blobs to compute gaps.\n")
+        return lines
+
+    lines.append(f"| {label} | Blobs | Gaps | Median (s) | Mean (s) | Longest (h) | Outliers |")
+    lines.append("|---|------:|-----:|-----------:|---------:|------------:|---------:|")
+    for g in order[:top_n].tolist():
+        lines.append(f"| `{names[g]}` | {stats['blobs'][g]} | {stats['gaps'][g]} | {stats['median'][g]:.0f} | "
+                     f"{stats['mean'][g]:.0f} | {stats['max'][g]/3600:.2f} | {stats['outlier_count'][g]} |")
+    if order.size > top_n:
+        lines.append(f"\n*… {order.size - top_n} more groups in `{csv_name}`*")
+    lines.append("")
+
+    gaps = stats["gap_seconds"]
+    for g in order[:sections].tolist():
+        lines.append(f"### {label}: `{names[g]}`\n")
+        lines.append(f"- **Blobs / Gaps:** {stats['blobs'][g]} / {stats['gaps'][g]}")
+        lines.append(f"- **Average Gap:** {stats['mean'][g]:.0f} s  |  **Median:** {stats['median'][g]:.0f} s  |  "
+                     f"**95th Percentile:** {stats['p95'][g]:.0f} s  |  **Std Dev:** {stats['std'][g]:.0f} s")
+        lines.append(f"- **Longest Gap:** {stats['max'][g]:.0f} s ({stats['max'][g]/3600:.2f} h), "
+                     f"{_fmt_ts(ts[stats['max_prev_row'][g]])} → {_fmt_ts(ts[stats['max_next_row'][g]])} UTC")
+        thr = stats["threshold"][g]
+        lines.append(f"- **Outlier Threshold:** {thr:.0f} s ({thr/3600:.2f} h)  |  "
+                     f"**Outliers:** {stats['outlier_count'][g]}\n")
+        idx = group_outliers(stats, g)
+        if idx.size:
+            lines.append("| Duration (s) | Hours | Before Time (UTC) | After Time (UTC) |")
+            lines.append("|-------------:|------:|-------------------|------------------|")
+            for k in idx[:10].tolist():
+                lines.append(f"| {gaps[k]:.0f} | {gaps[k]/3600:.1f} | {_fmt_ts(ts[stats['prev_row'][k]])} | "
+                             f"{_fmt_ts(ts[stats['next_row'][k]])} |")
+            if idx.size > 10:
+                lines.append(f"\n*… and more ({idx.size - 10} hidden)*")
+            lines.append("")
+    return lines
+
+
+ROLLUP_CSVS = {"hourly": "rollup_hourly.csv", "daily": "rollup_daily.csv", "signer": "rollup_signer.csv"}
+
+
+def compute_rollups(records: BlobTable) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    吞吐与费用汇总（见 rollups.py）：hourly / daily 按 UTC 时间桶（含空桶），
+    signer 按 signer 编码，另附 names（signer 地址）
+    """
+    metrics = (records.size, records.fee, records.gas_used, records.gas_wanted)
+    by_size = size_order(records.size)
+    by_signer = rollup(records.signer_code, *metrics, by_size=by_size)
+    by_signer["names"] = records.signers[by_signer["key"]]
+    return {
+        "hourly": time_rollup(records.time, HOUR_NS, *metrics, by_size=by_size),
+        "daily": time_rollup(records.time, DAY_NS, *metrics, by_size=by_size),
+        "signer": by_signer,
+        "total": rollup(np.zeros(len(records), dtype=np.int64), *metrics, by_size=by_size),
+    }
+
+
+def save_rollup_csvs(out_dir: str, rollups: Dict[str, Dict[str, np.ndarray]]):
+    """写出 rollup_hourly.csv / rollup_daily.csv / rollup_signer.csv（signer 按字节数降序）"""
+    os.makedirs(out_dir, exist_ok=True)
+    header = ["blobs", "bytes", "fee_utia", "gas_used", "gas_wanted", "gas_efficiency", "size_p50", "size_p99"]
+    formats = {"gas_efficiency": "%.6f", "size_p50": "%.1f", "size_p99": "%.1f"}
+    for kind, name in ROLLUP_CSVS.items():
+        r = rollups[kind]
+        if kind == "signer":
+            order = np.argsort(-r["bytes"], kind="stable")
+            labels = r["names"][order]
+        else:
+            order = np.arange(r["key"].size)
+            labels = _fmt_times(r["key"].view("datetime64[ns]"))
+        columns = [_fmt_floats(r[c][order], formats[c]) if c in formats else r[c][order].tolist()
+                   for c in ROLLUP_COLUMNS]
+        with open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([kind if kind == "signer" else "bucket_start_utc"] + header)
+            # signer 来自原始数据，可能含逗号或引号，交给 csv.writer 转义
+            writer.writerows(zip(labels.tolist(), *columns))
+
+
+def _fmt_bytes(n: float) -> str:
+    return f"{n / 1e6:,.2f} MB" if n < 1e9 else f"{n / 1e9:,.2f} GB"
+
+
+def render_rollup_sections(rollups: Dict[str, Dict[str, np.ndarray]],
+                           top_n: int = 10,
+                           days: int = 31) -> List[str]:
+    """报告中的吞吐与费用小节：总量、最忙的小时、最近 days 天的逐日表、字节数最多的 top_n 个 signer"""
+    total, hourly, daily, by_signer = rollups["total"], rollups["hourly"], rollups["daily"], rollups["signer"]
+    lines = ["## Throughput & Fees\n"]
+    if not total["key"].size:
+        return lines + ["No blobs.\n"]
+    lines.append(f"Per-hour, per-day and per-signer rollups: "
+                 f"{', '.join(f'`{n}`' for n in ROLLUP_CSVS.values())}.\n")
+    n_hours = hourly["key"].size
+    lines.append(f"- **Total Data:** {_fmt_bytes(total['bytes'][0])} in {total['blobs'][0]} blobs "
+                 f"({_fmt_bytes(total['bytes'][0] / n_hours)} per hour on average)")
+    lines.append(f"- **Total Fees:** {total['fee'][0] / 1e6:,.6f} TIA ({total['fee'][0]} utia)")
+    lines.append(f"- **Gas Efficiency:** {total['gas_efficiency'][0]:.1%} (gas used / gas wanted)")
+    lines.append(f"- **Blob Size:** p50 {total['size_p50'][0]:,.0f} B  |  p99 {total['size_p99'][0]:,.0f} B")
+    busiest = int(np.argmax(hourly["bytes"]))
+    lines.append(f"- **Busiest Hour:** {_fmt_ts(hourly['key'][busiest].view('datetime64[ns]'))} UTC, "
+                 f"{_fmt_bytes(hourly['bytes'][busiest])} in {hourly['blobs'][busiest]} blobs")
+    lines.append(f"- **Hours Without Blobs:** {int((hourly['blobs'] == 0).sum())} of {n_hours}\n")
+
+    lines.append("| Day (UTC) | Blobs | Data (MB) | Fees (TIA) | Gas Eff. | Size p50 (B) | Size p99 (B) |")
+    lines.append("|-----------|------:|----------:|-----------:|---------:|-------------:|-------------:|")
+    first = max(0, daily["key"].size - days)
+    for i in range(first, daily["key"].size):
+        lines.append(f"| {_fmt_ts(daily['key'][i].view('datetime64[ns]'))[:10]} | {daily['blobs'][i]} | "
+                     f"{daily['bytes'][i] / 1e6:,.2f} | {daily['fee'][i] / 1e6:,.6f} | "
+                     f"{daily['gas_efficiency'][i]:.1%} | {daily['size_p50'][i]:,.0f} | {daily['size_p99'][i]:,.0f} |")
+    if first:
+        lines.append(f"\n*… {first} earlier days in `{ROLLUP_CSVS['daily']}`*")
+    lines.append("")
+
+    order = np.argsort(-by_signer["bytes"], kind="stable")
+    lines.append("| Signer | Blobs | Data (MB) | Fees (TIA) | Gas Eff. | Size p50 (B) | Size p99 (B) |")
+    lines.append("|--------|------:|----------:|-----------:|---------:|-------------:|-------------:|")
+    for g in order[:top_n].tolist():
+        lines.append(f"| `{by_signer['names'][g]}` | {by_signer['blobs'][g]} | {by_signer['bytes'][g] / 1e6:,.2f} | "
+                     f"{by_signer['fee'][g] / 1e6:,.6f} | {by_signer['gas_efficiency'][g]:.1%} | "
+                     f"{by_signer['size_p50'][g]:,.0f} | {by_signer['size_p99'][g]:,.0f} |")
+    if order.size > top_n:
+        lines.append(f"\n*… {order.size - top_n} more signers in `{ROLLUP_CSVS['signer']}`*")
+    lines.append("")
+    return lines
 
 
 def generate_report_md(path: str,
-                       records: List[BlobRecord],
-                       timestamps: List[datetime],
-                       gaps: List[float],
+                       records,
+                       timestamps: np.ndarray,
+                       gaps: np.ndarray,
                        analysis: Dict[str, Any],
-                       namespace_hint: str = "N/A"):
+                       namespace_hint: str = "N/A",
+                       extra_sections: Optional[List[str]] = None,
+                       image_ext: str = "png",
+                       images: bool = True,
+                       viewer: bool = False):
+    timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    gaps = np.asarray(gaps, dtype=float)
+    first_ts = timestamps.min() if timestamps.size else None
+    last_ts = timestamps.max() if timestamps.size else None
+
+    # 显著间隔表最多列出 15 行（按时间顺序）
+    outlier_rows = []
+    if gaps.size:
+        for i in np.flatnonzero(outlier_mask(gaps, analysis))[:15] + 1:
+            outlier_rows.append((int(i), float(gaps[i-1]), timestamps[i-1], timestamps[i]))
+
+    # 发布节奏变点：(新段第一个间隔的序号, 变点时间, 前一段中位数, 后一段中位数)
+    change_rows = []
+    points = analysis.get("change_points") or []
+    bounds = [0] + list(points) + [gaps.size]
+    for j, cp in enumerate(points):
+        before = float(np.median(gaps[bounds[j]:cp]))
+        after = float(np.median(gaps[cp:bounds[j + 2]]))
+        change_rows.append((cp + 1, timestamps[cp], before, after))
+
+    render_report_md(path, len(records), first_ts, last_ts, analysis, outlier_rows,
+                     namespace_hint=namespace_hint, extra_sections=extra_sections,
+                     change_rows=change_rows, image_ext=image_ext, images=images, viewer=viewer)
+
+
+def render_report_md(path: str,
+                     total_blobs: int,
+                     first_ts,
+                     last_ts,
+                     analysis: Dict[str, Any],
+                     outlier_rows: List[Tuple[int, float, Any, Any]],
+                     namespace_hint: str = "N/A",
+                     images: bool = True,
+                     extra_sections: Optional[List[str]] = None,
+                     change_rows: Optional[List[Tuple[int, Any, float, float]]] = None,
+                     image_ext: str = "png",
+                     viewer: bool = False):
+    """
+    按汇总结果渲染报告；全量与流式分析共用。
+    outlier_rows: [(gap 序号, 间隔秒数, 前一条时间, 后一条时间)]，最多 15 行
+    extra_sections: 插在图表之前的附加 Markdown 行（如分组分析）
+    change_rows: [(gap 序号, 变点时间, 前段中位数, 后段中位数)]，变点检测器给出
+    viewer: 是否链接交互式时间线 gaps_interactive.html
+    """
     os.makedirs(os.path.dirname(path), exist_ok=True)
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    if timestamps:
-        first_ts, last_ts = min(timestamps), max(timestamps)
-        period_days = (last_ts - first_ts).total_seconds() / 86400.0
+    n_gaps = analysis.get("total_gaps", 0)
+    if first_ts is not None:
+        period_days = float((np.datetime64(last_ts, "ns") - np.datetime64(first_ts, "ns")) / np.timedelta64(1, "s")) / 86400.0
     else:
-        first_ts = last_ts = None
         period_days = 0.0
 
     lines = []
@@ -305,7 +1041,7 @@ def generate_report_md(path: str,
     lines.append(f"**Analysis Date:** {now} UTC  \n**Namespace:** `{namespace_hint}`\n")
     lines.append("## Executive Summary\n")
 
-    if not gaps:
+    if not n_gaps:
         lines.append("❌ **Insufficient data** - Need at least 2 blobs to analyze consistency.\n")
     else:
         cv = analysis["std_gap_seconds"] / analysis["mean_gap_seconds"] if analysis["mean_gap_seconds"] > 0 else float("inf")
@@ -317,22 +1053,25 @@ def generate_report_md(path: str,
             consistency = "❌ **INCONSISTENT** - High variability in posting intervals"
         lines.append(f"{consistency}\n")
         if analysis["outlier_count"] > 0:
-            lines.append(f"**{analysis['outlier_count']} significant gaps** detected that are much longer than usual.\n")
+            approx = " (approx.)" if analysis.get("outlier_count_approx") else ""
+            lines.append(f"**{analysis['outlier_count']}{approx} significant gaps** detected that are much longer than usual.\n")
         else:
             lines.append("**No significant gaps** detected - posting appears regular.\n")
 
     lines.append("## Data Overview\n")
-    lines.append(f"- **Total Blobs:** {len(records)}")
-    lines.append(f"- **Time Gaps Analyzed:** {len(gaps)}")
+    lines.append(f"- **Total Blobs:** {total_blobs}")
+    lines.append(f"- **Time Gaps Analyzed:** {n_gaps}")
     lines.append(f"- **Analysis Period:** {period_days:.1f} days\n")
-    if timestamps:
-        lines.append(f"- **First Blob:** {first_ts.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-        lines.append(f"- **Last Blob:** {last_ts.strftime('%Y-%m-%d %H:%M:%S')} UTC\n")
+    if first_ts is not None:
+        lines.append(f"- **First Blob:** {_fmt_ts(first_ts)} UTC")
+        lines.append(f"- **Last Blob:** {_fmt_ts(last_ts)} UTC\n")
 
-    if gaps:
+    if n_gaps:
         lines.append("## Gap Statistics\n")
         lines.append(f"- **Average Gap:** {analysis['mean_gap_seconds']:.0f} s ({analysis['mean_gap_seconds']/3600:.2f} h)")
         lines.append(f"- **Median Gap:** {analysis['median_gap_seconds']:.0f} s ({analysis['median_gap_seconds']/3600:.2f} h)")
+        if "p95_gap_seconds" in analysis:
+            lines.append(f"- **95th Percentile:** {analysis['p95_gap_seconds']:.0f} s ({analysis['p95_gap_seconds']/3600:.2f} h)")
         lines.append(f"- **Std Dev:** {analysis['std_gap_seconds']:.0f} s ({analysis['std_gap_seconds']/3600:.2f} h)")
         lines.append(f"- **Shortest Gap:** {analysis['min_gap_seconds']:.0f} s")
         lines.append(f"- **Longest Gap:** {analysis['max_gap_seconds']:.0f} s ({analysis['max_gap_seconds']/3600:.2f} h)\n")
@@ -340,23 +1079,39 @@ def generate_report_md(path: str,
         # 显著间隔表（超过阈值）
         thr = analysis["outlier_threshold"]
         lines.append("## Significant Gaps Identified\n")
-        lines.append(f"**Outlier Threshold:** {thr:.0f} s ({thr/3600:.2f} h)\n")
+        if "detector" in analysis:
+            lines.append(f"**Detector:** {analysis['detector']}  ")
+            lines.append(f"**Median Threshold:** {thr:.0f} s ({thr/3600:.2f} h)\n")
+        else:
+            lines.append(f"**Outlier Threshold:** {thr:.0f} s ({thr/3600:.2f} h)\n")
         lines.append("| Gap # | Duration (s) | Hours | Days | Before Time (UTC) | After Time (UTC) |")
         lines.append("|------:|-------------:|------:|-----:|-------------------|------------------|")
-        shown = 0
-        for i, g in enumerate(gaps, 1):
-            if g > thr:
-                shown += 1
-                bt = timestamps[i-1].strftime("%Y-%m-%d %H:%M:%S")
-                at = timestamps[i].strftime("%Y-%m-%d %H:%M:%S")
-                lines.append(f"| {i} | {g:.0f} | {g/3600:.1f} | {g/86400:.1f} | {bt} | {at} |")
-                if shown >= 15:
-                    lines.append(f"\n*… and more ({analysis['outlier_count'] - shown} hidden)*")
-                    break
-
-    lines.append("\n## Visual Analysis\n")
-    lines.append("![Gaps Over Time](gaps_over_time.png)")
-    lines.append("![Gap Distribution](blob_gap_histogram.png)\n")
+        for i, g, before, after in outlier_rows[:15]:
+            lines.append(f"| {i} | {g:.0f} | {g/3600:.1f} | {g/86400:.1f} | {_fmt_ts(before)} | {_fmt_ts(after)} |")
+        if len(outlier_rows) >= 15:
+            lines.append(f"\n*… and more ({analysis['outlier_count'] - 15} hidden)*")
+
+        if change_rows:
+            lines.append("\n## Posting Cadence Changes\n")
+            lines.append("| Gap # | Change Time (UTC) | Median Before (s) | Median After (s) |")
+            lines.append("|------:|-------------------|------------------:|-----------------:|")
+            for i, t, before, after in change_rows:
+                lines.append(f"| {i} | {_fmt_ts(t)} | {before:.0f} | {after:.0f} |")
+
+    if extra_sections:
+        lines.append("")
+        lines.extend(extra_sections)
+
+    if images or viewer:
+        lines.append("\n## Visual Analysis\n")
+    if viewer:
+        lines.append("Zoomable timeline (minute / hour / day aggregates): "
+                     "[gaps_interactive.html](gaps_interactive.html)\n")
+    if images:
+        lines.append(f"![Gaps Over Time](gaps_over_time.{image_ext})")
+        lines.append(f"![Gap Distribution](blob_gap_histogram.{image_ext})\n")
+    elif not viewer:
+        lines.append("")
     lines.append("---\n*Report generated automatically.*\n")
 
     with open(path, "w", encoding="utf-8") as f:
@@ -365,54 +1120,118 @@ def generate_report_md(path: str,
 
 # ============================== 绘图 ==============================
 
-def create_time_plot(timestamps: List[datetime],
-                     gaps: List[float],
+def _pyplot():
+    """
+    延迟导入 pyplot：matplotlib 的导入占本模块冷启动的大半，只有真正画图时才付出这部分开销，
+    作为库导入本模块也不会改动 matplotlib 的全局状态。
+    """
+    import matplotlib
+    # —— 关键：非交互式后端，防止命令行环境卡住（必须在导入 pyplot 之前设置）；
+    # 调用方已自行导入 pyplot 时沿用其后端
+    if "matplotlib.pyplot" not in sys.modules:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.ioff()
+    return plt
+
+
+def decimate_minmax(x: np.ndarray, y: np.ndarray, n_bins: int) -> np.ndarray:
+    """
+    按像素列降采样：x（已升序）等分为 n_bins 列，每列只保留 y 最小和最大的点
+    （各取第一次出现），返回保留点的下标（升序）。折线的包络与全量绘制在像素上一致。
+    """
+    n = x.size
+    if n <= 2 * n_bins:
+        return np.arange(n)
+    x = x.astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+    span = float(x[-1] - x[0]) or 1.0
+    col = np.minimum(((x - x[0]) / span * n_bins).astype(np.int64), n_bins - 1)
+    new_col = np.diff(col, prepend=-1) != 0
+    starts = np.flatnonzero(new_col)
+    seg = np.cumsum(new_col) - 1                # 每个点所在的列序号
+    idx = np.arange(n)
+    lo = np.minimum.reduceat(y, starts)[seg]
+    hi = np.maximum.reduceat(y, starts)[seg]
+    first_lo = np.minimum.reduceat(np.where(y == lo, idx, n), starts)
+    first_hi = np.minimum.reduceat(np.where(y == hi, idx, n), starts)
+    return np.union1d(first_lo, first_hi)
+
+
+def create_time_plot(timestamps: np.ndarray,
+                     gaps: np.ndarray,
                      analysis: Dict[str, Any],
-                     save_path: str):
+                     save_path: str,
+                     fast: bool = False,
+                     dpi: int = 300,
+                     annotate_top: Optional[int] = None,
+                     rasterized: bool = False):
     """
     生成“随时间的间隔”图（参考示例）：浅蓝折线 + 绿色中位线 + 红色异常点（带标注）+ 左上角摘要框。
+
+    Args:
+        fast: 快速模式——折线按像素列做 min/max 降采样且不画圆点标记，
+              不使用 bbox_inches='tight'（它会让整张图多渲染一遍）
+        dpi: 输出分辨率；SVG 中只影响栅格化的部分
+        annotate_top: 只为最长的 N 个异常间隔加标注；默认普通模式全部标注，快速模式 20 个
+        rasterized: 数据层栅格化（输出 SVG/PDF 时避免每个点一个矢量元素）
+    保存格式由 save_path 的扩展名决定（.png / .svg 等）。
     """
     if len(gaps) == 0:
         return
 
-    gaps_h = [g/3600.0 for g in gaps]
-    gap_ts = timestamps[1:]  # 间隔对应“后一条”的时间
+    gaps = np.asarray(gaps, dtype=float)
+    gaps_h = gaps / 3600.0
+    gap_ts = np.asarray(timestamps, dtype="datetime64[ns]")[1:]  # 间隔对应“后一条”的时间
+    if annotate_top is None and fast:
+        annotate_top = 20
 
-    plt.figure(figsize=(16, 9))
+    plt = _pyplot()
+    import matplotlib.dates as mdates
+    fig = plt.figure(figsize=(16, 9))
 
     # 正常折线
-    plt.plot(gap_ts, gaps_h, 'o-', color='lightsteelblue',
-             markersize=3, linewidth=1, alpha=0.6, label='Normal gaps')
+    if fast:
+        keep = decimate_minmax(gap_ts, gaps_h, int(16 * dpi))
+        plt.plot(gap_ts[keep], gaps_h[keep], '-', color='lightsteelblue',
+                 linewidth=1, alpha=0.6, label='Normal gaps', rasterized=rasterized)
+    else:
+        plt.plot(gap_ts, gaps_h, 'o-', color='lightsteelblue',
+                 markersize=3, linewidth=1, alpha=0.6, label='Normal gaps', rasterized=rasterized)
 
     # 中位数线
     median_h = analysis["median_gap_seconds"] / 3600.0
     plt.axhline(median_h, color='green', linestyle='-', linewidth=2,
                 alpha=0.9, label=f"Median: {median_h:.2f}h")
 
-    # 异常点（> mean + k*std）
-    thr = analysis["outlier_threshold"]
-    outliers = []
-    for i, g in enumerate(gaps):
-        if g > thr:
-            gh = g / 3600.0
-            plt.scatter(gap_ts[i], gh, color='red', s=80, zorder=5,
-                        alpha=0.9, edgecolors='darkred', linewidth=1)
-            # 注释
-            plt.annotate(f"{gh:.1f}h",
-                         (gap_ts[i], gh),
-                         xytext=(10, 10), textcoords='offset points',
-                         bbox=dict(boxstyle='round,pad=0.3', facecolor='red', alpha=0.75),
-                         fontsize=9, color='white', weight='bold',
-                         arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'))
-            outliers.append((gap_ts[i], gh))
-
-    # 图例中的“Outliers”样例
-    if outliers:
-        plt.scatter([], [], color='red', s=80, alpha=0.9, edgecolors='darkred',
-                    linewidth=1, label=f'Outliers ({len(outliers)} found)')
+    # 发布节奏变点
+    for cp in analysis.get("change_points") or []:
+        plt.axvline(gap_ts[cp], color='orange', linestyle='--', linewidth=1.2, alpha=0.8)
+    if analysis.get("change_points"):
+        plt.plot([], [], color='orange', linestyle='--', label=f"Cadence changes ({len(analysis['change_points'])})")
+
+    # 异常点（> mean + k*std，或检测器给出的 mask）：一次 scatter 画完
+    out_idx = np.flatnonzero(outlier_mask(gaps, analysis))
+    if out_idx.size:
+        plt.scatter(gap_ts[out_idx], gaps_h[out_idx], color='red', s=80, zorder=5,
+                    alpha=0.9, edgecolors='darkred', linewidth=1,
+                    label=f'Outliers ({out_idx.size} found)', rasterized=rasterized)
+
+    # 注释：按时间顺序标注（限定个数时取最长的 N 个）
+    ann_idx = out_idx
+    if annotate_top is not None and out_idx.size > annotate_top:
+        top = np.argsort(gaps_h[out_idx], kind="stable")[out_idx.size - annotate_top:]
+        ann_idx = np.sort(out_idx[top])
+    for i in ann_idx:
+        gh = gaps_h[i]
+        plt.annotate(f"{gh:.1f}h",
+                     (gap_ts[i], gh),
+                     xytext=(10, 10), textcoords='offset points',
+                     bbox=dict(boxstyle='round,pad=0.3', facecolor='red', alpha=0.75),
+                     fontsize=9, color='white', weight='bold',
+                     arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'))
 
     # y 轴从 0 开始，顶部留白
-    ymax = max(gaps_h) if gaps_h else 1.0
+    ymax = float(gaps_h.max()) if gaps_h.size else 1.0
     plt.ylim(bottom=0, top=ymax * 1.1)
 
     # 摘要框
@@ -420,7 +1239,7 @@ def create_time_plot(timestamps: List[datetime],
         f"Summary:\n"
         f"• Total gaps analyzed: {len(gaps)}\n"
         f"• Median gap: {median_h:.2f} hours\n"
-        f"• Outliers detected: {len(outliers)}\n"
+        f"• Outliers detected: {out_idx.size}\n"
         f"• Largest gap: {ymax:.1f}h"
     )
     plt.text(0.02, 0.98, summary_text, transform=plt.gca().transAxes,
@@ -438,11 +1257,11 @@ def create_time_plot(timestamps: List[datetime],
     plt.grid(True, alpha=0.3, linestyle='--')
     plt.legend(loc='lower right', fontsize=11)
     plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor='white')
-    plt.close()
+    plt.savefig(save_path, dpi=dpi, bbox_inches=None if fast else 'tight', facecolor='white')
+    plt.close(fig)
 
 
-def create_histogram(gaps: List[float], save_path: str):
+def create_histogram(gaps: np.ndarray, save_path: str, dpi: int = 300):
     """
     直方图（单位：小时），带均值/中位数/95分位参考线；对重尾分布自动切换对数 y 轴。
     """
@@ -465,6 +1284,7 @@ def create_histogram(gaps: List[float], save_path: str):
 
     bins = fd_bins(vals)
 
+    plt = _pyplot()
     plt.figure(figsize=(12, 7))
     n, b, _ = plt.hist(vals, bins=bins, alpha=0.9)
 
@@ -486,63 +1306,590 @@ def create_histogram(gaps: List[float], save_path: str):
     plt.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
     plt.legend()
     plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(save_path, dpi=dpi, bbox_inches='tight', facecolor='white')
     plt.close()
 
 
+# ============================== 输出阶段 ==============================
+
+# 输出文件的名称（--only / --skip 使用），按打印顺序排列
+OUTPUT_ARTIFACTS = ("timeline", "histogram", "pyramid", "report", "csv", "groups", "rollups")
+# 默认不生成、只在 --only 中点名时才生成的输出（子命令也不生成）
+OPT_IN_ARTIFACTS = {"pyramid", "rollups"}
+# Agg 后端不是线程安全的，绘图任务各自放到子进程中
+PROCESS_ARTIFACTS = {"timeline", "histogram"}
+
+OutputTask = Tuple[Callable[..., Any], tuple, Dict[str, Any]]
+
+
+def _timed(fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> float:
+    t0 = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t0
+
+
+def select_artifacts(only: Optional[str], skip: Optional[str]) -> List[str]:
+    """解析 --only / --skip（逗号分隔），返回要生成的输出；名称无效时抛 ValueError。
+    不给 --only 时为 OPT_IN_ARTIFACTS 以外的全部输出"""
+    def _parse(spec: Optional[str]) -> List[str]:
+        names = [x.strip() for x in (spec or "").split(",") if x.strip()]
+        bad = [x for x in names if x not in OUTPUT_ARTIFACTS]
+        if bad:
+            raise ValueError(f"未知的输出：{','.join(bad)}（可选 {','.join(OUTPUT_ARTIFACTS)}）")
+        return names
+
+    chosen = _parse(only) or [x for x in OUTPUT_ARTIFACTS if x not in OPT_IN_ARTIFACTS]
+    skipped = set(_parse(skip))
+    return [x for x in OUTPUT_ARTIFACTS if x in chosen and x not in skipped]
+
+
+def run_output_stage(tasks: Dict[str, OutputTask], workers: int = 2) -> Dict[str, float]:
+    """
+    生成各个输出文件，返回 {名称: 耗时秒}
+
+    各输出之间没有依赖：绘图任务提交到进程池，CSV 与报告同时在主进程中写出，
+    最后等待绘图完成。workers <= 1 时全部在主进程中串行执行。
+    """
+    timings: Dict[str, float] = {}
+    plots = [name for name in tasks if name in PROCESS_ARTIFACTS]
+    if workers <= 1 or not plots:
+        for name, task in tasks.items():
+            timings[name] = _timed(*task)
+        return timings
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(plots))) as ex:
+        futures = {name: ex.submit(_timed, *tasks[name]) for name in plots}
+        for name, task in tasks.items():
+            if name not in futures:
+                timings[name] = _timed(*task)
+        for name, fut in futures.items():
+            timings[name] = fut.result()
+    return timings
+
+
+# ============================== 流式分析 ==============================
+
+_TIME_RE = re.compile(r'"time"\s*:\s*"([^"]+)"')
+
+
+def _file_time_range(fp: str) -> Optional[Tuple[int, int]]:
+    """
+    批次文件的 (最早, 最晚) 时间（epoch 纳秒）。
+    JSON 只用正则扫描 time 字段，不做完整解析；扫描失败时退回完整解析。
+    """
+    try:
+        if fp.endswith(".npz"):
+            t = blob_store.load_segment(fp, ["time"])["time"]
+        elif fp.endswith(".ndjson.gz"):
+            t = blob_store.iso_to_ns(_TIME_RE.findall("\n".join(blob_store.read_ndjson_lines(fp))))
+        else:
+            with open(fp, "r", encoding="utf-8") as f:
+                t = blob_store.iso_to_ns(_TIME_RE.findall(f.read()))
+    except Exception:
+        res = _load_file_chunk(fp)
+        if res is None:
+            return None
+        t = res[0]["time"]
+    if not t.size:
+        return None
+    return int(t.min()), int(t.max())
+
+
+def iter_time_ordered(data_dir: str, cache: Optional[AnalysisCache] = None,
+                      counts: Optional[Dict[str, int]] = None) -> Iterator[BlobTable]:
+    """
+    按时间顺序逐块产出 BlobTable，内存只与单个文件及相邻文件的重叠部分有关。
+
+    先扫描每个文件的时间范围并按最早时间排序（全量下载的批次文件是 newest-first，
+    序号越大越旧；增量同步写出的文件相反，这里统一按实际时间排序）。处理第 k 个
+    文件时，早于第 k+1 个文件最早时间的记录不会再被后续文件插队，可以直接输出；
+    其余记录留到下一轮与新文件合并。signer 编码在整个流中全局一致。
+    给定 cache 时，未改动文件的时间范围和列都直接取自缓存。
+
+    重复的 blob（相邻批次文件重叠）在合并后的块内按 id 去重（unique_rows）。这是精确的：
+    一条记录同时出现在第 k 个文件中时，其时间不早于第 k 个文件的最早时间，
+    在此之前一直留在待合并部分，不会先被输出，因此与全量模式的去重结果相同。
+    去掉的条数累加到 counts["duplicates"]。
+    """
+    plan = []
+    for fp in list_batch_files(data_dir):
+        rng = cache.time_range(fp) if cache is not None else None
+        if rng is None:
+            rng = _file_time_range(fp)
+        if rng is not None:
+            plan.append((rng[0], fp))
+    plan.sort()
+
+    signer_index: Dict[str, int] = {}
+    id_index: Dict[str, int] = {}
+    signers = np.empty(0, dtype=object)
+    id_names = np.empty(0, dtype=object)
+    pending: Optional[BlobTable] = None
+    for k, (_, fp) in enumerate(plan):
+        if cache is not None:
+            res = cache.get_chunks([fp], _parse_files)[0]
+        else:
+            res = _load_file_chunk(fp)
+        if res is None:
+            continue
+        chunk = _remap_ids(_remap_signers(dict(res[0]), res[1], signer_index), id_index)
+        if pending is not None:
+            chunk = {c: np.concatenate([getattr(pending, c), chunk[c]]) for c in BlobTable.ROW_COLUMNS}
+        if len(signers) != len(signer_index):
+            signers = np.empty(len(signer_index), dtype=object)
+            signers[:] = list(signer_index)
+        if len(id_names) != len(id_index):
+            id_names = _id_table(id_index)
+        table = BlobTable(signers=signers, id_names=id_names, **chunk).sorted_by_time()
+        keep = unique_rows(table)
+        if keep.size < len(table):
+            if counts is not None:
+                counts["duplicates"] = counts.get("duplicates", 0) + len(table) - keep.size
+            table = table.take(keep)
+
+        if k + 1 < len(plan):
+            cut = int(np.searchsorted(table.time, plan[k + 1][0], side="left"))
+        else:
+            cut = len(table)
+        if cut:
+            yield table.take(slice(0, cut))
+        pending = table.take(slice(cut, None)) if cut < len(table) else None
+
+
+def analyze_stream(data_dir: str,
+                   out_csv: str,
+                   std_k: float = 2.0,
+                   top_k: int = 1000,
+                   cache: Optional[AnalysisCache] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    单遍流式分析：边读边写证明列表 CSV，统计量全部为在线算法，内存与记录数无关。
+    - 均值/标准差：Welford（精确）
+    - 中位数/p95：GapSketch（相对误差 0.5%）
+    - 最小/最大：精确
+    - 异常：保留最大的 top_k 个间隔；堆能覆盖全部超阈值间隔时计数精确，
+      否则用草图估计（analysis["outlier_count_approx"] 为 True）
+
+    Returns:
+        (analysis, summary)；analysis 与 analyze_gaps 的字段兼容，
+        summary 含 total_blobs（去重后）/ duplicates / first_ts / last_ts / outlier_rows，供 render_report_md 使用
+    """
+    stats = RunningStats()
+    sketch = GapSketch()
+    top = TopK(top_k)
+    total_blobs = 0
+    gap_index = 0
+    first_ts = last_ts = None
+    prev: Optional[BlobTable] = None
+    counts: Dict[str, int] = {}
+
+    os.makedirs(os.path.dirname(out_csv), exist_ok=True)
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        _write_proof_header(f)
+        for chunk in iter_time_ordered(data_dir, cache=cache, counts=counts):
+            total_blobs += len(chunk)
+            if first_ts is None:
+                first_ts = chunk.timestamps[0]
+            last_ts = chunk.timestamps[-1]
+
+            # 把上一块的最后一条接在前面，保证块与块之间的间隔也被计算
+            if prev is not None:
+                table = BlobTable(signers=chunk.signers, id_names=chunk.id_names, **{
+                    c: np.concatenate([getattr(prev, c), getattr(chunk, c)]) for c in BlobTable.ROW_COLUMNS
+                })
+            else:
+                table = chunk
+            prev = chunk.take(slice(-1, None))
+            if len(table) < 2:
+                continue
+
+            gaps = np.diff(table.time).astype(np.float64) / 1e9
+            _write_proof_rows(f, table, gaps, start_index=gap_index)
+            stats.update(gaps)
+            sketch.update(gaps)
+            ts, base = table.time, gap_index
+            top.push_many(gaps, lambda i: (base + i + 1, int(ts[i]), int(ts[i + 1])))
+            gap_index += gaps.size
+
+    if cache is not None:
+        cache.evict_missing()
+        cache.save()
+
+    thr = stats.mean + std_k * stats.std
+    exceed = [(v, p) for v, p in top.items() if v > thr]
+    # 堆里最小的值都不超过阈值，说明所有超阈值的间隔都在堆里
+    exact = top.floor <= thr
+    analysis = {
+        "total_gaps": gap_index,
+        "mean_gap_seconds": stats.mean,
+        "median_gap_seconds": sketch.quantile(0.5),
+        "p95_gap_seconds": sketch.quantile(0.95),
+        "std_gap_seconds": stats.std,
+        "outlier_threshold": float(thr),
+        "outliers": np.array([v for v, _ in exceed], dtype=float),
+        "outlier_count": len(exceed) if exact else sketch.count_above(thr),
+        "outlier_count_approx": not exact,
+        "max_gap_seconds": stats.max,
+        "min_gap_seconds": stats.min,
+    }
+    rows = sorted((p[0], v, np.datetime64(p[1], "ns"), np.datetime64(p[2], "ns")) for v, p in exceed)
+    summary = {
+        "total_blobs": total_blobs,
+        "duplicates": counts.get("duplicates", 0),
+        "first_ts": first_ts,
+        "last_ts": last_ts,
+        "outlier_rows": rows[:15],
+    }
+    return analysis, summary
+
+
 # ============================== 主流程 ==============================
 
-def main():
-    ap = argparse.ArgumentParser(description="Analyze Celestia blob publish gaps and visualize (timeline + histogram).")
+# 子命令及其生成的输出；不带子命令时生成默认输出（可用 --only / --skip 筛选）
+COMMANDS = {
+    "stats": (),
+    "report": ("report",),
+    "csv": ("csv", "groups"),
+    "plot": ("timeline", "histogram"),
+}
+COMMAND_HELP = {
+    "stats": "只加载与统计，打印间隔统计（--json 输出 JSON），不写文件、不导入 matplotlib",
+    "report": "只生成 Markdown 报告（已有的图片会被引用）",
+    "csv": "只生成 CSV：proof_list.csv，以及 --group_by 时的 group_summary.csv",
+    "plot": "只画时间线图与直方图",
+}
+
+
+def build_parser(command: Optional[str] = None) -> argparse.ArgumentParser:
+    """
+    command 为 None 时是原来的单命令行为（默认输出）；子命令只接受与其输出相关的选项，
+    没有的选项在 parse_args 中取默认值。
+    """
+    if command is None:
+        ap = argparse.ArgumentParser(
+            description="Analyze Celestia blob publish gaps and visualize (timeline + histogram).",
+            epilog="子命令：" + "；".join(f"{c}：{h}" for c, h in COMMAND_HELP.items())
+                   + "。用法 python analyze_blobs.py <子命令> [选项]，<子命令> -h 查看其选项。")
+    else:
+        ap = argparse.ArgumentParser(prog=f"analyze_blobs.py {command}", description=COMMAND_HELP[command])
     ap.add_argument("--result_json", type=str, default="result.json", help="包含 {'blobs': [...]} 的 JSON 路径")
     ap.add_argument("--data_dir", type=str, default="data", help="备用数据目录（blob_batch_*.json）")
     ap.add_argument("--out_dir", type=str, default="output", help="输出目录")
     ap.add_argument("--std_k", type=float, default=2.0, help="异常阈值 = mean + std_k * std（默认 2.0）")
     ap.add_argument("--namespace", type=str, default="N/A", help="报告中显示的 namespace（可选）")
-    args = ap.parse_args()
+    ap.add_argument("--workers", type=int, default=1, help="并行解析批次文件的进程数（默认 1，串行）")
+    if command != "plot":
+        ap.add_argument("--stream", action="store_true",
+                        help="单遍流式分析 data_dir（常数内存，只输出报告与 CSV，不画图）；"
+                             "相邻批次文件重叠造成的重复 blob 在重叠窗口内按 id 去重，结果与默认模式一致")
+        ap.add_argument("--top_k", type=int, default=1000, help="流式模式下保留的最大间隔个数（默认 1000）")
+    ap.add_argument("--cache_dir", type=str, default=None,
+                    help="增量分析缓存目录（如 output/.cache）；重跑时只解析新增或改动的批次文件")
+    ap.add_argument("--group_by", choices=sorted(GROUP_LABELS), default=None,
+                    help="额外按 signer / namespace / namespace_signer 分组分析（输出 group_summary.csv 与报告小节）")
+    ap.add_argument("--namespace_dir", action="append", default=[], metavar="NAME=DIR",
+                    help="某个 namespace 的数据目录，可重复；给出时代替 --result_json/--data_dir")
+    ap.add_argument("--index_db", type=str, default=None,
+                    help="SQLite 索引路径（blob_index.py）；给出时代替 --result_json/--data_dir")
+    ap.add_argument("--group_sections", type=int, default=10, help="报告中单独成节的分组个数（默认 10）")
+    ap.add_argument("--detector", type=str, default="std",
+                    help=f"异常检测器，逗号分隔可组合（结果取并集）：{','.join(DETECTORS)}（默认 std）")
+    ap.add_argument("--window", type=int, default=100, help="mad 检测器的滚动窗口 / ewma 的预热长度（默认 100）")
+    ap.add_argument("--detector_k", type=float, default=None,
+                    help="mad / ewma / changepoint 的阈值倍数（默认分别为 5 / 3 / 5）")
+    ap.add_argument("--ewma_alpha", type=float, default=0.05, help="ewma 检测器的平滑系数（默认 0.05）")
+    ap.add_argument("--cp_min_size", type=int, default=50, help="changepoint 检测器的最小段长（默认 50 个间隔）")
+    ap.add_argument("--cp_penalty", type=float, default=1.0, help="changepoint 检测器的惩罚系数，越大变点越少（默认 1）")
+    if command in (None, "plot"):
+        ap.add_argument("--fast_plot", action="store_true",
+                        help="快速绘图：按像素列 min/max 降采样、不画圆点、只标注最长的 --annotate_top 个异常")
+        ap.add_argument("--dpi", type=int, default=300, help="图片分辨率（默认 300）")
+        ap.add_argument("--annotate_top", type=int, default=None,
+                        help="只标注最长的 N 个异常（默认普通模式全部、快速模式 20）")
+        ap.add_argument("--rasterize", action="store_true", help="数据层栅格化（配合 svg 使用，文件更小）")
+    if command in (None, "plot", "report"):
+        ap.add_argument("--plot_format", choices=["png", "svg"], default="png", help="图片格式（默认 png）")
+    if command is None:
+        ap.add_argument("--only", type=str, default=None,
+                        help=f"只生成这些输出（逗号分隔）：{','.join(OUTPUT_ARTIFACTS)}；"
+                             f"{','.join(sorted(OPT_IN_ARTIFACTS))} 默认不生成，需要在这里点名")
+        ap.add_argument("--skip", type=str, default=None, help="跳过这些输出（逗号分隔）")
+        ap.add_argument("--output_workers", type=int, default=None,
+                        help="并行生成输出的进程数（绘图各占一个进程；<=1 为串行，默认 CPU 核数）")
+    if command == "stats":
+        ap.add_argument("--json", action="store_true", help="以 JSON 输出统计结果")
+    ap.add_argument("--metrics_file", type=str, default=None,
+                    help="结束时写出各阶段耗时与峰值内存（Prometheus 文本格式）")
+    ap.add_argument("--metrics_port", type=int, default=None, help="运行期间在 127.0.0.1 的该端口上提供 /metrics")
+    ap.add_argument("--profile", type=str, default=None, metavar="PREFIX",
+                    help="开启 cProfile + tracemalloc，结束时写出 PREFIX.prof 与 PREFIX.txt")
+    return ap
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[argparse.ArgumentParser, argparse.Namespace]:
+    """解析命令行；第一个参数是子命令名时按子命令解析。返回的 args 含全部选项（未提供的取默认值）"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    command = argv[0] if argv and argv[0] in COMMANDS else None
+    ap = build_parser(command)
+    args = ap.parse_args(argv[1:] if command else argv)
+    defaults = vars(build_parser(None).parse_args([]))
+    args = argparse.Namespace(**{**defaults, "json": False, **vars(args), "command": command})
+    return ap, args
+
+
+def main(argv: Optional[List[str]] = None):
+    ap, args = parse_args(argv)
+    try:
+        selected = list(COMMANDS[args.command]) if args.command else select_artifacts(args.only, args.skip)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.stream and (args.only or args.skip):
+        ap.error("--only / --skip 仅支持全量模式")
+    if args.stream and (args.group_by or args.namespace_dir or args.index_db):
+        ap.error("--group_by / --namespace_dir / --index_db 仅支持全量模式")
+    if args.index_db and args.namespace_dir:
+        ap.error("--index_db 与 --namespace_dir 不能同时使用")
+    if args.index_db and not os.path.exists(args.index_db):
+        ap.error(f"索引不存在: {args.index_db}")
+    detectors = [d.strip() for d in args.detector.split(",") if d.strip()]
+    unknown = [d for d in detectors if d not in DETECTORS]
+    if unknown or not detectors:
+        ap.error(f"未知的检测器：{','.join(unknown) or args.detector}（可选 {','.join(DETECTORS)}）")
+    if args.stream and detectors != ["std"]:
+        ap.error("--detector 仅支持全量模式")
+
+    registry = MetricsRegistry()
+    stages = StageMetrics(registry, "analyze")
+    info = sys.stderr if args.json else sys.stdout
+    if args.metrics_port is not None:
+        server = registry.serve(args.metrics_port)
+        print(f"Metrics: http://127.0.0.1:{server.server_address[1]}/metrics", file=info)
+    try:
+        # --json 时进度信息改写到 stderr，stdout 只有 JSON
+        with profiled(args.profile), contextlib.redirect_stdout(info):
+            summary = run_analysis(args, selected, detectors, stages)
+        if summary is not None:
+            print_gap_summary(summary, as_json=args.json)
+    finally:
+        if args.metrics_file or args.profile:
+            print(f"⏱️ Stages: {stages.summary()}", file=info)
+        if args.metrics_file:
+            registry.write(args.metrics_file)
+            print(f"📟 Metrics: {args.metrics_file}", file=info)
+
+
+def _record_totals(registry: MetricsRegistry, blobs: int, analysis: Dict[str, Any]):
+    registry.gauge("analyze_blobs", "Blobs analyzed (after dedupe)").set(blobs)
+    registry.gauge("analyze_gaps", "Publish gaps computed").set(analysis["total_gaps"])
+    registry.gauge("analyze_outliers", "Gaps flagged by the detectors").set(analysis["outlier_count"])
+    registry.gauge("analyze_max_gap_seconds", "Largest publish gap").set(analysis["max_gap_seconds"])
+
+
+def gap_summary(blobs: int, first_ts, last_ts, analysis: Dict[str, Any], std_k: float) -> Dict[str, Any]:
+    """stats 子命令的输出：analysis 中的标量统计加上记录数与时间范围"""
+    out: Dict[str, Any] = {
+        "blobs": int(blobs),
+        "std_k": std_k,
+        "first_time_utc": str(np.datetime64(first_ts, "us")) + "Z",
+        "last_time_utc": str(np.datetime64(last_ts, "us")) + "Z",
+    }
+    for k, v in analysis.items():
+        if isinstance(v, (int, float, str, np.integer, np.floating)):
+            out[k] = v.item() if isinstance(v, np.generic) else v
+    return out
+
+
+def print_gap_summary(summary: Dict[str, Any], as_json: bool = False):
+    if as_json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+    print(f"Blobs: {summary['blobs']}  |  Gaps: {summary['total_gaps']}  |  "
+          f"{summary['first_time_utc']} → {summary['last_time_utc']}")
+    print("Gap (s): " + "  ".join(
+        f"{label} {summary[k]:.3f}" for label, k in (
+            ("mean", "mean_gap_seconds"), ("median", "median_gap_seconds"), ("p95", "p95_gap_seconds"),
+            ("std", "std_gap_seconds"), ("min", "min_gap_seconds"), ("max", "max_gap_seconds"))
+        if k in summary))
+    rule = summary.get("detector") or f"> mean + {summary['std_k']}*std = {summary['outlier_threshold']:.3f} s"
+    print(f"Outliers ({rule}): {summary['outlier_count']}  |  Largest gap: {summary['max_gap_seconds']/3600:.2f} h")
+
+
+def run_analysis(args: argparse.Namespace, selected: List[str], detectors: List[str],
+                 stages: StageMetrics) -> Optional[Dict[str, Any]]:
+    """
+    main 的主体：加载、分析与输出，每一步记为 stages 中的一个阶段。
+    stats 子命令在统计完成后返回 gap_summary，不生成输出；其余情况返回 None。
+    """
+    registry = stages.registry
+    cache = AnalysisCache(args.cache_dir) if args.cache_dir else None
+
+    if args.stream:
+        out_md = os.path.join(args.out_dir, "blob_consistency_report.md")
+        # 证明列表在流式扫描中顺带写出，不需要时写到 devnull
+        out_csv = os.path.join(args.out_dir, "proof_list.csv") if "csv" in selected else os.devnull
+        print("Streaming analysis...")
+        with stages.stage("stream"):
+            analysis, summary = analyze_stream(args.data_dir, out_csv, std_k=args.std_k, top_k=args.top_k,
+                                               cache=cache)
+        if cache is not None:
+            print(cache.summary())
+        if summary["duplicates"]:
+            print(f"Dropped {summary['duplicates']} duplicate blobs (same id)")
+        if not analysis["total_gaps"]:
+            print("❌ 记录不足（<2）或缺少可解析的时间字段。")
+            return
+        _record_totals(registry, summary["total_blobs"], analysis)
+        if args.command == "stats":
+            return gap_summary(summary["total_blobs"], summary["first_ts"], summary["last_ts"], analysis, args.std_k)
+        if "report" in selected:
+            render_report_md(out_md, summary["total_blobs"], summary["first_ts"], summary["last_ts"],
+                             analysis, summary["outlier_rows"], namespace_hint=args.namespace, images=False)
+        print(f"Streamed {summary['total_blobs']} blobs  |  Computed {analysis['total_gaps']} gaps")
+        print("✅ Done.")
+        if "report" in selected:
+            print(f"📄 Report: {out_md}")
+        if "csv" in selected:
+            print(f"🧾 Proof CSV: {out_csv}")
+        print(f"Outliers (> mean + {args.std_k}*std): {analysis['outlier_count']}  |  Largest gap: {analysis['max_gap_seconds']/3600:.2f} h")
+        return
 
     # 加载数据（优先 result.json）
-    records = load_blobs_auto(args.result_json, args.data_dir)
-    if not records:
+    with stages.stage("load"):
+        if args.index_db:
+            records, ns_codes, ns_names = load_from_index(args.index_db)
+            if args.namespace == "N/A" and any(ns_names):
+                args.namespace = ", ".join(n for n in ns_names if n)
+            ns_names = [n or args.namespace for n in ns_names]
+        elif args.namespace_dir:
+            records, ns_codes, ns_names = load_namespace_dirs(args.namespace_dir, workers=args.workers, cache=cache)
+            if args.namespace == "N/A":
+                args.namespace = ", ".join(ns_names)
+        else:
+            records = load_blobs_auto(args.result_json, args.data_dir, workers=args.workers, cache=cache)
+            ns_codes = np.zeros(len(records), dtype=np.int32)
+            ns_names = [args.namespace]
+    if cache is not None:
+        print(cache.summary())
+    if not len(records):
         print("❌ 未加载到任何 blob 记录。请检查 result.json 或 data 目录。")
         return
-
-    # 计算间隔
-    gaps, timestamps = compute_gaps(records)
-    if not gaps:
+    with stages.stage("dedupe"):
+        keep = unique_rows(records)
+        if keep.size < len(records):
+            print(f"Dropped {len(records) - keep.size} duplicate blobs (same id)")
+            records, ns_codes = records.take(keep), ns_codes[keep]
+
+    # 排序 + 计算间隔（全部为数组运算）
+    with stages.stage("sort"):
+        records_sorted = records.sorted_by_time()
+        gaps, timestamps = gaps_from_sorted(records_sorted)
+    if not gaps.size:
         print("❌ 记录不足（<2）或缺少可解析的时间字段。")
         return
 
-    print(f"Loaded {len(records)} blobs  |  Computed {len(gaps)} gaps")
+    print(f"Loaded {len(records_sorted)} blobs  |  Computed {gaps.size} gaps")
 
     # 统计 + 异常
-    analysis = analyze_gaps(gaps, std_k=args.std_k)
+    with stages.stage("analyze"):
+        analysis = analyze_gaps(gaps, std_k=args.std_k)
+    if detectors != ["std"]:
+        print(f"Running detectors: {', '.join(detectors)}...")
+        k = {} if args.detector_k is None else {"k": args.detector_k}
+        params = {
+            "std": {"k": args.std_k},
+            "mad": {"window": args.window, **k},
+            "ewma": {"alpha": args.ewma_alpha, "warmup": args.window, **k},
+            "changepoint": {"min_size": args.cp_min_size, "penalty": args.cp_penalty, **k},
+        }
+        with stages.stage("detectors"):
+            apply_detectors(analysis, gaps, run_detectors(gaps, detectors, params))
+    _record_totals(registry, len(records_sorted), analysis)
+    if args.command == "stats":
+        analysis["p95_gap_seconds"] = float(np.percentile(gaps, 95))
+        return gap_summary(len(records_sorted), timestamps[0], timestamps[-1], analysis, args.std_k)
 
     # 输出路径
     os.makedirs(args.out_dir, exist_ok=True)
-    out_time = os.path.join(args.out_dir, "gaps_over_time.png")
-    out_hist = os.path.join(args.out_dir, "blob_gap_histogram.png")
-    out_md = os.path.join(args.out_dir, "blob_consistency_report.md")
-    out_csv = os.path.join(args.out_dir, "proof_list.csv")
-
-    # 可视化
-    print("Drawing timeline plot...")
-    create_time_plot(timestamps, gaps, analysis, save_path=out_time)
-    print("Drawing histogram...")
-    create_histogram(gaps, save_path=out_hist)
-
-    # 证明列表 + 报告
-    print("Saving proof list & report...")
-    records_sorted = sorted(records, key=lambda r: (r.time, r.height))
-    save_proof_list_csv(out_csv, records_sorted, gaps)
-    generate_report_md(out_md, records_sorted, timestamps, gaps, analysis, namespace_hint=args.namespace)
-
-    print("✅ Done.")
-    print(f"📈 Timeline: {out_time}")
-    print(f"📊 Histogram: {out_hist}")
-    print(f"📄 Report: {out_md}")
-    print(f"🧾 Proof CSV: {out_csv}")
-    print(f"Outliers (> mean + {args.std_k}*std): {analysis['outlier_count']}  |  Largest gap: {analysis['max_gap_seconds']/3600:.2f} h")
+    paths = {
+        "timeline": os.path.join(args.out_dir, f"gaps_over_time.{args.plot_format}"),
+        "histogram": os.path.join(args.out_dir, f"blob_gap_histogram.{args.plot_format}"),
+        "pyramid": os.path.join(args.out_dir, "gaps_interactive.html"),
+        "report": os.path.join(args.out_dir, "blob_consistency_report.md"),
+        "csv": os.path.join(args.out_dir, "proof_list.csv"),
+        "groups": os.path.join(args.out_dir, "group_summary.csv"),
+        "rollups": os.path.join(args.out_dir, "rollup_*.csv"),
+    }
+
+    # 分组分析（在未排序的原表上做，分组编码与行一一对应）
+    group_lines = None
+    if args.group_by and ("groups" in selected or "report" in selected):
+        print(f"Grouped analysis by {args.group_by}...")
+        with stages.stage("groups"):
+            codes, names = group_codes(records, ns_codes, ns_names, args.group_by)
+            group_stats = analyze_groups(records, codes, names, std_k=args.std_k)
+            group_lines = render_group_sections(records, group_stats, args.group_by,
+                                                csv_name=os.path.basename(paths["groups"]),
+                                                sections=args.group_sections)
+
+    # 吞吐与费用汇总（小时 / 天 / signer）：选了 rollups 时写出 CSV，并在报告中加上对应小节
+    rollup_stats = None
+    extra_sections = list(group_lines or [])
+    if "rollups" in selected:
+        with stages.stage("rollups"):
+            rollup_stats = compute_rollups(records)
+        extra_sections = render_rollup_sections(rollup_stats) + extra_sections
+
+    # 输出任务：相互独立，绘图放到子进程中与 CSV / 报告同时进行
+    tasks: Dict[str, OutputTask] = {}
+    if "timeline" in selected:
+        tasks["timeline"] = (create_time_plot, (timestamps, gaps, analysis, paths["timeline"]),
+                             dict(fast=args.fast_plot, dpi=args.dpi, annotate_top=args.annotate_top,
+                                  rasterized=args.rasterize))
+    if "histogram" in selected:
+        tasks["histogram"] = (create_histogram, (gaps, paths["histogram"]), dict(dpi=args.dpi))
+    if "pyramid" in selected:
+        tasks["pyramid"] = (write_gap_viewer, (paths["pyramid"], timestamps, gaps, analysis),
+                            dict(outliers=outlier_mask(gaps, analysis)))
+    if "report" in selected:
+        # 只有图片本次会生成或已经存在时才在报告中引用
+        images = all(name in selected or os.path.exists(paths[name]) for name in ("timeline", "histogram"))
+        viewer = "pyramid" in selected or os.path.exists(paths["pyramid"])
+        tasks["report"] = (generate_report_md, (paths["report"], records_sorted, timestamps, gaps, analysis),
+                           dict(namespace_hint=args.namespace, extra_sections=extra_sections,
+                                image_ext=args.plot_format, images=images, viewer=viewer))
+    if "csv" in selected:
+        tasks["csv"] = (save_proof_list_csv, (paths["csv"], records_sorted, gaps), {})
+    if "groups" in selected and args.group_by:
+        tasks["groups"] = (save_group_summary_csv, (paths["groups"], records, group_stats), {})
+    if "rollups" in selected:
+        tasks["rollups"] = (save_rollup_csvs, (args.out_dir, rollup_stats), {})
+
+    print(f"Writing outputs: {', '.join(tasks) or '(none)'}...")
+    t0 = time.perf_counter()
+    workers = args.output_workers if args.output_workers is not None else (os.cpu_count() or 1)
+    with stages.stage("outputs"):
+        timings = run_output_stage(tasks, workers=workers)
+    wall = time.perf_counter() - t0
+    output_seconds = registry.gauge("analyze_output_seconds", "Time to produce each output artifact", ("artifact",))
+    for name, seconds in timings.items():
+        output_seconds.set(seconds, artifact=name)
+
+    labels = {
+        "timeline": "📈 Timeline",
+        "histogram": "📊 Histogram",
+        "pyramid": "🗺️ Interactive timeline",
+        "report": "📄 Report",
+        "csv": "🧾 Proof CSV",
+        "groups": "👥 Group summary",
+        "rollups": "💰 Rollups",
+    }
+    print(f"✅ Done. Outputs took {wall:.2f} s wall ({sum(timings.values()):.2f} s total work).")
+    for name in OUTPUT_ARTIFACTS:
+        if name in timings:
+            print(f"{labels[name]}: {paths[name]}  ({timings[name]:.2f} s)")
+    if "detector" in analysis:
+        print(f"Outliers ({analysis['detector']}): {analysis['outlier_count']}  |  Largest gap: {analysis['max_gap_seconds']/3600:.2f} h")
+    else:
+        print(f"Outliers (> mean + {args.std_k}*std): {analysis['outlier_count']}  |  Largest gap: {analysis['max_gap_seconds']/3600:.2f} h")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+async_transport.py
+
+基于 httpx.AsyncClient 的 GET 传输层，作为 BlobDownloader 的可选后端（配置项 http_backend: "async"）。
+
+- 长连接池由 httpx 管理：pool_size 限制并发连接数，空闲超过 keepalive 秒的连接丢弃
+- 跟随重定向；遵守 HTTP_PROXY / HTTPS_PROXY / NO_PROXY 等代理环境变量
+- gzip / deflate 响应边收边解压（httpx 负责解码）
+- JSON 数组边收边解析（JsonArrayStream）：响应体不会整块留在内存中，峰值内存约为解析出的对象本身
+- 所有请求跑在一个后台事件循环线程上；get() 是阻塞接口，可以直接在下载器的线程池中调用，
+  fetch() 是协程接口
+"""
+
+import asyncio
+import codecs
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+class TransportError(Exception):
+    """连接、超时或协议错误（可重试）"""
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    headers: httpx.Headers             # 大小写不敏感的 .get()
+    data: Any                          # 解析后的 JSON；状态码 >= 400 时为 None
+    wire_bytes: int                    # 收到的响应体字节数（解压前）
+
+
+class JsonArrayStream:
+    """
+    增量 JSON 解析：顶层为数组时每收齐一个元素就解析出来，已解析的文本随即丢弃；
+    顶层不是数组时退化为收齐后整体 json.loads。
+    """
+
+    _WS = " \t\r\n"
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._state = "start"          # start / items / done / raw
+        self._raw: List[str] = []
+
+    def feed(self, text: str):
+        if self._state == "raw":
+            self._raw.append(text)
+            return
+        self._buf += text
+        self._parse(final=False)
+
+    def close(self) -> Any:
+        if self._state == "raw":
+            return json.loads("".join(self._raw))
+        self._parse(final=True)
+        if self._state != "done":
+            raise ValueError("JSON 数组不完整")
+        return self.items
+
+    def _parse(self, final: bool):
+        buf, pos, n = self._buf, 0, len(self._buf)
+        while True:
+            while pos < n and buf[pos] in self._WS:
+                pos += 1
+            if pos >= n:
+                break
+            if self._state == "start":
+                if buf[pos] != "[":
+                    self._state = "raw"
+                    self._raw.append(buf[pos:])
+                    pos = n
+                    break
+                self._state = "items"
+                pos += 1
+            elif self._state == "items":
+                c = buf[pos]
+                if c == "]":
+                    self._state = "done"
+                    pos += 1
+                elif c == ",":
+                    pos += 1
+                else:
+                    try:
+                        obj, end = self._decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if final:
+                            raise
+                        break               # 元素还没收齐
+                    if end == n and not final and not isinstance(obj, (dict, list)):
+                        break               # 数字等标量可能被截断，等下一块
+                    self.items.append(obj)
+                    pos = end
+            else:
+                if final:
+                    raise ValueError("JSON 数组之后还有多余内容")
+                break
+        self._buf = buf[pos:]
+
+
+class AsyncHttpTransport:
+    """
+    Args:
+        pool_size: 最大并发连接数（同时也是保留的空闲连接上限）
+        keepalive: 空闲连接保留秒数
+        headers: 每个请求附带的请求头
+        gzip: 是否声明 Accept-Encoding: gzip
+    """
+
+    def __init__(self, pool_size: int = 10, keepalive: float = 30.0,
+                 headers: Optional[Dict[str, str]] = None, gzip: bool = True):
+        self.pool_size = max(1, pool_size)
+        self.keepalive = keepalive
+        self.headers = dict(headers or {})
+        self.headers["Accept-Encoding"] = "gzip, deflate" if gzip else "identity"
+
+        self._loop = asyncio.new_event_loop()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-http", daemon=True)
+        self._thread.start()
+
+    # ------------------------------ 对外接口 ------------------------------
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30.0) -> HttpResponse:
+        """阻塞式 GET（可从任意线程调用）"""
+        return asyncio.run_coroutine_threadsafe(self.fetch(url, params, timeout), self._loop).result()
+
+    async def fetch(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30.0) -> HttpResponse:
+        """GET 协程，必须在本传输层的事件循环中运行（get() 会自动切换）"""
+        client = self._get_client()
+        try:
+            async with client.stream("GET", url, params=params, timeout=timeout) as response:
+                data = await self._read_json(response) if response.status_code < 400 else None
+                return HttpResponse(status=response.status_code, headers=response.headers,
+                                    data=data, wire_bytes=response.num_bytes_downloaded)
+        except httpx.TimeoutException as e:
+            raise TransportError(f"请求超时（{timeout}s）: {e!r}") from e
+        except httpx.HTTPError as e:
+            # 连接失败、连接中断、重定向过多、解压失败等
+            raise TransportError(f"{type(e).__name__}: {e}") from e
+
+    def close(self):
+        """关闭连接池并停止事件循环线程"""
+        async def _shutdown():
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    # ------------------------------ 内部 ------------------------------
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # 在事件循环线程中创建，连接池绑定到这个循环
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size,
+                                    keepalive_expiry=self.keepalive),
+                follow_redirects=True,
+                trust_env=True,
+            )
+        return self._client
+
+    @staticmethod
+    async def _read_json(response: httpx.Response) -> Any:
+        """边收边解压、边解析；响应体不是合法 JSON 时抛 ValueError（与 requests 的 response.json() 一致）"""
+        decode = codecs.getincrementaldecoder("utf-8")()
+        stream = JsonArrayStream()
+        async for block in response.aiter_bytes():
+            stream.feed(decode.decode(block))
+        stream.feed(decode.decode(b"", final=True))
+        return stream.close()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_http.py
+
+对比下载器的两个 HTTP 后端（http_backend = requests / async），服务端为子进程中的 mock_api.py
+（HTTP/1.1 长连接，可选 gzip），数据为合成 blob：
+- 串行与并发（max_in_flight）分页请求的吞吐
+- 客户端 CPU 时间（每个请求的客户端开销）
+- 单个大页请求期间 Python 堆的峰值（tracemalloc）
+
+用法：
+  python benchmarks/bench_http.py                                  # 20,000 条，页大小 100 / 1000
+  python benchmarks/bench_http.py --records 50000 --limits 100 1000 5000 --in_flight 8 --no_gzip
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_loader import write_batches  # noqa: E402
+from blob_downloader import BlobDownloader  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(data_dir: str, port: int, max_limit: int, use_gzip: bool) -> subprocess.Popen:
+    cmd = [sys.executable, os.path.join(ROOT, "mock_api.py"), "--data_dir", data_dir, "--port", str(port),
+           "--lead", "1e12", "--max_limit", str(max_limit)] + (["--gzip"] if use_gzip else [])
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    proc.stdout.readline()          # 启动后打印一行，之后即可连接
+    return proc
+
+
+def make_downloader(tmp: str, backend: str, port: int, limit: int, in_flight: int) -> BlobDownloader:
+    base = os.path.join(tmp, f"{backend}_{limit}_{in_flight}")
+    os.makedirs(base, exist_ok=True)
+    config = {
+        "api_base_url": f"http://127.0.0.1:{port}/v1/namespace/mock/0/blobs",
+        "max_retries": 1, "retry_delay": 0.1, "request_timeout": 30, "batch_size": limit,
+        "output_dir": os.path.join(base, "data"), "log_file": os.path.join(base, "dl.log"),
+        "progress_file": os.path.join(base, "progress.json"),
+        "rate_limit": 10_000, "rate_limit_max": 10_000, "max_in_flight": in_flight,
+        "http_backend": backend,
+    }
+    path = os.path.join(base, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    downloader = BlobDownloader(path)
+    downloader.logger.setLevel(logging.WARNING)
+    return downloader
+
+
+def fetch_all(downloader: BlobDownloader, records: int, limit: int, in_flight: int) -> tuple:
+    offsets = list(range(0, records, limit))
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    if in_flight > 1:
+        with ThreadPoolExecutor(max_workers=in_flight) as ex:
+            pages = list(ex.map(lambda o: downloader._make_api_request(o, limit), offsets))
+    else:
+        pages = [downloader._make_api_request(o, limit) for o in offsets]
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    got = sum(len(p) for p in pages if p)
+    assert got == records, (got, records)
+    return wall, cpu, len(offsets)
+
+
+def peak_page_memory(downloader: BlobDownloader, limit: int) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    data = downloader._make_api_request(0, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert data and len(data) == limit
+    return peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark requests vs async HTTP backends against mock_api.py.")
+    ap.add_argument("--records", type=int, default=20_000)
+    ap.add_argument("--limits", type=int, nargs="+", default=[100, 1000])
+    ap.add_argument("--in_flight", type=int, default=4, help="并发测试的在途请求数")
+    ap.add_argument("--no_gzip", action="store_true", help="服务端不压缩响应")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "mock_data")
+        os.makedirs(data_dir)
+        write_batches(data_dir, args.records, 1000, seed=args.seed)
+        port = free_port()
+        proc = start_mock(data_dir, port, max(args.limits), not args.no_gzip)
+        try:
+            print(f"{args.records} records, gzip={'off' if args.no_gzip else 'on'}")
+            print(f"{'backend':>9} {'limit':>6} {'in_flight':>9} | {'wall s':>7} {'req/s':>8} "
+                  f"{'client CPU ms/req':>17} | {'peak MB/page':>12}")
+            for limit in args.limits:
+                for in_flight in (1, args.in_flight):
+                    for backend in ("requests", "async"):
+                        d = make_downloader(tmp, backend, port, limit, in_flight)
+                        fetch_all(d, min(args.records, limit * 4), limit, in_flight)   # 预热连接
+                        wall, cpu, n = fetch_all(d, args.records, limit, in_flight)
+                        peak = peak_page_memory(d, limit) if in_flight == 1 else None
+                        peak_s = f"{peak / 2**20:12.2f}" if peak is not None else f"{'-':>12}"
+                        print(f"{backend:>9} {limit:>6} {in_flight:>9} | {wall:7.2f} {n / wall:8.1f} "
+                              f"{cpu / n * 1000:17.2f} | {peak_s}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_loader.py
+
+对比 analyze_blobs 的两条加载路径：
+- tolerant：json_fragments_to_list + normalize_record（原有容错路径）
+- strict  ：parse_batch_strict，直接解析为 NumPy 列
+
+用法：
+  python benchmarks/bench_loader.py                       # 默认 1,000,000 条
+  python benchmarks/bench_loader.py --records 200000 --batch_size 1000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_blobs  # noqa: E402
+import synth_blobs  # noqa: E402
+
+
+def write_batches(out_dir: str, records: int, batch_size: int, seed: int = 0) -> list:
+    """按下载器的格式（newest-first、indent=2）写出批次文件，数据来自 synth_blobs"""
+    cols = synth_blobs.generate_columns(records, seed=seed)
+    return synth_blobs.write_batches(out_dir, cols, batch_size, indent=2, seed=seed)
+
+
+def bench(files: list) -> dict:
+    t0 = time.perf_counter()
+    n_tol = 0
+    for fp in files:
+        with open(fp, "r", encoding="utf-8") as f:
+            text = f.read()
+        n_tol += len([analyze_blobs.normalize_record(o) for o in analyze_blobs.json_fragments_to_list(text)])
+    t_tol = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    signer_index = {}
+    n_strict = 0
+    for fp in files:
+        with open(fp, "r", encoding="utf-8") as f:
+            text = f.read()
+        n_strict += analyze_blobs.parse_batch_strict(text, signer_index)["id"].size
+    t_strict = time.perf_counter() - t0
+
+    return {"records": n_tol, "tolerant_s": t_tol, "strict_s": t_strict,
+            "speedup": t_tol / t_strict if t_strict > 0 else float("inf"),
+            "strict_records": n_strict}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark strict vs tolerant batch loaders.")
+    ap.add_argument("--records", type=int, default=1_000_000)
+    ap.add_argument("--batch_size", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.records} records ...")
+        files = write_batches(tmp, args.records, args.batch_size, seed=args.seed)
+        res = bench(files)
+
+    print(f"records   : {res['records']}")
+    print(f"tolerant  : {res['tolerant_s']:.2f} s  ({res['records'] / res['tolerant_s']:,.0f} rec/s)")
+    print(f"strict    : {res['strict_s']:.2f} s  ({res['records'] / res['strict_s']:,.0f} rec/s)")
+    print(f"speedup   : {res['speedup']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
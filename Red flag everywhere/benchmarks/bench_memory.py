@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_memory.py
+
+对比 List[BlobRecord] 与 BlobTable 每条记录占用的内存（tracemalloc 统计）。
+
+用法：
+  python benchmarks/bench_memory.py --records 1000000 --signers 20
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth_blobs  # noqa: E402
+from analyze_blobs import BlobRecord, BlobTable  # noqa: E402
+
+
+def make_records(n: int, n_signers: int, seed: int = 0) -> list:
+    """模拟逐条解析得到的记录（数据来自 synth_blobs）：每条 signer 都是独立的字符串对象"""
+    cols = synth_blobs.generate_columns(n, signers=n_signers, seed=seed)
+    times = cols["time"].view("datetime64[ns]").astype("datetime64[us]").tolist()
+    signers = cols["signers"][cols["signer_code"]]
+    out = []
+    for bid, t, h, s in zip(cols["id"].tolist(), times, cols["height"].tolist(), signers):
+        # 从 JSON 解析出来的字符串不会共享，这里用切片拷贝模拟
+        out.append(BlobRecord(id=bid, time=t, height=h, signer=s[:1] + s[1:]))
+    return out
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bytes per record: List[BlobRecord] vs BlobTable.")
+    ap.add_argument("--records", type=int, default=1_000_000)
+    ap.add_argument("--signers", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    n = args.records
+    list_bytes = measure(lambda: make_records(n, args.signers, args.seed))
+
+    records = make_records(n, args.signers, args.seed)
+    table_bytes = measure(lambda: BlobTable.from_records(records))
+
+    print(f"records            : {n}")
+    print(f"List[BlobRecord]   : {list_bytes / n:8.1f} bytes/record  ({list_bytes / 2**20:.1f} MiB)")
+    print(f"BlobTable          : {table_bytes / n:8.1f} bytes/record  ({table_bytes / 2**20:.1f} MiB)")
+    print(f"reduction          : {list_bytes / table_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_plot.py
+
+create_time_plot 的渲染耗时与文件大小随点数的变化：普通模式 vs 快速模式（--fast_plot）。
+约 0.5% 的间隔为异常，用于体现逐点标注的开销。
+
+用法：
+  python benchmarks/bench_plot.py                                  # 10^3 .. 10^6
+  python benchmarks/bench_plot.py --points 1000 100000 --dpi 150 --format svg
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_blobs  # noqa: E402
+import synth_blobs  # noqa: E402
+
+
+def make_series(n: int, seed: int):
+    """n 个间隔（n + 1 个时间点），约 0.5% 为 10 分钟到 2 小时的停摆"""
+    cols = synth_blobs.generate_columns(n + 1, mean_gap=30.0, outages=max(1, n // 200),
+                                        outage_hours=(1 / 6, 2.0), seed=seed)
+    timestamps = cols["time"].view("datetime64[ns]")
+    gaps = np.diff(cols["time"]) / 1e9
+    return timestamps, gaps
+
+
+def render(timestamps, gaps, path: str, **kwargs) -> tuple:
+    analysis = analyze_blobs.analyze_gaps(gaps)
+    t0 = time.perf_counter()
+    analyze_blobs.create_time_plot(timestamps, gaps, analysis, save_path=path, **kwargs)
+    return time.perf_counter() - t0, os.path.getsize(path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark create_time_plot render time vs point count.")
+    ap.add_argument("--points", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    ap.add_argument("--dpi", type=int, default=300)
+    ap.add_argument("--format", choices=["png", "svg"], default="png")
+    ap.add_argument("--max_normal", type=int, default=100_000,
+                    help="普通模式只测到该点数（更大时需要数分钟）")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"{'points':>10} {'outliers':>9} | {'normal s':>9} {'normal MB':>10} | {'fast s':>7} {'fast MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.points:
+            timestamps, gaps = make_series(n, args.seed + n)
+            n_out = analyze_blobs.analyze_gaps(gaps)["outlier_count"]
+            path = os.path.join(tmp, f"plot.{args.format}")
+            if n <= args.max_normal:
+                t_norm, size_norm = render(timestamps, gaps, path, dpi=args.dpi)
+                normal = f"{t_norm:9.2f} {size_norm / 2**20:10.2f}"
+            else:
+                normal = f"{'-':>9} {'-':>10}"
+            t_fast, size_fast = render(timestamps, gaps, path, fast=True, dpi=args.dpi,
+                                       rasterized=args.format == "svg")
+            print(f"{n:>10} {n_out:>9} | {normal} | {t_fast:7.2f} {size_fast / 2**20:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_suite.py
+
+端到端基准：用 synth_blobs 生成数据，逐阶段计时并记录峰值 RSS，结果存成 JSON，便于不同版本之间对比。
+
+每个规模在独立的子进程中运行（峰值 RSS 与内存碎片互不影响），依次执行：
+  generate    synth_blobs.generate_columns
+  write       写批次文件（不属于分析流程；仅规模 <= --max_file_records）
+  load        analyze_blobs.load_from_data_dir（仅规模 <= --max_file_records，更大的规模直接用生成的列）
+  dedupe      unique_rows
+  sort        BlobTable.sorted_by_time
+  gaps        gaps_from_sorted
+  analyze     analyze_gaps
+  detectors   run_detectors（--detectors）
+  groups      按 signer 分组（analyze_groups）
+  rollups     compute_rollups
+  csv         save_proof_list_csv
+  report      generate_report_md
+  timeline    create_time_plot，快速模式；普通模式为 timeline_full（仅规模 <= --max_full_plot）
+  histogram   create_histogram
+  pyramid     gap_pyramid.write_gap_viewer（间隔金字塔 + 交互式时间线 HTML）
+  download    BlobDownloader.download_all_blobs，服务端为子进程中的 mock_api（仅规模 <= --max_download_records）
+
+另外测量冷启动（全新解释器，data/ 中的样例数据，取 --cold_start 次中最快的一次，峰值 RSS 来自 wait4）：
+  import      python -c "import analyze_blobs"
+  stats       python analyze_blobs.py stats（不导入 matplotlib）
+  report      python analyze_blobs.py report
+  plot        python analyze_blobs.py plot --fast_plot（包含 matplotlib 的导入）
+结果中记为 records = 0 的一组，与各规模一样参与对比。
+
+峰值 RSS：Linux 上每个阶段开始前写 /proc/self/clear_refs 重置 VmHWM，得到的是该阶段期间的峰值；
+其他平台退回 ru_maxrss（进程启动以来的峰值）。
+
+用法：
+  python benchmarks/bench_suite.py                                         # 10^4 .. 10^7
+  python benchmarks/bench_suite.py --sizes 10000 100000 --out before.json
+  python benchmarks/bench_suite.py --sizes 10000 100000 --out after.json --compare before.json
+  python benchmarks/bench_suite.py --compare after.json --against before.json   # 只对比，不运行
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_blobs  # noqa: E402
+import synth_blobs  # noqa: E402
+from detectors import run_detectors  # noqa: E402
+from gap_pyramid import write_gap_viewer  # noqa: E402
+from metrics import PeakRSS  # noqa: E402
+
+
+RESULT_VERSION = 1
+
+
+# ============================== 阶段计时 ==============================
+
+class StageTimer:
+    def __init__(self):
+        self.rss = PeakRSS()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def run(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        gc.collect()
+        self.rss.reset()
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        seconds = time.perf_counter() - t0
+        self.stages[name] = {"seconds": seconds, "peak_rss_mb": self.rss.peak_mb()}
+        print(f"  {name:<14} {seconds:9.3f} s  {self.stages[name]['peak_rss_mb']:9.1f} MB", file=sys.stderr)
+        return out
+
+
+# ============================== 单个规模 ==============================
+
+def run_download(timer: StageTimer, tmp: str, data_dir: str, records: int, in_flight: int):
+    from bench_http import free_port, start_mock
+    from blob_downloader import BlobDownloader
+
+    port = free_port()
+    proc = start_mock(data_dir, port, 100, use_gzip=False)
+    try:
+        base = os.path.join(tmp, "download")
+        os.makedirs(base)
+        config = {
+            "api_base_url": f"http://127.0.0.1:{port}/v1/namespace/bench/0/blobs",
+            "max_retries": 1, "retry_delay": 0.1, "request_timeout": 30, "batch_size": 100,
+            "output_dir": os.path.join(base, "data"), "log_file": os.path.join(base, "dl.log"),
+            "progress_file": os.path.join(base, "progress.json"),
+            "rate_limit": 10_000, "rate_limit_max": 10_000, "max_in_flight": in_flight,
+        }
+        downloader = BlobDownloader(config=config)
+        downloader.logger.setLevel(logging.WARNING)
+        timer.run("download", downloader.download_all_blobs)
+        got = downloader.progress["total_downloaded"]
+        assert got == records, (got, records)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run_size(args, records: int) -> Dict[str, Any]:
+    timer = StageTimer()
+    from_files = records <= args.max_file_records
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp:
+        cols = timer.run("generate", synth_blobs.generate_columns, records, signers=args.signers,
+                         gap=args.gap, outages=args.outages, seed=args.seed)
+        data_dir = os.path.join(tmp, "data")
+        if from_files:
+            timer.run("write", synth_blobs.write_batches, data_dir, cols, args.batch_size, args.format)
+            del cols
+            table = timer.run("load", analyze_blobs.load_from_data_dir, data_dir, workers=args.workers)
+        else:
+            table = timer.run("load", synth_blobs.columns_to_table, cols)
+            del cols
+
+        keep = timer.run("dedupe", analyze_blobs.unique_rows, table)
+        table = table.take(keep)
+        table_sorted = timer.run("sort", table.sorted_by_time)
+        gaps, timestamps = timer.run("gaps", analyze_blobs.gaps_from_sorted, table_sorted)
+        analysis = timer.run("analyze", analyze_blobs.analyze_gaps, gaps)
+        detection = timer.run("detectors", run_detectors, gaps, args.detectors.split(","), {})
+        analyze_blobs.apply_detectors(analysis, gaps, detection)
+        timer.run("groups", analyze_blobs.analyze_groups, table, table.signer_code, table.signers)
+        rollups = timer.run("rollups", analyze_blobs.compute_rollups, table)
+
+        out = os.path.join(tmp, "out")
+        timer.run("csv", analyze_blobs.save_proof_list_csv, os.path.join(out, "proof_list.csv"), table_sorted, gaps)
+        timer.run("report", analyze_blobs.generate_report_md, os.path.join(out, "report.md"), table_sorted,
+                  timestamps, gaps, analysis, extra_sections=analyze_blobs.render_rollup_sections(rollups))
+        timer.run("timeline", analyze_blobs.create_time_plot, timestamps, gaps, analysis,
+                  os.path.join(out, "timeline.png"), fast=True, dpi=args.dpi)
+        if records <= args.max_full_plot:
+            timer.run("timeline_full", analyze_blobs.create_time_plot, timestamps, gaps, analysis,
+                      os.path.join(out, "timeline_full.png"), dpi=args.dpi)
+        timer.run("histogram", analyze_blobs.create_histogram, gaps, os.path.join(out, "histogram.png"), dpi=args.dpi)
+        timer.run("pyramid", write_gap_viewer, os.path.join(out, "gaps_interactive.html"), timestamps, gaps, analysis,
+                  outliers=analyze_blobs.outlier_mask(gaps, analysis))
+
+        if from_files and args.format == "json" and records <= args.max_download_records:
+            del table, table_sorted, gaps, timestamps
+            run_download(timer, tmp, data_dir, records, args.in_flight)
+
+    return {
+        "records": records,
+        "source": args.format if from_files else "memory",
+        "rss_per_stage": timer.rss.resettable,
+        "stages": timer.stages,
+    }
+
+
+# ============================== 冷启动 ==============================
+
+def _run_child(cmd: List[str], cwd: str) -> Dict[str, float]:
+    """运行一个子进程，返回墙钟时间与该子进程自己的峰值 RSS"""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} 退出码 {proc.returncode}")
+    return {"seconds": seconds, "peak_rss_mb": usage.ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 1024)}
+
+
+def run_cold_start(repeats: int) -> Dict[str, Any]:
+    """各入口在全新解释器中的启动 + 运行时间（取最快的一次）"""
+    data_dir = os.path.join(ROOT, "data")
+    with tempfile.TemporaryDirectory(prefix="bench_cold_") as out:
+        cli = [sys.executable, "analyze_blobs.py"]
+        common = ["--result_json", "none", "--data_dir", data_dir, "--out_dir", out]
+        commands = {
+            "import": [sys.executable, "-c", "import analyze_blobs"],
+            "stats": cli + ["stats"] + common,
+            "report": cli + ["report"] + common,
+            "plot": cli + ["plot"] + common + ["--fast_plot", "--dpi", "50"],
+        }
+        stages = {}
+        for name, cmd in commands.items():
+            runs = [_run_child(cmd, ROOT) for _ in range(repeats)]
+            stages[name] = min(runs, key=lambda r: r["seconds"])
+            print(f"  {name:<14} {stages[name]['seconds']:9.3f} s  {stages[name]['peak_rss_mb']:9.1f} MB",
+                  file=sys.stderr)
+    return {"records": 0, "source": "cold start", "rss_per_stage": True, "stages": stages}
+
+
+# ============================== 结果与对比 ==============================
+
+def run_meta(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "version": RESULT_VERSION,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("worker", "worker_out")},
+    }
+
+
+def _by_key(results: Dict[str, Any]) -> Dict[tuple, Dict[str, float]]:
+    return {(r["records"], name): s for r in results["runs"] for name, s in r["stages"].items()}
+
+
+def print_results(results: Dict[str, Any]):
+    for r in results["runs"]:
+        if r["records"]:
+            print(f"\n{r['records']:,} records (source: {r['source']})")
+        else:
+            print(f"\nCold start (fresh interpreter, data/ sample, best of {results['meta']['args'].get('cold_start')})")
+        print(f"  {'stage':<14} {'seconds':>9} {'rec/s':>12} {'peak RSS MB':>12}")
+        for name, s in r["stages"].items():
+            # 内存数据源的 load 阶段只是取用已生成的列，速率没有意义
+            skip = not r["records"] or s["seconds"] <= 0 or (name == "load" and r["source"] == "memory")
+            rate = f"{'-':>12}" if skip else f"{r['records'] / s['seconds']:12,.0f}"
+            print(f"  {name:<14} {s['seconds']:9.3f} {rate} {s['peak_rss_mb']:12.1f}")
+
+
+def print_comparison(new: Dict[str, Any], old: Dict[str, Any]):
+    """逐 (规模, 阶段) 对比耗时与峰值 RSS；比值 > 1 表示新结果更慢 / 更大"""
+    a, b = _by_key(old), _by_key(new)
+    common = [k for k in b if k in a]
+    print(f"\nComparison: {new['meta'].get('commit')} vs {old['meta'].get('commit')} "
+          f"({len(common)} stages in common)")
+    print(f"  {'records':>10} {'stage':<14} {'old s':>9} {'new s':>9} {'ratio':>7} {'old MB':>9} {'new MB':>9}")
+    for k in common:
+        o, n = a[k], b[k]
+        ratio = n["seconds"] / o["seconds"] if o["seconds"] > 0 else float("inf")
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        label = f"{k[0]:,}" if k[0] else "cold"
+        print(f"  {label:>10} {k[1]:<14} {o['seconds']:9.3f} {n['seconds']:9.3f} {ratio:7.2f} "
+              f"{o['peak_rss_mb']:9.1f} {n['peak_rss_mb']:9.1f}{flag}")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ============================== 主流程 ==============================
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end benchmark suite for the downloader and analyzer.")
+    ap.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000, 10_000_000],
+                    help="记录数规模（不给值时只测冷启动）")
+    ap.add_argument("--out", type=str, default="bench_results.json", help="结果 JSON 路径")
+    ap.add_argument("--compare", type=str, default=None, help="与这份之前的结果 JSON 对比")
+    ap.add_argument("--against", type=str, default=None,
+                    help="不运行基准，只对比两份结果：--compare 新 --against 旧")
+    ap.add_argument("--max_file_records", type=int, default=1_000_000,
+                    help="超过此规模不写批次文件，load 阶段直接使用生成的列（默认 10^6）")
+    ap.add_argument("--max_full_plot", type=int, default=100_000, help="普通模式时间线图的最大规模")
+    ap.add_argument("--max_download_records", type=int, default=100_000, help="download 阶段的最大规模")
+    ap.add_argument("--format", choices=["json", "ndjson", "npz"], default="json", help="批次文件格式")
+    ap.add_argument("--batch_size", type=int, default=100)
+    ap.add_argument("--signers", type=int, default=10)
+    ap.add_argument("--gap", choices=synth_blobs.GAP_DISTRIBUTIONS, default="exponential")
+    ap.add_argument("--outages", type=int, default=5)
+    ap.add_argument("--detectors", type=str, default="std,mad")
+    ap.add_argument("--workers", type=int, default=1, help="load 阶段的解析进程数")
+    ap.add_argument("--in_flight", type=int, default=4, help="download 阶段的在途请求数")
+    ap.add_argument("--dpi", type=int, default=150)
+    ap.add_argument("--cold_start", type=int, default=5, help="冷启动测量的重复次数，取最快的一次（0 为跳过）")
+    ap.add_argument("--tmp_dir", type=str, default=None, help="临时数据目录（默认系统临时目录）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--worker_out", type=str, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.against:
+        if not args.compare:
+            ap.error("--against 需要与 --compare 一起使用")
+        print_comparison(load_results(args.compare), load_results(args.against))
+        return
+
+    if args.worker is not None:
+        result = run_size(args, args.worker)
+        with open(args.worker_out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    results = {"meta": run_meta(args), "runs": []}
+
+    # 每组结果出来就落盘，长时间运行中断时保留已有结果
+    def save():
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.cold_start > 0:
+        print("[cold start]", file=sys.stderr)
+        results["runs"].append(run_cold_start(args.cold_start))
+        save()
+    for records in args.sizes:
+        print(f"[{records:,} records]", file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tf:
+            worker_out = tf.name
+        try:
+            cmd = [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+                   "--worker", str(records), "--worker_out", worker_out]
+            proc = subprocess.run(cmd)
+            if proc.returncode != 0:
+                print(f"[WARN] {records} 条的基准失败（退出码 {proc.returncode}），跳过", file=sys.stderr)
+                continue
+            results["runs"].append(load_results(worker_out))
+        finally:
+            os.unlink(worker_out)
+        save()
+
+    print_results(results)
+    print(f"\nResults: {args.out}")
+    if args.compare:
+        print_comparison(results, load_results(args.compare))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_writer.py
+
+下载器写入路径的吞吐与磁盘占用：逐页调用 BlobDownloader._commit_batch（写数据 + 保存进度），
+不发网络请求。对比：
+- json        ：每页一个 indent=2 的 JSON 文件，每页保存进度（原有写法，进度改为原子写入）
+- npz         ：每页一个列式分段
+- ndjson      ：追加写 gzip NDJSON 分段，每页保存进度
+- ndjson+5s   ：同上，progress_interval = 5 秒
+并给出 analyze_blobs.load_from_data_dir 读回的耗时。
+
+用法：
+  python benchmarks/bench_writer.py                          # 默认 200,000 条，每页 100 条
+  python benchmarks/bench_writer.py --records 1000000 --batch_size 100 --segment_mb 64
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_blobs  # noqa: E402
+import synth_blobs  # noqa: E402
+from blob_downloader import BlobDownloader  # noqa: E402
+
+
+VARIANTS = {
+    "json": {"output_format": "json"},
+    "npz": {"output_format": "npz"},
+    "ndjson": {"output_format": "ndjson"},
+    "ndjson+5s": {"output_format": "ndjson", "progress_interval": 5},
+}
+
+
+def make_pages(records: int, batch_size: int, seed: int = 0) -> list:
+    """与下载器收到的分页相同：第 0 页最新，每页内时间降序（数据来自 synth_blobs）"""
+    cols = synth_blobs.generate_columns(records, seed=seed)
+    return [list(synth_blobs.iter_blobs(cols, max(0, hi - batch_size), hi, seed=seed))[::-1]
+            for hi in range(records, 0, -batch_size)]
+
+
+def dir_size(path: str) -> tuple:
+    files = [os.path.join(path, f) for f in os.listdir(path)]
+    return sum(os.path.getsize(f) for f in files), len(files)
+
+
+def run_variant(tmp: str, name: str, extra: dict, pages: list, segment_mb: float) -> dict:
+    base = os.path.join(tmp, name)
+    os.makedirs(base)
+    config = {
+        "api_base_url": "http://127.0.0.1:1/v1/namespace/bench/0/blobs",
+        "max_retries": 0, "retry_delay": 0, "request_timeout": 1, "batch_size": len(pages[0]),
+        "output_dir": os.path.join(base, "data"), "log_file": os.path.join(base, "dl.log"),
+        "progress_file": os.path.join(base, "progress.json"), "segment_max_mb": segment_mb,
+        **extra,
+    }
+    cfg_path = os.path.join(base, "config.json")
+    with open(cfg_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    downloader = BlobDownloader(cfg_path)
+    downloader.logger.setLevel(logging.WARNING)
+    pbar = tqdm(disable=True)
+    offset = 0
+    t0 = time.perf_counter()
+    for page in pages:
+        downloader._commit_batch(page, offset, pbar)
+        offset += len(page)
+    downloader._finalize()
+    write_s = time.perf_counter() - t0
+
+    size, n_files = dir_size(config["output_dir"])
+    t0 = time.perf_counter()
+    table = analyze_blobs.load_from_data_dir(config["output_dir"])
+    read_s = time.perf_counter() - t0
+    assert len(table) == offset, (name, len(table), offset)
+    return {"write_s": write_s, "bytes": size, "files": n_files, "read_s": read_s}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark downloader write path: json / npz / ndjson.gz.")
+    ap.add_argument("--records", type=int, default=200_000)
+    ap.add_argument("--batch_size", type=int, default=100)
+    ap.add_argument("--segment_mb", type=float, default=64.0, help="NDJSON 分段轮转大小（MB）")
+    ap.add_argument("--variants", type=str, default=",".join(VARIANTS), help="逗号分隔的对比项")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"Generating {args.records} records ({args.batch_size}/page) ...")
+    pages = make_pages(args.records, args.batch_size, args.seed)
+
+    print(f"{'variant':>10} | {'write s':>8} {'pages/s':>9} {'rec/s':>10} | {'MB':>8} {'files':>6} | {'read s':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.variants.split(","):
+            r = run_variant(tmp, name, VARIANTS[name], pages, args.segment_mb)
+            print(f"{name:>10} | {r['write_s']:8.2f} {len(pages) / r['write_s']:9,.0f} "
+                  f"{args.records / r['write_s']:10,.0f} | {r['bytes'] / 2**20:8.1f} {r['files']:6d} | "
+                  f"{r['read_s']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
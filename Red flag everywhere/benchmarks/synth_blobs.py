@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+synth_blobs.py
+
+合成 Celestia blob 数据，字段结构与下载器写出的 blob_batch_0.json 相同
+（id / commitment / size / height / time / content_type / tx{...} / signer.hash）。
+
+- 发布间隔分布：exponential（泊松发布）、lognormal、periodic（固定间隔 + 抖动）、pareto（重尾）
+- 注入停摆：在随机位置插入若干个长间隔（--outages，时长在 --outage_hours 区间内均匀分布）
+- signer 个数与倾斜度可调（Zipf 权重，--signer_skew 0 为均匀）
+- size / gas / fee 按 PayForBlobs 的大致关系生成：gas_wanted ≈ (固定开销 + 8 gas/字节) × 1.1，
+  fee = gas_wanted × 0.002 utia
+- 输出格式与下载器一致：json（每页一个文件，newest-first）、ndjson（gzip 分段）、npz（列式分段）
+
+整列用 NumPy 向量化生成；generate_columns / columns_to_table 也可以不落盘，直接得到 BlobTable。
+
+用法：
+  python benchmarks/synth_blobs.py --out_dir /tmp/synth --records 100000
+  python benchmarks/synth_blobs.py --out_dir /tmp/synth --records 1000000 --signers 20 --gap lognormal \
+      --outages 5 --outage_hours 2 48 --format ndjson
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import blob_store  # noqa: E402
+from analyze_blobs import BlobTable  # noqa: E402
+
+
+GAP_DISTRIBUTIONS = ("exponential", "lognormal", "periodic", "pareto")
+
+# PayForBlobs 的 gas 估算（与 celestia-app 的默认参数同一量级）
+_GAS_FIXED = 65_000
+_GAS_PER_BYTE = 8
+_GAS_PRICE = 0.002          # utia / gas
+
+
+def sample_gaps(rng: np.random.Generator, n: int, dist: str, mean: float) -> np.ndarray:
+    """n 个发布间隔（秒），均值约为 mean"""
+    if dist == "exponential":
+        return rng.exponential(mean, n)
+    if dist == "lognormal":
+        sigma = 0.8
+        return rng.lognormal(np.log(mean) - sigma ** 2 / 2, sigma, n)
+    if dist == "periodic":
+        return np.maximum(mean + rng.normal(0.0, mean * 0.05, n), 0.0)
+    if dist == "pareto":
+        alpha = 2.5
+        return (rng.pareto(alpha, n) + 1.0) * mean * (alpha - 1) / alpha
+    raise ValueError(f"未知的间隔分布: {dist}（可选 {','.join(GAP_DISTRIBUTIONS)}）")
+
+
+def generate_columns(records: int,
+                     signers: int = 3,
+                     signer_skew: float = 1.0,
+                     gap: str = "exponential",
+                     mean_gap: float = 12.0,
+                     outages: int = 0,
+                     outage_hours: tuple = (1.0, 24.0),
+                     start: str = "2024-01-01T00:00:00",
+                     block_time: float = 12.0,
+                     seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    按时间升序生成整列数据
+
+    Returns:
+        dict：id / height / time（epoch 纳秒）/ size / fee / gas_used / gas_wanted / position /
+        signer_code（int32）与 signers（地址表），以及 outage_rows（停摆之后第一条记录的行号）
+    """
+    rng = np.random.default_rng(seed)
+    gaps = sample_gaps(rng, records, gap, mean_gap)
+    gaps[0] = 0.0
+    outage_rows = np.sort(rng.choice(np.arange(1, max(records, 2)), min(outages, max(records - 1, 0)),
+                                     replace=False))
+    gaps[outage_rows] += rng.uniform(outage_hours[0], outage_hours[1], outage_rows.size) * 3600.0
+
+    t0 = np.datetime64(start, "ns").astype(np.int64)
+    # API 的时间精度为微秒
+    offset_ns = np.cumsum(gaps * 1e6).astype(np.int64) * 1000
+    time_ns = t0 + offset_ns
+    height = 1_000_000 + offset_ns // int(block_time * 1e9)
+
+    weights = 1.0 / np.arange(1, signers + 1) ** signer_skew
+    signer_code = rng.choice(signers, records, p=weights / weights.sum()).astype(np.int32)
+    addresses = np.array([f"celestia1{rng.bytes(19).hex()}" for _ in range(signers)], dtype=object)
+
+    size = np.clip(rng.lognormal(np.log(100_000), 0.9, records), 512, 1_900_000).astype(np.int64)
+    gas_wanted = ((_GAS_FIXED + _GAS_PER_BYTE * size) * rng.uniform(1.05, 1.2, records)).astype(np.int64)
+    gas_used = (gas_wanted * rng.uniform(0.85, 0.99, records)).astype(np.int64)
+    return {
+        "id": 10_000_000 + np.arange(records, dtype=np.int64),
+        "height": height,
+        "time": time_ns,
+        "size": size,
+        "fee": np.ceil(gas_wanted * _GAS_PRICE).astype(np.int64),
+        "gas_used": gas_used,
+        "gas_wanted": gas_wanted,
+        "position": rng.integers(0, 4, records).astype(np.int64),
+        "signer_code": signer_code,
+        "signers": addresses,
+        "outage_rows": outage_rows,
+    }
+
+
+def columns_to_table(cols: Dict[str, np.ndarray]) -> BlobTable:
+    """不经过 JSON，直接得到与加载结果相同的 BlobTable（行顺序为时间升序）"""
+    return BlobTable(signers=cols["signers"], **{c: cols[c] for c in BlobTable.ROW_COLUMNS})
+
+
+def iter_blobs(cols: Dict[str, np.ndarray], lo: int, hi: int, seed: int = 0) -> Iterator[dict]:
+    """第 lo..hi-1 行的 API 记录（dict），结构与 blob_batch_0.json 相同"""
+    rng = np.random.default_rng([seed, lo])
+    n = hi - lo
+    times = np.datetime_as_string(cols["time"][lo:hi].view("datetime64[ns]").astype("datetime64[us]"), unit="us")
+    commitments = rng.bytes(32 * n)
+    hashes = rng.bytes(32 * n).hex()
+    signers = cols["signers"][cols["signer_code"][lo:hi]]
+    fields = [cols[c][lo:hi].tolist() for c in ("id", "height", "size", "fee", "gas_used", "gas_wanted", "position")]
+    for i, (bid, h, size, fee, gas_used, gas_wanted, pos) in enumerate(zip(*fields)):
+        t = str(times[i]) + "Z"
+        yield {
+            "id": bid,
+            "commitment": base64.b64encode(commitments[32 * i:32 * i + 32]).decode("ascii"),
+            "size": size,
+            "height": h,
+            "time": t,
+            "content_type": "application/octet-stream",
+            "tx": {
+                "id": 4_000_000 + bid - 10_000_000,
+                "height": h,
+                "position": pos,
+                "gas_wanted": gas_wanted,
+                "gas_used": gas_used,
+                "timeout_height": 0,
+                "events_count": 9,
+                "messages_count": 1,
+                "hash": hashes[64 * i:64 * i + 64],
+                "fee": str(fee),
+                "time": t,
+                "message_types": ["MsgPayForBlobs"],
+                "status": "success",
+            },
+            "signer": {"hash": signers[i]},
+        }
+
+
+def write_batches(out_dir: str,
+                  cols: Dict[str, np.ndarray],
+                  batch_size: int = 100,
+                  fmt: str = "json",
+                  indent: int = None,
+                  seed: int = 0) -> List[str]:
+    """
+    按下载器的方式写出：最新的记录在第 0 页（newest-first），每页内时间降序
+
+    Args:
+        fmt: json（每页一个文件）/ ndjson（gzip 分段）/ npz（每页一个列式分段）
+        indent: json 的缩进；下载器用 2，默认 None（紧凑，生成快得多）
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    n = cols["id"].size
+    writer = blob_store.NdjsonSegmentWriter(out_dir) if fmt == "ndjson" else None
+    files = []
+    try:
+        for b, hi in enumerate(range(n, 0, -batch_size)):
+            lo = max(0, hi - batch_size)
+            page = list(iter_blobs(cols, lo, hi, seed=seed))[::-1]
+            if fmt == "json":
+                fp = os.path.join(out_dir, f"blob_batch_{b}.json")
+                with open(fp, "w", encoding="utf-8") as f:
+                    json.dump(page, f, indent=indent, ensure_ascii=False)
+                files.append(fp)
+            elif fmt == "npz":
+                fp = os.path.join(out_dir, f"blob_batch_{b}.npz")
+                blob_store.save_segment(fp, page)
+                files.append(fp)
+            elif fmt == "ndjson":
+                fp = writer.write(page)
+                if not files or files[-1] != fp:
+                    files.append(fp)
+            else:
+                raise ValueError(f"未知的输出格式: {fmt}")
+    finally:
+        if writer is not None:
+            writer.close()
+    return files
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic Celestia blob batch files.")
+    ap.add_argument("--out_dir", type=str, required=True)
+    ap.add_argument("--records", type=int, default=100_000)
+    ap.add_argument("--batch_size", type=int, default=100, help="每页条数（默认 100，与下载器一致）")
+    ap.add_argument("--format", choices=["json", "ndjson", "npz"], default="json")
+    ap.add_argument("--indent", type=int, default=None, help="JSON 缩进（下载器为 2；默认紧凑）")
+    ap.add_argument("--signers", type=int, default=3)
+    ap.add_argument("--signer_skew", type=float, default=1.0, help="signer 权重的 Zipf 指数（0 为均匀）")
+    ap.add_argument("--gap", choices=GAP_DISTRIBUTIONS, default="exponential", help="发布间隔分布")
+    ap.add_argument("--mean_gap", type=float, default=12.0, help="平均发布间隔（秒）")
+    ap.add_argument("--outages", type=int, default=3, help="注入的停摆个数")
+    ap.add_argument("--outage_hours", type=float, nargs=2, default=[1.0, 24.0], metavar=("MIN", "MAX"))
+    ap.add_argument("--start", type=str, default="2024-01-01T00:00:00", help="第一条记录的时间（UTC）")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    cols = generate_columns(args.records, signers=args.signers, signer_skew=args.signer_skew, gap=args.gap,
+                            mean_gap=args.mean_gap, outages=args.outages, outage_hours=tuple(args.outage_hours),
+                            start=args.start, seed=args.seed)
+    files = write_batches(args.out_dir, cols, args.batch_size, args.format, args.indent, seed=args.seed)
+    print(f"Wrote {args.records} blobs to {len(files)} files in {args.out_dir} ({time.perf_counter() - t0:.1f} s)")
+    for r in cols["outage_rows"].tolist():
+        before = np.datetime64(int(cols["time"][r - 1]), "ns").astype("datetime64[s]")
+        after = np.datetime64(int(cols["time"][r]), "ns").astype("datetime64[s]")
+        print(f"  outage: {before} -> {after} UTC")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,36 @@ Celestia Blob 数据下载工具
 这个脚本用于从Celestia网络批量下载blob数据，支持分批下载和断点续传。
 """
 
+import argparse
+import glob
 import json
+import math
 import os
-import time
 import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Any, Tuple
 import requests
-from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+import blob_store
+from blob_index import BlobIndex, namespace_from_url
+from metrics import MetricsRegistry, profiled
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+
+if TYPE_CHECKING:
+    from async_transport import AsyncHttpTransport
+
+
+# 需要退避重试的 HTTP 状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# pages_per_second 指标的统计窗口（秒）
+PAGE_RATE_WINDOW = 60.0
+
 
 class BlobDownloader:
     """
@@ -25,19 +44,40 @@ class BlobDownloader:
     功能：
     - 分批下载blob数据
     - 自动保存进度
-    - 错误重试机制
+    - 错误重试机制（自适应令牌桶限速 + 指数退避，遵守 Retry-After）
     - 断点续传
+    - 并发分页下载（配置项 max_in_flight，默认 1 即串行）
+    - 基于水位线的增量同步（sync_new_blobs）与向前回填（backfill_older_blobs）
+    - 可选输出格式（配置项 output_format）：json（每页一个文件）、npz（列式分段）、
+      ndjson（追加写 gzip NDJSON 分段，按 segment_max_mb 轮转）
+    - 进度文件原子写入（临时文件 + fsync + 改名），可按 progress_interval 秒节流
+    - 可选 HTTP 后端（配置项 http_backend）：requests（默认）或 async（httpx.AsyncClient 长连接池，
+      边收边解压、边解析 JSON，见 async_transport.py）
+    - 可选 SQLite 索引（配置项 index_db），每页在一个事务内 upsert
+    - 运行指标（metrics.py）：请求延迟直方图、接收字节数、重试次数、页数与页/秒；
+      配置项 metrics_file 写出 Prometheus 文本文件（随进度一起节流），metrics_port 在本地端口提供 /metrics
     """
     
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json", config: Optional[Dict[str, Any]] = None,
+                 shared: Optional["BlobDownloader"] = None):
         """
         初始化下载器
         
         Args:
             config_file: 配置文件路径
+            config: 直接给出的配置（给出时忽略 config_file）
+            shared: 与该下载器共用 HTTP 会话、传输层、限速器、指标注册表和同一路径的 SQLite 索引
+                    （多 namespace 下载，见 fanout_downloader.py）
         """
-        self.config = self._load_config(config_file)
-        self.session = self._create_session()
+        self.config = config if config is not None else self._load_config(config_file)
+        if shared is not None:
+            self.session, self.transport, self.rate_limiter = shared.session, shared.transport, shared.rate_limiter
+        else:
+            self.session = self._create_session()
+            self.transport = self._create_transport()
+            self.rate_limiter = AdaptiveRateLimiter.from_config(self.config)
+        if self.config.get("output_format", "json") not in ("json", "npz", "ndjson"):
+            raise ValueError(f"不支持的 output_format: {self.config['output_format']}")
         self.logger = self._setup_logger()
         
         # 创建输出目录
@@ -45,6 +85,32 @@ class BlobDownloader:
         
         # 初始化进度
         self.progress = self._load_progress()
+        self._last_progress_save = 0.0
+
+        # ndjson 输出：按页追加到当前分段
+        self.segment_writer = None
+        if self.config.get("output_format") == "ndjson":
+            self.segment_writer = blob_store.NdjsonSegmentWriter(
+                self.config["output_dir"],
+                max_bytes=int(float(self.config.get("segment_max_mb", 64)) * (1 << 20)),
+                compresslevel=int(self.config.get("compress_level", 6)),
+            )
+
+        # 可选的 SQLite 索引
+        index_db = self.config.get("index_db")
+        if shared is not None and shared.index is not None and shared.index.path == index_db:
+            self.index = shared.index
+        else:
+            self.index = BlobIndex(index_db) if index_db else None
+        self.namespace = namespace_from_url(self.config.get("api_base_url", "")) or self.config.get("name")
+
+        # 运行指标：多 namespace 下载时共用一个注册表，按 namespace 标签区分
+        self.metrics = shared.metrics if shared is not None else MetricsRegistry()
+        self._init_metrics()
+        self.metrics_server = None
+        if shared is None and self.config.get("metrics_port") is not None:
+            self.metrics_server = self.metrics.serve(int(self.config["metrics_port"]))
+            self.logger.info(f"指标: http://127.0.0.1:{self.metrics_server.server_address[1]}/metrics")
         
     def _load_config(self, config_file: str) -> Dict[str, Any]:
         """加载配置文件"""
@@ -59,17 +125,16 @@ class BlobDownloader:
             raise
     
     def _create_session(self) -> requests.Session:
-        """创建HTTP会话，包含重试策略"""
+        """创建HTTP会话（重试由 _make_api_request 统一处理，适配器本身不重试）"""
         session = requests.Session()
         
-        # 设置重试策略
-        retry_strategy = Retry(
-            total=self.config["max_retries"],
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+        # 并发模式下每个在途请求需要一个连接，避免连接池溢出后反复建连
+        pool_size = self._pool_size()
+        adapter = HTTPAdapter(
+            max_retries=0,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
         )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         
@@ -81,6 +146,81 @@ class BlobDownloader:
         
         return session
     
+    def _pool_size(self) -> int:
+        # 并发模式下每个在途请求需要一个连接
+        return int(self.config.get("pool_size", max(10, self.config.get("max_in_flight", 1))))
+
+    def _create_transport(self) -> Optional["AsyncHttpTransport"]:
+        """http_backend = "async" 时创建 asyncio 传输层；默认 requests 返回 None"""
+        backend = self.config.get("http_backend", "requests")
+        if backend == "requests":
+            return None
+        if backend != "async":
+            raise ValueError(f"不支持的 http_backend: {backend}")
+        # 只在选用 async 后端时导入：httpx 是这个后端独有的依赖
+        from async_transport import AsyncHttpTransport
+
+        return AsyncHttpTransport(
+            pool_size=self._pool_size(),
+            keepalive=float(self.config.get("keepalive", 30)),
+            headers=dict(self.session.headers),
+        )
+
+    def _init_metrics(self):
+        """注册本下载器用到的指标（同名指标在共用的注册表中只注册一次）"""
+        m = self.metrics
+        ns = ("namespace",)
+        self._labels = {"namespace": self.namespace or ""}
+        self._m_requests = m.counter("blob_downloader_requests_total",
+                                     "API requests by outcome (HTTP status or error)", ns + ("outcome",))
+        self._m_latency = m.histogram("blob_downloader_request_seconds", "API request latency", ns)
+        self._m_bytes = m.counter("blob_downloader_response_bytes_total",
+                                  "Response body bytes received (before decompression)", ns)
+        self._m_retries = m.counter("blob_downloader_retries_total", "Retried API requests", ns)
+        self._m_failed = m.counter("blob_downloader_failed_pages_total",
+                                   "Pages given up (retries exhausted or rejected)", ns)
+        self._m_pages = m.counter("blob_downloader_pages_total", "Pages committed", ns)
+        self._m_blobs = m.counter("blob_downloader_blobs_total", "Blobs committed", ns)
+        self._m_page_rate = m.gauge("blob_downloader_pages_per_second",
+                                    f"Pages committed per second over the last {PAGE_RATE_WINDOW:.0f} s", ns)
+        self._m_high_water = m.gauge("blob_downloader_high_water_timestamp_seconds",
+                                     "Unix time of the newest downloaded blob", ns)
+        self._m_rate_limit = m.gauge("blob_downloader_rate_limit", "Current token bucket rate (requests/s)")
+        # 计数器从 0 开始输出，rate() / increase() 不会缺第一个点
+        for c in (self._m_bytes, self._m_retries, self._m_failed, self._m_pages, self._m_blobs):
+            c.inc(0, **self._labels)
+        self._page_times = deque()
+
+    def _observe_request(self, t0: float, outcome: str, nbytes: int = 0):
+        self._m_latency.observe(time.perf_counter() - t0, **self._labels)
+        self._m_requests.inc(outcome=outcome, **self._labels)
+        if nbytes:
+            self._m_bytes.inc(nbytes, **self._labels)
+        self._m_rate_limit.set(self.rate_limiter.rate)
+
+    def _observe_page(self, data: List[Dict]):
+        self._m_pages.inc(**self._labels)
+        self._m_blobs.inc(len(data), **self._labels)
+        now = time.monotonic()
+        times = self._page_times
+        times.append(now)
+        while times[0] < now - PAGE_RATE_WINDOW:
+            times.popleft()
+        rate = (len(times) - 1) / (now - times[0]) if len(times) > 1 else 0.0
+        self._m_page_rate.set(rate, **self._labels)
+        high = self.progress.get("high_water")
+        if high is not None:
+            self._m_high_water.set(self._blob_key(high)[0].timestamp(), **self._labels)
+
+    def _write_metrics(self):
+        path = self.config.get("metrics_file")
+        if not path:
+            return
+        try:
+            self.metrics.write(path)
+        except OSError as e:
+            self.logger.warning(f"写入指标文件失败: {e}")
+
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
         logger = logging.getLogger('BlobDownloader')
@@ -121,6 +261,9 @@ class BlobDownloader:
                     progress = json.load(f)
                     self.logger.info(f"已加载进度: offset={progress.get('current_offset', 0)}, "
                                    f"总数={progress.get('total_downloaded', 0)}")
+                    # 旧版进度文件没有水位线，从已下载的批次文件中恢复
+                    if "high_water" not in progress:
+                        progress["high_water"], progress["low_water"] = self._scan_watermarks()
                     return progress
             except Exception as e:
                 self.logger.warning(f"无法加载进度文件: {e}")
@@ -130,26 +273,103 @@ class BlobDownloader:
             "current_offset": 0,
             "total_downloaded": 0,
             "last_update": None,
-            "batch_count": 0
+            "batch_count": 0,
+            # 已下载数据中最新/最旧的一条 blob：{"time", "id", "height"}
+            "high_water": None,
+            "low_water": None
         }
     
-    def _save_progress(self):
-        """保存下载进度"""
+    def _scan_watermarks(self) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """扫描输出目录中已有的批次文件，返回 (最新水位, 最旧水位)"""
+        pattern = os.path.join(self.config["output_dir"], "blob_batch_*.json")
+        high = low = None
+        for fp in glob.glob(pattern):
+            try:
+                with open(fp, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                self.logger.warning(f"扫描水位线时跳过 {fp}: {e}")
+                continue
+            high, low = self._merge_watermarks(data, high, low)
+        for fp in blob_store.list_segments(self.config["output_dir"]):
+            try:
+                cols = blob_store.load_segment(fp, ["id", "time", "height"])
+            except Exception as e:
+                self.logger.warning(f"扫描水位线时跳过 {fp}: {e}")
+                continue
+            data = [
+                {"time": blob_store.ns_to_iso(t), "id": int(i), "height": int(h)}
+                for i, t, h in zip(cols["id"], cols["time"], cols["height"])
+            ]
+            high, low = self._merge_watermarks(data, high, low)
+        for fp in blob_store.list_ndjson_segments(self.config["output_dir"]):
+            try:
+                data = [json.loads(line) for line in blob_store.read_ndjson_lines(fp)]
+            except Exception as e:
+                self.logger.warning(f"扫描水位线时跳过 {fp}: {e}")
+                continue
+            high, low = self._merge_watermarks(data, high, low)
+        return high, low
+    
+    def _save_progress(self, force: bool = True):
+        """
+        保存下载进度（原子写入）
+
+        Args:
+            force: False 时距上次保存不足 progress_interval 秒则跳过（逐批次调用时使用）
+        """
+        now = time.monotonic()
+        if not force and now - self._last_progress_save < float(self.config.get("progress_interval", 0)):
+            return
         self.progress["last_update"] = datetime.now().isoformat()
-        
+
         try:
-            with open(self.config["progress_file"], 'w', encoding='utf-8') as f:
-                json.dump(self.progress, f, indent=2, ensure_ascii=False)
+            # 先让数据落盘，进度永远不会指向尚未写入磁盘的批次
+            if self.segment_writer is not None:
+                self.segment_writer.sync()
+            blob_store.atomic_write_json(self.config["progress_file"], self.progress)
+            self._last_progress_save = now
         except Exception as e:
             self.logger.error(f"保存进度失败: {e}")
+        self._write_metrics()
+
+    def _finalize(self):
+        """一次运行结束：关闭当前 NDJSON 分段（写入 gzip 尾部）并强制保存进度"""
+        if self.segment_writer is not None:
+            self.segment_writer.close()
+        self._save_progress()
     
-    def _make_api_request(self, offset: int, limit: int) -> Optional[List[Dict]]:
+    @staticmethod
+    def _blob_key(blob: Dict) -> Tuple[datetime, int]:
+        """blob 的排序键 (time, id)，用于与水位线比较"""
+        t = str(blob["time"])
+        if t.endswith("Z"):
+            t = t[:-1] + "+00:00"
+        return datetime.fromisoformat(t), int(blob.get("id") or 0)
+
+    @classmethod
+    def _merge_watermarks(cls, data: List[Dict],
+                          high: Optional[Dict],
+                          low: Optional[Dict]) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """用一批 blob 更新 (最新水位, 最旧水位)"""
+        for blob in data:
+            key = cls._blob_key(blob)
+            mark = {"time": blob["time"], "id": blob.get("id"), "height": blob.get("height")}
+            if high is None or key > cls._blob_key(high):
+                high = mark
+            if low is None or key < cls._blob_key(low):
+                low = mark
+        return high, low
+
+    def _make_api_request(self, offset: int, limit: int,
+                          extra_params: Optional[Dict[str, Any]] = None) -> Optional[List[Dict]]:
         """
         发起API请求
         
         Args:
             offset: 偏移量
             limit: 限制数量
+            extra_params: 附加查询参数（如 sort、from、to）
             
         Returns:
             API响应数据，失败时返回None
@@ -160,45 +380,86 @@ class BlobDownloader:
             "limit": limit,
             "offset": offset
         }
+        if extra_params:
+            params.update(extra_params)
         
         for attempt in range(self.config["max_retries"] + 1):
+            # 所有请求线程共享同一个令牌桶
+            self.rate_limiter.acquire()
+            retry_after = None
+            t0 = time.perf_counter()
             try:
                 self.logger.info(f"请求API: offset={offset}, limit={limit}, 尝试={attempt+1}")
                 
-                response = self.session.get(
-                    url, 
-                    params=params, 
-                    timeout=self.config["request_timeout"]
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                self.logger.info(f"成功获取 {len(data)} 条数据")
-                return data
-                
-            except requests.exceptions.RequestException as e:
-                self.logger.warning(f"请求失败 (尝试 {attempt+1}): {e}")
-                
-                if attempt < self.config["max_retries"]:
-                    time.sleep(self.config["retry_delay"] * (attempt + 1))
-                else:
-                    self.logger.error(f"达到最大重试次数，跳过offset={offset}")
+                status, headers, data, nbytes = self._fetch(url, params)
+                self._observe_request(t0, str(status), nbytes)
+                if status < 400:
+                    self.rate_limiter.on_success()
+                    self.logger.info(f"成功获取 {len(data)} 条数据")
+                    return data
+                if status not in RETRYABLE_STATUS:
+                    # 其余 4xx 重试也不会成功
+                    self.logger.error(f"请求被拒绝，跳过offset={offset}: HTTP {status}")
+                    self._m_failed.inc(**self._labels)
                     return None
+                retry_after = parse_retry_after(headers.get("Retry-After"))
+                self.logger.warning(f"请求失败 (尝试 {attempt+1}): HTTP {status}")
+            except self._request_errors() as e:
+                self._observe_request(t0, "error")
+                self.logger.warning(f"请求失败 (尝试 {attempt+1}): {e}")
+            
+            if attempt < self.config["max_retries"]:
+                self._m_retries.inc(**self._labels)
+                delay = self.rate_limiter.on_throttle(attempt, retry_after)
+                self.logger.info(f"退避 {delay:.2f}s，当前速率 {self.rate_limiter.rate:.2f} 请求/秒")
+            else:
+                self.logger.error(f"达到最大重试次数，跳过offset={offset}")
+                self._m_failed.inc(**self._labels)
+                return None
     
+    def _request_errors(self) -> Tuple[type, ...]:
+        """需要重试的请求异常；async 后端的 TransportError 只在启用该后端时导入"""
+        if self.transport is None:
+            return (requests.exceptions.RequestException, ValueError)
+        from async_transport import TransportError
+        return (requests.exceptions.RequestException, TransportError, ValueError)
+
+    def _fetch(self, url: str, params: Dict[str, Any]) -> Tuple[int, Any, Optional[List[Dict]], int]:
+        """
+        发出一次 GET
+
+        Returns:
+            (状态码, 响应头（大小写不敏感）, 解析后的 JSON（状态码 >= 400 时为 None）, 收到的响应体字节数（解压前）)
+        """
+        timeout = self.config["request_timeout"]
+        if self.transport is not None:
+            resp = self.transport.get(url, params, timeout=timeout)
+            return resp.status, resp.headers, resp.data, resp.wire_bytes
+        response = self.session.get(url, params=params, timeout=timeout)
+        data = response.json() if response.status_code < 400 else None
+        # urllib3 的 tell() 为线上读到的字节数（gzip 时为压缩后的大小）
+        return response.status_code, response.headers, data, response.raw.tell() or len(response.content)
+
     def _save_batch_data(self, data: List[Dict], batch_index: int):
         """
-        保存批次数据到JSON文件
+        保存批次数据到JSON文件或列式分段（output_format = "npz"）
         
         Args:
             data: 要保存的数据
             batch_index: 批次索引
         """
-        filename = f"blob_batch_{batch_index}.json"
+        output_format = self.config.get("output_format", "json")
+        filename = f"blob_batch_{batch_index}.{output_format}"
         filepath = os.path.join(self.config["output_dir"], filename)
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if output_format == "ndjson":
+                filename = os.path.basename(self.segment_writer.write(data))
+            elif output_format == "npz":
+                blob_store.save_segment(filepath, data)
+            else:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
             
             self.logger.info(f"已保存批次数据: {filename} ({len(data)} 条记录)")
             
@@ -206,19 +467,135 @@ class BlobDownloader:
             self.logger.error(f"保存批次数据失败: {e}")
             raise
     
+    def _commit_batch(self, data: List[Dict], offset: Optional[int], pbar: tqdm):
+        """
+        按顺序提交一个批次：写批次文件并推进进度和水位线
+
+        Args:
+            data: 该批次数据
+            offset: 该批次请求时使用的偏移量；水位线模式下为 None，不改动 current_offset
+            pbar: 进度条
+        """
+        batch_count = self.progress["batch_count"]
+
+        # 保存批次数据
+        self._save_batch_data(data, batch_count)
+        if self.index is not None:
+            self.index.upsert(data, self.namespace)
+
+        # 更新进度
+        if offset is not None:
+            self.progress["current_offset"] = offset + len(data)
+        self.progress["total_downloaded"] += len(data)
+        self.progress["batch_count"] = batch_count + 1
+        self.progress["high_water"], self.progress["low_water"] = self._merge_watermarks(
+            data, self.progress.get("high_water"), self.progress.get("low_water")
+        )
+        self._observe_page(data)
+
+        # 更新进度条
+        pbar.update(len(data))
+        pbar.set_postfix({
+            "批次": batch_count + 1,
+            "偏移": self.progress["current_offset"],
+            "速率": f"{self.rate_limiter.rate:.1f}/s"
+        })
+
+        # 保存进度
+        self._save_progress(force=False)
+
+    def _download_serial(self, pbar: tqdm):
+        """逐页串行下载"""
+        batch_size = self.config["batch_size"]
+        current_offset = self.progress["current_offset"]
+
+        while True:
+            # 请求当前批次数据
+            data = self._make_api_request(current_offset, batch_size)
+
+            if data is None:
+                self.logger.warning("获取数据失败，跳过当前批次")
+                current_offset += batch_size
+                continue
+
+            # 如果没有更多数据，结束下载
+            if len(data) == 0:
+                self.logger.info("没有更多数据，下载完成")
+                break
+
+            self._commit_batch(data, current_offset, pbar)
+            current_offset += len(data)
+
+            # 如果获取的数据少于批次大小，说明已经到末尾
+            if len(data) < batch_size:
+                self.logger.info("已获取所有可用数据")
+                break
+
+    def _download_concurrent(self, pbar: tqdm, max_in_flight: int):
+        """
+        并发下载：最多 max_in_flight 个分页请求同时在途
+
+        请求按 offset 预先发出，但批次文件和 progress.json 严格按 offset
+        顺序提交，因此中断后 progress.json 仍是正确的续传点。
+
+        Args:
+            pbar: 进度条
+            max_in_flight: 最大在途请求数
+        """
+        batch_size = self.config["batch_size"]
+        current_offset = self.progress["current_offset"]
+        next_offset = current_offset
+        pending = {}
+
+        executor = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix="blob-page"
+        )
+        try:
+            while True:
+                # 补满在途请求
+                while len(pending) < max_in_flight:
+                    pending[next_offset] = executor.submit(
+                        self._make_api_request, next_offset, batch_size
+                    )
+                    next_offset += batch_size
+
+                # 只等待下一个需要提交的分页，后面的分页继续在后台下载
+                data = pending.pop(current_offset).result()
+
+                if data is None:
+                    self.logger.warning("获取数据失败，跳过当前批次")
+                    current_offset += batch_size
+                    continue
+
+                if len(data) == 0:
+                    self.logger.info("没有更多数据，下载完成")
+                    break
+
+                self._commit_batch(data, current_offset, pbar)
+                current_offset += len(data)
+
+                if len(data) < batch_size:
+                    self.logger.info("已获取所有可用数据")
+                    break
+        finally:
+            # 结束或中断时丢弃尚未开始的请求，已发出的请求结果直接忽略
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def download_all_blobs(self):
         """
         下载所有blob数据
         
-        这是主要的下载方法，会持续请求API直到没有更多数据
+        这是主要的下载方法，会持续请求API直到没有更多数据。
+        配置 max_in_flight > 1 时启用并发分页下载。
         """
+        max_in_flight = max(1, int(self.config.get("max_in_flight", 1)))
+
         self.logger.info("开始下载blob数据...")
         self.logger.info(f"配置: 批次大小={self.config['batch_size']}, "
+                        f"并发数={max_in_flight}, "
                         f"输出目录={self.config['output_dir']}")
         
-        current_offset = self.progress["current_offset"]
-        batch_count = self.progress["batch_count"]
-        
         # 创建进度条
         pbar = tqdm(
             desc="下载进度", 
@@ -227,51 +604,10 @@ class BlobDownloader:
         )
         
         try:
-            while True:
-                # 请求当前批次数据
-                data = self._make_api_request(
-                    current_offset, 
-                    self.config["batch_size"]
-                )
-                
-                if not data:
-                    self.logger.warning("获取数据失败，跳过当前批次")
-                    current_offset += self.config["batch_size"]
-                    continue
-                
-                # 如果没有更多数据，结束下载
-                if len(data) == 0:
-                    self.logger.info("没有更多数据，下载完成")
-                    break
-                
-                # 保存批次数据
-                self._save_batch_data(data, batch_count)
-                
-                # 更新进度
-                current_offset += len(data)
-                self.progress["current_offset"] = current_offset
-                self.progress["total_downloaded"] += len(data)
-                self.progress["batch_count"] = batch_count + 1
-                
-                # 更新进度条
-                pbar.update(len(data))
-                pbar.set_postfix({
-                    "批次": batch_count + 1,
-                    "偏移": current_offset
-                })
-                
-                # 保存进度
-                self._save_progress()
-                
-                batch_count += 1
-                
-                # 如果获取的数据少于批次大小，说明已经到末尾
-                if len(data) < self.config["batch_size"]:
-                    self.logger.info("已获取所有可用数据")
-                    break
-                
-                # 短暂休息，避免过于频繁的请求
-                time.sleep(0.1)
+            if max_in_flight > 1:
+                self._download_concurrent(pbar, max_in_flight)
+            else:
+                self._download_serial(pbar)
                 
         except KeyboardInterrupt:
             self.logger.info("用户中断下载")
@@ -280,11 +616,113 @@ class BlobDownloader:
             raise
         finally:
             pbar.close()
-            self._save_progress()
+            self._finalize()
         
         self.logger.info(f"下载完成! 总共下载 {self.progress['total_downloaded']} 条记录，"
                         f"保存了 {self.progress['batch_count']} 个批次文件")
     
+    def _download_window(self, params: Dict[str, Any],
+                         keep: Callable[[Dict], bool],
+                         pbar: tqdm):
+        """
+        在固定的时间窗口内按 offset 分页下载
+
+        窗口边界在整个运行期间保持不变：向后同步用升序 + from，新 blob 只会追加到
+        末尾；回填用降序 + to，窗口内不会再出现新数据。因此 offset 不会因为
+        实时发布的 blob 而漂移，不会重复或漏页。
+
+        失败时直接停止而不是跳页，下次运行会从水位线继续。
+
+        Args:
+            params: 窗口查询参数（sort、from、to）
+            keep: 过滤函数，剔除窗口边界上已下载过的 blob
+            pbar: 进度条
+        """
+        batch_size = self.config["batch_size"]
+        offset = 0
+
+        while True:
+            data = self._make_api_request(offset, batch_size, params)
+
+            if data is None:
+                self.logger.warning(f"获取数据失败，停止本次同步（offset={offset}），下次从水位线继续")
+                break
+
+            if len(data) == 0:
+                break
+
+            fresh = [blob for blob in data if keep(blob)]
+            if fresh:
+                self._commit_batch(fresh, None, pbar)
+
+            offset += len(data)
+            if len(data) < batch_size:
+                break
+
+    def _run_window_mode(self, label: str, params: Dict[str, Any],
+                         keep: Callable[[Dict], bool]):
+        """水位线模式的公共外壳：进度条、中断处理与进度保存"""
+        self.logger.info(f"开始{label}: 参数={params}")
+        before = self.progress["total_downloaded"]
+
+        pbar = tqdm(desc=label, unit="条")
+        try:
+            self._download_window(params, keep, pbar)
+        except KeyboardInterrupt:
+            self.logger.info("用户中断下载")
+        except Exception as e:
+            self.logger.error(f"{label}过程中发生错误: {e}")
+            raise
+        finally:
+            pbar.close()
+            self._finalize()
+
+        added = self.progress["total_downloaded"] - before
+        self.logger.info(f"{label}完成! 新增 {added} 条记录")
+        return added
+
+    def sync_new_blobs(self) -> int:
+        """
+        增量同步：只下载比本地最新水位线更新的 blob
+
+        以 high_water 的时间为起点按时间升序分页，适合定时任务；
+        本地还没有任何数据时等价于从最早的 blob 开始全量下载。
+
+        Returns:
+            新增记录数
+        """
+        high = self.progress.get("high_water")
+        params: Dict[str, Any] = {"sort": "asc"}
+        if high is None:
+            keep = lambda blob: True
+        else:
+            high_key = self._blob_key(high)
+            # from 为秒级时间戳，取整后会包含同一秒内已下载的 blob，由 keep 剔除
+            params["from"] = int(high_key[0].timestamp())
+            keep = lambda blob: self._blob_key(blob) > high_key
+
+        return self._run_window_mode("增量同步", params, keep)
+
+    def backfill_older_blobs(self) -> int:
+        """
+        向前回填：下载比本地最旧水位线更早的历史 blob
+
+        Returns:
+            新增记录数
+        """
+        low = self.progress.get("low_water")
+        if low is None:
+            self.logger.info("本地没有数据，回填等价于增量同步")
+            return self.sync_new_blobs()
+
+        low_key = self._blob_key(low)
+        params = {
+            "sort": "desc",
+            "to": int(math.ceil(low_key[0].timestamp())) + 1,
+        }
+        keep = lambda blob: self._blob_key(blob) < low_key
+        return self._run_window_mode("历史回填", params, keep)
+
     def get_download_stats(self) -> Dict[str, Any]:
         """
         获取下载统计信息
@@ -292,19 +730,45 @@ class BlobDownloader:
         Returns:
             包含统计信息的字典
         """
+        requests_made, latency_sum = self._m_latency.snapshot(**self._labels)
         return {
             "total_downloaded": self.progress["total_downloaded"],
             "batch_count": self.progress["batch_count"],
             "current_offset": self.progress["current_offset"],
-            "last_update": self.progress["last_update"]
+            "last_update": self.progress["last_update"],
+            "high_water": self.progress.get("high_water"),
+            "low_water": self.progress.get("low_water"),
+            "requests": requests_made,
+            "mean_latency_ms": latency_sum / requests_made * 1000 if requests_made else None,
+            "bytes_received": int(self._m_bytes.value(**self._labels)),
+            "retries": int(self._m_retries.value(**self._labels)),
+            **self.rate_limiter.snapshot()
         }
 
 
 def main():
     """主函数"""
+    ap = argparse.ArgumentParser(description="Download Celestia namespace blobs in batches.")
+    ap.add_argument("--config", type=str, default="config.json", help="配置文件路径")
+    ap.add_argument("--mode", choices=["full", "sync", "backfill"], default="full",
+                    help="full=按 offset 全量下载；sync=只拉取比本地更新的 blob；backfill=回填更早的历史")
+    ap.add_argument("--metrics_file", type=str, default=None,
+                    help="Prometheus 文本格式的指标文件（覆盖配置项 metrics_file）")
+    ap.add_argument("--metrics_port", type=int, default=None,
+                    help="在 127.0.0.1 的该端口上提供 /metrics（覆盖配置项 metrics_port）")
+    ap.add_argument("--profile", type=str, default=None, metavar="PREFIX",
+                    help="开启 cProfile + tracemalloc，结束时写出 PREFIX.prof 与 PREFIX.txt")
+    args = ap.parse_args()
+
     try:
-        # 创建下载器实例
-        downloader = BlobDownloader()
+        # 创建下载器实例（命令行给出的指标选项覆盖配置文件）
+        overrides = {k: v for k, v in (("metrics_file", args.metrics_file),
+                                       ("metrics_port", args.metrics_port)) if v is not None}
+        if overrides:
+            with open(args.config, 'r', encoding='utf-8') as f:
+                downloader = BlobDownloader(config={**json.load(f), **overrides})
+        else:
+            downloader = BlobDownloader(args.config)
         
         # 显示当前进度
         stats = downloader.get_download_stats()
@@ -316,10 +780,20 @@ def main():
         print(f"当前偏移: {stats['current_offset']}")
         if stats['last_update']:
             print(f"上次更新: {stats['last_update']}")
+        if stats['high_water']:
+            print(f"最新水位: {stats['high_water']['time']} (height={stats['high_water']['height']})")
+        if stats['low_water']:
+            print(f"最旧水位: {stats['low_water']['time']} (height={stats['low_water']['height']})")
         print("="*50 + "\n")
         
         # 开始下载
-        downloader.download_all_blobs()
+        with profiled(args.profile):
+            if args.mode == "sync":
+                downloader.sync_new_blobs()
+            elif args.mode == "backfill":
+                downloader.backfill_older_blobs()
+            else:
+                downloader.download_all_blobs()
         
         # 显示最终统计
         final_stats = downloader.get_download_stats()
@@ -328,7 +802,16 @@ def main():
         print("="*50)
         print(f"总下载数据: {final_stats['total_downloaded']} 条")
         print(f"保存批次文件: {final_stats['batch_count']} 个")
+        print(f"请求速率: {final_stats['request_rate']} 请求/秒 "
+              f"(成功 {final_stats['successes']} 次, 限流 {final_stats['throttled']} 次)")
+        if final_stats['requests']:
+            print(f"本次请求: {final_stats['requests']} 次, 平均延迟 {final_stats['mean_latency_ms']:.0f} ms, "
+                  f"重试 {final_stats['retries']} 次, 接收 {final_stats['bytes_received'] / 2**20:.1f} MB")
+        if downloader.config.get("metrics_file"):
+            print(f"指标文件: {downloader.config['metrics_file']}")
         print(f"数据保存在: {downloader.config['output_dir']} 目录")
+        if downloader.index is not None:
+            print(f"索引: {downloader.index.path} ({downloader.index.stats()['blobs']} 条)")
         print("="*50)
         
     except Exception as e:
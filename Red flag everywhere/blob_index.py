@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+blob_index.py
+
+本地 SQLite blob 索引，用于临时排查（"高度 X 到 Y 之间发生了什么"、
+"signer S 有哪些超过 6 小时的间隔"），不必重新解析全部批次文件。
+
+- 表 blobs 以 commitment 为唯一键，按页批量 upsert（一页一个事务）
+- 索引：height、(time_ns, height)、(signer, time_ns, height)，窗口函数按索引顺序扫描、无需排序
+- WAL 模式：下载器写入的同时可以并发查询
+- 间隔查询用窗口函数 LAG 在 SQL 中完成
+
+写入方：BlobDownloader（配置项 index_db）或本脚本的 import 子命令；
+读取方：本脚本的查询子命令，以及 analyze_blobs.py --index_db。
+
+用法：
+  python blob_index.py --db blobs.sqlite import --data_dir data
+  python blob_index.py --db blobs.sqlite stats
+  python blob_index.py --db blobs.sqlite range --height 1663000 1663100
+  python blob_index.py --db blobs.sqlite range --since 2024-04-22T06:00:00 --until 2024-04-22T07:00:00
+  python blob_index.py --db blobs.sqlite gaps --min_hours 6 --signer celestia1...
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import blob_store
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    commitment  TEXT NOT NULL UNIQUE,
+    id          INTEGER,
+    height      INTEGER,
+    time_ns     INTEGER NOT NULL,
+    signer      TEXT,
+    namespace   TEXT,
+    size        INTEGER,
+    fee         INTEGER,
+    gas_used    INTEGER,
+    gas_wanted  INTEGER,
+    tx_hash     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_height ON blobs(height);
+CREATE INDEX IF NOT EXISTS idx_blobs_time ON blobs(time_ns, height);
+CREATE INDEX IF NOT EXISTS idx_blobs_signer_time ON blobs(signer, time_ns, height);
+"""
+
+UPSERT = """
+INSERT INTO blobs (commitment, id, height, time_ns, signer, namespace, size, fee, gas_used, gas_wanted, tx_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(commitment) DO UPDATE SET
+    id = excluded.id, height = excluded.height, time_ns = excluded.time_ns,
+    signer = excluded.signer, namespace = COALESCE(excluded.namespace, blobs.namespace),
+    size = excluded.size, fee = excluded.fee, gas_used = excluded.gas_used,
+    gas_wanted = excluded.gas_wanted, tx_hash = excluded.tx_hash
+"""
+
+_NAMESPACE_RE = re.compile(r"/namespace/([0-9a-fA-F]+)")
+
+
+def namespace_from_url(url: str) -> Optional[str]:
+    """从 Celenium namespace 接口地址中提取 namespace id"""
+    m = _NAMESPACE_RE.search(url or "")
+    return m.group(1) if m else None
+
+
+def _rows_from_columns(cols: Dict[str, np.ndarray], namespace: Optional[str]) -> Iterator[tuple]:
+    """列式数据 -> upsert 参数行；缺少 commitment 的记录用 id 代替唯一键"""
+    dec = lambda a: [x.decode("utf-8") for x in a.tolist()]  # noqa: E731
+    commitments, signers, tx_hashes = dec(cols["commitment"]), dec(cols["signer"]), dec(cols["tx_hash"])
+    for i, (bid, h, t, size, fee, gu, gw) in enumerate(zip(
+            cols["id"].tolist(), cols["height"].tolist(), cols["time"].tolist(), cols["size"].tolist(),
+            cols["fee"].tolist(), cols["gas_used"].tolist(), cols["gas_wanted"].tolist())):
+        yield (commitments[i] or f"id:{bid}", bid, h, t, signers[i] or None, namespace,
+               size, fee, gu, gw, tx_hashes[i] or None)
+
+
+class BlobIndex:
+    """
+    SQLite blob 索引
+
+    Args:
+        path: 数据库文件路径（不存在时创建）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------ 写入 ------------------------------
+
+    def upsert(self, data: List[Dict[str, Any]], namespace: Optional[str] = None) -> int:
+        """写入一页 API 数据（单个事务），返回条数"""
+        if not data:
+            return 0
+        return self.upsert_columns(blob_store.records_to_columns(data), namespace)
+
+    def upsert_columns(self, cols: Dict[str, np.ndarray], namespace: Optional[str] = None) -> int:
+        """写入列式数据（blob_store.COLUMNS 格式，单个事务），返回条数"""
+        with self.conn:
+            self.conn.executemany(UPSERT, _rows_from_columns(cols, namespace))
+        return int(cols["id"].size)
+
+    # ------------------------------ 查询 ------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        row = self.conn.execute(
+            "SELECT COUNT(*), MIN(time_ns), MAX(time_ns), MIN(height), MAX(height), COUNT(DISTINCT signer) FROM blobs"
+        ).fetchone()
+        return {"blobs": row[0], "first_time_ns": row[1], "last_time_ns": row[2],
+                "min_height": row[3], "max_height": row[4], "signers": row[5]}
+
+    @staticmethod
+    def _where(height: Optional[Tuple[int, int]] = None,
+               time_ns: Optional[Tuple[Optional[int], Optional[int]]] = None,
+               signer: Optional[str] = None,
+               namespace: Optional[str] = None) -> Tuple[str, list]:
+        clauses, params = [], []
+        if height is not None:
+            clauses.append("height BETWEEN ? AND ?")
+            params += list(height)
+        if time_ns is not None:
+            if time_ns[0] is not None:
+                clauses.append("time_ns >= ?")
+                params.append(time_ns[0])
+            if time_ns[1] is not None:
+                clauses.append("time_ns < ?")
+                params.append(time_ns[1])
+        if signer is not None:
+            clauses.append("signer = ?")
+            params.append(signer)
+        if namespace is not None:
+            clauses.append("namespace = ?")
+            params.append(namespace)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def range(self, limit: Optional[int] = 1000, **filters) -> List[tuple]:
+        """按高度 / 时间 / signer 范围取记录：(height, time_ns, id, signer, size, commitment)"""
+        where, params = self._where(**filters)
+        sql = f"SELECT height, time_ns, id, signer, size, commitment FROM blobs {where} ORDER BY time_ns, height"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self.conn.execute(sql, params).fetchall()
+
+    def gaps(self, min_seconds: float = 0.0, per_signer: bool = False, limit: Optional[int] = 1000,
+             **filters) -> List[tuple]:
+        """
+        相邻 blob 的间隔（窗口函数 LAG），只返回 >= min_seconds 的间隔。
+        per_signer=True 时在每个 signer 内部分别计算。
+
+        窗口内只算一个整数 LAG，且只取覆盖索引中的列（不回表）；命中行的 signer
+        与前一条记录再按索引单独查出。超过阈值的间隔通常很少，这比在窗口里
+        多算几列 LAG 快一倍以上。
+
+        Returns:
+            [(gap_seconds, prev_time_ns, time_ns, prev_height, height, signer)]，按时间排序
+        """
+        where, params = self._where(**filters)
+        part = "PARTITION BY signer " if per_signer else ""
+        sql = f"""
+            SELECT gap, time_ns, height, rowid FROM (
+                SELECT time_ns - LAG(time_ns) OVER ({part}ORDER BY time_ns, height) AS gap,
+                       time_ns, height, rowid
+                FROM blobs {where}
+            )
+            WHERE gap >= ?
+            ORDER BY time_ns, height
+        """
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        hits = self.conn.execute(sql, params + [int(min_seconds * 1e9)]).fetchall()
+
+        prev_sql = (f"SELECT time_ns, height FROM blobs {where} {'AND' if where else 'WHERE'} (time_ns, height) < (?, ?)"
+                    f"{' AND signer IS ?' if per_signer else ''} ORDER BY time_ns DESC, height DESC LIMIT 1")
+        out = []
+        for gap, t, h, rowid in hits:
+            signer = self.conn.execute("SELECT signer FROM blobs WHERE rowid = ?", (rowid,)).fetchone()[0]
+            prev = self.conn.execute(prev_sql, params + [t, h] + ([signer] if per_signer else [])).fetchone()
+            out.append((gap / 1e9, prev[0], t, prev[1], h, signer))
+        return out
+
+    def load_columns(self, **filters) -> Dict[str, Any]:
+        """
+        按 (time, height) 顺序读出 analyze_blobs 需要的列：
+        id / height / time(int64 ns) / signer_code(int32) / signers、size / fee / gas_used / gas_wanted
+        / position（索引中没有 position，全部为 -1），以及 namespace_code(int32) / namespaces
+        （namespace 为空时记为 ""）
+        """
+        where, params = self._where(**filters)
+        rows = self.conn.execute(
+            f"SELECT id, height, time_ns, signer, namespace, size, fee, gas_used, gas_wanted "
+            f"FROM blobs {where} ORDER BY time_ns, height", params
+        ).fetchall()
+        n = len(rows)
+        signer_index: Dict[str, int] = {}
+        ns_index: Dict[str, int] = {}
+        cols = {
+            "id": np.fromiter((-1 if r[0] is None else r[0] for r in rows), dtype=np.int64, count=n),
+            "height": np.fromiter((-1 if r[1] is None else r[1] for r in rows), dtype=np.int64, count=n),
+            "time": np.fromiter((r[2] for r in rows), dtype=np.int64, count=n),
+            "signer_code": np.fromiter((signer_index.setdefault(r[3] or "", len(signer_index)) for r in rows),
+                                       dtype=np.int32, count=n),
+            "namespace_code": np.fromiter((ns_index.setdefault(r[4] or "", len(ns_index)) for r in rows),
+                                          dtype=np.int32, count=n),
+        }
+        for k, name in enumerate(("size", "fee", "gas_used", "gas_wanted"), start=5):
+            cols[name] = np.fromiter((-1 if r[k] is None else r[k] for r in rows), dtype=np.int64, count=n)
+        cols["position"] = np.full(n, -1, dtype=np.int64)
+        cols["signers"] = list(signer_index)
+        cols["namespaces"] = list(ns_index)
+        return cols
+
+
+# ============================== 命令行 ==============================
+
+def _parse_time_ns(s: Optional[str]) -> Optional[int]:
+    if not s:
+        return None
+    return int(blob_store.iso_to_ns([s if s.endswith("Z") or "+" in s[10:] else s + "Z"])[0])
+
+
+def _fmt_ns(ns: Optional[int]) -> str:
+    return blob_store.ns_to_iso(ns)[:19].replace("T", " ") if ns is not None else "-"
+
+
+def import_dir(index: BlobIndex, data_dir: str, namespace: Optional[str] = None) -> int:
+    """把 data_dir 中已有的批次文件（JSON、npz 分段与 NDJSON 分段）导入索引，每个文件一个事务"""
+    # analyze_blobs 反过来会导入本模块，这里延迟导入
+    import analyze_blobs
+
+    total = 0
+    for fp in analyze_blobs.list_batch_files(data_dir):
+        if fp.endswith(".npz"):
+            total += index.upsert_columns(blob_store.load_segment(fp), namespace)
+        elif fp.endswith(".ndjson.gz"):
+            total += index.upsert([json.loads(line) for line in blob_store.read_ndjson_lines(fp)], namespace)
+        else:
+            with open(fp, "r", encoding="utf-8") as f:
+                total += index.upsert(analyze_blobs.json_fragments_to_list(f.read()), namespace)
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Query / build the local SQLite blob index.")
+    ap.add_argument("--db", type=str, default="blobs.sqlite", help="索引数据库路径")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_imp = sub.add_parser("import", help="导入已有批次文件")
+    p_imp.add_argument("--data_dir", type=str, default="data")
+    p_imp.add_argument("--namespace", type=str, default=None)
+
+    sub.add_parser("stats", help="索引概况")
+
+    def add_filters(p):
+        p.add_argument("--height", type=int, nargs=2, metavar=("FROM", "TO"), help="高度范围（含两端）")
+        p.add_argument("--since", type=str, default=None, help="起始时间（UTC，ISO8601，含）")
+        p.add_argument("--until", type=str, default=None, help="结束时间（UTC，ISO8601，不含）")
+        p.add_argument("--signer", type=str, default=None)
+        p.add_argument("--namespace", type=str, default=None)
+        p.add_argument("--limit", type=int, default=1000, help="最多输出行数（0 不限）")
+
+    p_range = sub.add_parser("range", help="按高度 / 时间 / signer 列出 blob")
+    add_filters(p_range)
+    p_gaps = sub.add_parser("gaps", help="列出超过阈值的间隔")
+    add_filters(p_gaps)
+    p_gaps.add_argument("--min_hours", type=float, default=0.0, help="只列出不短于该小时数的间隔")
+    p_gaps.add_argument("--per_signer", action="store_true", help="在每个 signer 内部分别计算间隔")
+
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    with BlobIndex(args.db) as index:
+        if args.cmd == "import":
+            n = import_dir(index, args.data_dir, args.namespace)
+            print(f"Imported {n} blobs into {args.db}")
+        elif args.cmd == "stats":
+            st = index.stats()
+            print(f"blobs   : {st['blobs']}")
+            print(f"signers : {st['signers']}")
+            print(f"height  : {st['min_height']} .. {st['max_height']}")
+            print(f"time    : {_fmt_ns(st['first_time_ns'])} .. {_fmt_ns(st['last_time_ns'])} UTC")
+        else:
+            filters = dict(
+                height=tuple(args.height) if args.height else None,
+                time_ns=(_parse_time_ns(args.since), _parse_time_ns(args.until)) if (args.since or args.until) else None,
+                signer=args.signer,
+                namespace=args.namespace,
+            )
+            if args.cmd == "range":
+                rows = index.range(limit=args.limit, **filters)
+                print("height\ttime_utc\tid\tsigner\tsize\tcommitment")
+                for h, t, bid, signer, size, c in rows:
+                    print(f"{h}\t{_fmt_ns(t)}\t{bid}\t{signer}\t{size}\t{c}")
+            else:
+                rows = index.gaps(min_seconds=args.min_hours * 3600, per_signer=args.per_signer,
+                                  limit=args.limit, **filters)
+                print("gap_hours\tprev_time_utc\ttime_utc\tprev_height\theight\tsigner")
+                for gap, prev_t, t, prev_h, h, signer in rows:
+                    print(f"{gap / 3600:.3f}\t{_fmt_ns(prev_t)}\t{_fmt_ns(t)}\t{prev_h}\t{h}\t{signer}")
+            print(f"({len(rows)} rows)", file=sys.stderr)
+    print(f"Query took {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式 blob 存储
+
+把 API 返回的 blob 列表转换为定长类型的列，每个批次写成一个压缩的
+blob_batch_<i>.npz 分段（相当于一个 row group），追加新批次只需新增一个文件。
+读取时可以只加载需要的列。
+
+列定义见 COLUMNS；时间统一为 UTC epoch 纳秒（int64）。
+
+另有按行追加的 gzip NDJSON 分段 blob_batch_<i>.ndjson.gz（NdjsonSegmentWriter）：
+每页追加到当前分段并做一次 Z_SYNC_FLUSH，超过大小上限后轮转到新分段，
+保留原始 JSON 的全部字段，写入次数与文件数都远少于每页一个 JSON 文件。
+"""
+
+import glob
+import gzip
+import json
+import os
+import re
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+# 列名 -> dtype。字符串列用定长字节串，压缩后重复的 signer 几乎不占空间
+COLUMNS: Dict[str, str] = {
+    "id": "int64",
+    "height": "int64",
+    "time": "int64",          # epoch 纳秒，UTC
+    "size": "int64",
+    "fee": "int64",           # utia
+    "gas_used": "int64",
+    "gas_wanted": "int64",
+    "position": "int64",      # blob 在交易中的位置
+    "signer": "S",
+    "tx_hash": "S",
+    "commitment": "S",
+}
+
+SEGMENT_PATTERN = "blob_batch_*.npz"
+NDJSON_PATTERN = "blob_batch_*.ndjson.gz"
+
+
+def _get(d: Dict[str, Any], path: str, default=None):
+    cur: Any = d
+    for p in path.split("."):
+        if isinstance(cur, dict) and p in cur:
+            cur = cur[p]
+        else:
+            return default
+    return cur
+
+
+def _to_int(v, default: int = -1) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def iso_to_ns(values: Iterable[str]) -> np.ndarray:
+    """ISO8601 时间字符串 -> UTC epoch 纳秒（int64）"""
+    vals = [str(v).strip() for v in values]
+    # 常见情况：全部以 Z 结尾，直接交给 numpy 批量解析
+    if all(v.endswith("Z") for v in vals):
+        return np.array([v[:-1] for v in vals], dtype="datetime64[ns]").astype(np.int64)
+    out = np.empty(len(vals), dtype=np.int64)
+    for i, v in enumerate(vals):
+        dt = datetime.fromisoformat(v[:-1] + "+00:00" if v.endswith("Z") else v)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        # 先按秒取整再加微秒，避免浮点误差
+        out[i] = int(dt.replace(microsecond=0).timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+    return out
+
+
+def ns_to_iso(ns: int) -> str:
+    """UTC epoch 纳秒 -> 与 API 一致的 ISO8601 字符串（以 Z 结尾）"""
+    return str(np.datetime64(int(ns), "ns").astype("datetime64[us]")) + "Z"
+
+
+def records_to_columns(data: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """把一页 API 数据转换为列"""
+    times = [_get(b, "time") or _get(b, "tx.time") for b in data]
+    return {
+        "id": np.array([_to_int(_get(b, "id")) for b in data], dtype=np.int64),
+        "height": np.array([_to_int(_get(b, "height", _get(b, "tx.height"))) for b in data], dtype=np.int64),
+        "time": iso_to_ns(times),
+        "size": np.array([_to_int(_get(b, "size")) for b in data], dtype=np.int64),
+        "fee": np.array([_to_int(_get(b, "tx.fee")) for b in data], dtype=np.int64),
+        "gas_used": np.array([_to_int(_get(b, "tx.gas_used")) for b in data], dtype=np.int64),
+        "gas_wanted": np.array([_to_int(_get(b, "tx.gas_wanted")) for b in data], dtype=np.int64),
+        "position": np.array([_to_int(_get(b, "tx.position")) for b in data], dtype=np.int64),
+        "signer": np.array([str(_get(b, "signer.hash", "") or "") for b in data], dtype="S"),
+        "tx_hash": np.array([str(_get(b, "tx.hash", "") or "") for b in data], dtype="S"),
+        "commitment": np.array([str(_get(b, "commitment", "") or "") for b in data], dtype="S"),
+    }
+
+
+def save_segment(path: str, data: List[Dict[str, Any]]):
+    """把一页数据写成一个压缩列式分段"""
+    cols = records_to_columns(data)
+    # 先写临时文件再改名，避免中断时留下半个分段
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **cols)
+    os.replace(tmp, path)
+
+
+def segment_index(path: str) -> int:
+    m = re.search(r"blob_batch_(\d+)\.", os.path.basename(path))
+    return int(m.group(1)) if m else -1
+
+
+def list_segments(data_dir: str) -> List[str]:
+    """按批次序号排序的分段文件列表"""
+    return sorted(glob.glob(os.path.join(data_dir, SEGMENT_PATTERN)), key=segment_index)
+
+
+def load_segment(path: str, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """读取一个分段；npz 按成员懒加载，未请求的列不会被解压"""
+    names = columns or list(COLUMNS)
+    with np.load(path) as z:
+        return {c: z[c] for c in names if c in z.files}
+
+
+def load_columns(data_dir: str, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    读取目录下所有分段并按批次顺序拼接
+
+    Args:
+        data_dir: 分段所在目录
+        columns: 需要的列，默认全部
+    """
+    names = columns or list(COLUMNS)
+    parts: Dict[str, List[np.ndarray]] = {c: [] for c in names}
+    for fp in list_segments(data_dir):
+        seg = load_segment(fp, names)
+        for c in names:
+            if c in seg:
+                parts[c].append(seg[c])
+    out: Dict[str, np.ndarray] = {}
+    for c in names:
+        if parts[c]:
+            out[c] = np.concatenate(parts[c])
+        else:
+            out[c] = np.array([], dtype="S1" if COLUMNS[c] == "S" else COLUMNS[c])
+    return out
+
+
+# ============================== NDJSON 分段 ==============================
+
+def list_ndjson_segments(data_dir: str) -> List[str]:
+    """按分段序号排序的 NDJSON 分段列表"""
+    return sorted(glob.glob(os.path.join(data_dir, NDJSON_PATTERN)), key=segment_index)
+
+
+def read_ndjson_lines(path: str) -> List[str]:
+    """
+    读取 NDJSON 分段中的完整行。
+
+    写入方每页做一次 Z_SYNC_FLUSH，所以即使进程在写入中途崩溃、gzip 尾部缺失，
+    之前各页的数据仍能解压；末尾不完整的半行直接丢弃（对应的页没有写入进度，
+    续传时会重新下载）。
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    out = bytearray()
+    # 可能由多个 gzip member 拼接而成，逐个解压
+    while raw:
+        d = zlib.decompressobj(wbits=31)
+        try:
+            out += d.decompress(raw)
+        except zlib.error:
+            break
+        if not d.eof:
+            break
+        raw = d.unused_data
+    end = out.rfind(b"\n")
+    return out[:end + 1].decode("utf-8").splitlines() if end >= 0 else []
+
+
+class NdjsonSegmentWriter:
+    """
+    gzip NDJSON 分段写入器
+
+    Args:
+        output_dir: 输出目录
+        max_bytes: 单个分段的压缩后大小上限，超过后轮转到新分段
+        compresslevel: gzip 压缩级别
+
+    分段序号接在目录中已有分段之后；每次运行都从新分段开始写，
+    不会向上次可能未正常关闭的分段追加。
+    """
+
+    def __init__(self, output_dir: str, max_bytes: int = 64 << 20, compresslevel: int = 6):
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        existing = list_ndjson_segments(output_dir)
+        self.index = segment_index(existing[-1]) + 1 if existing else 0
+        self.path: Optional[str] = None
+        self._raw = None
+        self._gz: Optional[gzip.GzipFile] = None
+
+    def _open(self):
+        self.path = os.path.join(self.output_dir, f"blob_batch_{self.index}.ndjson.gz")
+        self.index += 1
+        self._raw = open(self.path, "xb")
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=self.compresslevel)
+
+    def write(self, data: List[Dict[str, Any]]) -> str:
+        """追加一页数据，返回写入的分段路径"""
+        if self._gz is None:
+            self._open()
+        path = self.path
+        payload = "".join(json.dumps(b, ensure_ascii=False, separators=(",", ":")) + "\n" for b in data)
+        self._gz.write(payload.encode("utf-8"))
+        # 刷出完整的 deflate 块：此前写入的页都可以独立解压
+        self._gz.flush(zlib.Z_SYNC_FLUSH)
+        if self._raw.tell() >= self.max_bytes:
+            self.close()
+        return path
+
+    def sync(self):
+        """把当前分段已写入的数据落盘（fsync）"""
+        if self._raw is not None:
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+
+    def close(self):
+        """写入 gzip 尾部并关闭当前分段；之后的 write 会开启新分段"""
+        if self._gz is None:
+            return
+        self._gz.close()
+        self.sync()
+        self._raw.close()
+        self._gz = self._raw = None
+
+
+def atomic_write_json(path: str, obj: Any):
+    """临时文件 + fsync + 改名，崩溃时只会看到旧文件或新文件，不会有写了一半的文件"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # 改名本身也要落盘；Windows 不支持打开目录，跳过
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
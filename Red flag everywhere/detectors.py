@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+detectors.py
+
+可插拔的间隔异常检测器。全局 mean + k*std 在重尾分布下会被少数超长间隔拉高阈值，
+真正的停摆反而被漏掉；这里提供几种稳健或自适应的检测方法：
+
+- std        ：全局 mean + k*std（原有方法）
+- mad        ：滚动中位数 / MAD，基线取前 window 个间隔，不受当前间隔影响
+- ewma       ：对数间隔上的 EWMA 控制限（均值与方差都做指数加权）
+- changepoint：对数间隔上的二分法均值变点检测，段内再用中位数 / MAD 判定异常
+
+所有检测器签名为 fn(gaps, **params) -> dict：
+    mask          ：bool 数组，True 表示异常
+    threshold     ：逐间隔的阈值（秒）
+    description   ：报告中显示的检测器说明
+    change_points ：变点处的间隔下标（新段的第一个间隔），仅 changepoint 非空
+
+计算全部基于 NumPy 向量化：滚动窗口用 sliding_window_view 按步长分块求中位数，
+EWMA 的线性递推按块用累积和求解。
+"""
+
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+MAD_SCALE = 1.4826          # 正态分布下 MAD -> 标准差的换算系数
+_LOG_FLOOR = 1e-3           # 取对数前的间隔下限（秒），避免 log(0)
+
+
+def _result(mask: np.ndarray, threshold: np.ndarray, description: str,
+            change_points: Optional[List[int]] = None) -> Dict[str, Any]:
+    return {
+        "mask": mask,
+        "threshold": threshold,
+        "description": description,
+        "change_points": change_points or [],
+    }
+
+
+# ============================== std ==============================
+
+def detect_std(gaps: np.ndarray, k: float = 2.0) -> Dict[str, Any]:
+    """全局阈值 mean + k*std（与 analyze_gaps 相同）"""
+    thr = float(np.mean(gaps) + k * np.std(gaps))
+    return _result(gaps > thr, np.full(gaps.size, thr), f"global mean + {k:g}·std")
+
+
+# ============================== 滚动中位数 / MAD ==============================
+
+def _trailing_windows(x: np.ndarray, window: int, stride: int):
+    """
+    尾随窗口视图：第 j 行为 x[p-window:p]（p = j*stride），不含 x[p] 本身。
+    前 window 个位置没有完整历史，统一用 x[:window] 作为基线（预热）。
+    """
+    window = max(1, min(window, x.size))
+    padded = np.concatenate([x[:window], x])
+    return sliding_window_view(padded, window)[:x.size:stride]
+
+
+def rolling_median(x: np.ndarray, window: int, stride: int = 1, block: int = 1 << 15) -> np.ndarray:
+    """
+    尾随窗口中位数 out[i] = median(x[p-window:p])，p 为不超过 i 的最近一个 stride 倍数。
+    stride > 1 时只在锚点上计算再向后填充，计算量降为 1/stride，基线仍只用历史数据。
+    按块处理，峰值内存约 block * window 个 float。
+    """
+    views = _trailing_windows(x, window, stride)
+    vals = np.empty(views.shape[0], dtype=float)
+    for s in range(0, vals.size, block):
+        vals[s:s + block] = np.median(views[s:s + block], axis=1)
+    return np.repeat(vals, stride)[:x.size]
+
+
+def rolling_mad(x: np.ndarray, center: np.ndarray, window: int, stride: int = 1,
+                block: int = 1 << 15) -> np.ndarray:
+    """与 rolling_median 相同窗口上的 median(|x - center|)，center 取锚点处的值"""
+    views = _trailing_windows(x, window, stride)
+    anchors = center[::stride]
+    vals = np.empty(views.shape[0], dtype=float)
+    for s in range(0, vals.size, block):
+        dev = np.abs(views[s:s + block] - anchors[s:s + block, None])
+        vals[s:s + block] = np.median(dev, axis=1)
+    return np.repeat(vals, stride)[:x.size]
+
+
+def detect_mad(gaps: np.ndarray, window: int = 100, k: float = 5.0, min_scale: float = 1.0,
+               stride: Optional[int] = None) -> Dict[str, Any]:
+    """
+    间隔 > 滚动中位数 + k * 1.4826 * 滚动 MAD 判为异常。
+    min_scale（秒）为尺度下限：出块极其规律时 MAD 可能为 0。
+    stride 默认为 window // 10：基线每 stride 个间隔更新一次。
+    """
+    stride = stride or max(1, window // 10)
+    med = rolling_median(gaps, window, stride)
+    scale = np.maximum(MAD_SCALE * rolling_mad(gaps, med, window, stride), min_scale)
+    thr = med + k * scale
+    return _result(gaps > thr, thr, f"rolling median + {k:g}·MAD (window={window})")
+
+
+# ============================== EWMA ==============================
+
+def ewma_recursion(b: np.ndarray, decay: float, s0: float) -> np.ndarray:
+    """
+    求解线性递推 s[t] = decay * s[t-1] + b[t]（s[-1] = s0）。
+
+    块内 s[t] = decay^(t+1) * (s0 + Σ_{j≤t} b[j] * decay^-(j+1))，用 cumsum 一次算出；
+    块长按 decay^-B ≤ e^30 选取，避免溢出与精度损失，块与块之间传递末状态。
+    """
+    n = b.size
+    out = np.empty(n, dtype=float)
+    if not n:
+        return out
+    step = max(1, int(30.0 / -math.log(decay))) if 0 < decay < 1 else n
+    s = float(s0)
+    for lo in range(0, n, step):
+        seg = b[lo:lo + step]
+        p = decay ** np.arange(1, seg.size + 1, dtype=float)
+        out[lo:lo + seg.size] = p * (s + np.cumsum(seg / p))
+        s = out[lo + seg.size - 1]
+    return out
+
+
+def detect_ewma(gaps: np.ndarray, alpha: float = 0.05, k: float = 3.0, warmup: int = 100,
+                min_scale: float = 0.05) -> Dict[str, Any]:
+    """
+    对数间隔的 EWMA 控制图：
+        m[t] = (1-α) m[t-1] + α y[t]
+        v[t] = (1-α) (v[t-1] + α (y[t] - m[t-1])^2)
+    y[t] > m[t-1] + k * max(sqrt(v[t-1]), min_scale) 判为异常（上限用前一时刻的状态，不含当前值）。
+    初始状态取前 warmup 个间隔的均值与方差。
+    min_scale 为对数尺度上的标准差下限（约为相对波动）：间隔恒定时 v 为 0，
+    阈值等于间隔本身，浮点舍入就会造成误报。
+    """
+    y = np.log(np.maximum(gaps, _LOG_FLOOR))
+    head = y[:max(1, warmup)]
+    m0, v0 = float(head.mean()), float(head.var())
+    decay = 1.0 - alpha
+
+    m = ewma_recursion(alpha * y, decay, m0)
+    m_prev = np.concatenate([[m0], m[:-1]])
+    v = ewma_recursion(decay * alpha * (y - m_prev) ** 2, decay, v0)
+    v_prev = np.concatenate([[v0], v[:-1]])
+
+    thr = np.exp(m_prev + k * np.maximum(np.sqrt(v_prev), min_scale))
+    return _result(gaps > thr, thr, f"EWMA control limit on log gaps (α={alpha:g}, {k:g}·σ)")
+
+
+# ============================== 变点 ==============================
+
+def _best_split(cs: np.ndarray, lo: int, hi: int, min_size: int):
+    """
+    段 y[lo:hi] 上单个均值变点的最优位置及代价下降量
+    （均值变化模型：gain = n_l * n_r / n * (mean_l - mean_r)^2）
+    """
+    n = hi - lo
+    if n < 2 * min_size:
+        return None, 0.0
+    k = np.arange(lo + min_size, hi - min_size + 1)
+    total = cs[hi] - cs[lo]
+    left = cs[k] - cs[lo]
+    n_l = (k - lo).astype(float)
+    n_r = n - n_l
+    gain = n_l * n_r / n * (left / n_l - (total - left) / n_r) ** 2
+    i = int(np.argmax(gain))
+    return int(k[i]), float(gain[i])
+
+
+def change_points(y: np.ndarray, min_size: int = 50, penalty: float = 1.0, max_points: int = 50) -> List[int]:
+    """
+    二分法变点检测：反复在代价下降最大的段上切分，直到下降量不超过
+    penalty * 2σ² ln(n)（BIC 型惩罚）。σ 由一阶差分的 MAD 稳健估计。
+    """
+    n = y.size
+    if n < 2 * min_size:
+        return []
+    sigma = MAD_SCALE * float(np.median(np.abs(np.diff(y) - np.median(np.diff(y))))) / math.sqrt(2)
+    sigma = max(sigma, 1e-6)
+    limit = penalty * 2.0 * sigma * sigma * math.log(n)
+    cs = np.concatenate([[0.0], np.cumsum(y)])
+
+    segments = [(0, n)]
+    points: List[int] = []
+    candidates = {seg: _best_split(cs, *seg, min_size) for seg in segments}
+    while len(points) < max_points:
+        seg, (k, gain) = max(candidates.items(), key=lambda kv: kv[1][1])
+        if k is None or gain <= limit:
+            break
+        del candidates[seg]
+        points.append(k)
+        for part in ((seg[0], k), (k, seg[1])):
+            candidates[part] = _best_split(cs, *part, min_size)
+    return sorted(points)
+
+
+def detect_changepoint(gaps: np.ndarray, min_size: int = 50, penalty: float = 1.0,
+                       k: float = 5.0, min_scale: float = 1.0) -> Dict[str, Any]:
+    """
+    先在对数间隔上检测发布节奏的变点，再在每一段内用 中位数 + k·MAD 判定异常，
+    这样节奏切换（例如从 30 s 变为 5 min）本身不会被当成一连串异常。
+    """
+    y = np.log(np.maximum(gaps, _LOG_FLOOR))
+    points = change_points(y, min_size=min_size, penalty=penalty)
+    bounds = [0] + points + [gaps.size]
+    thr = np.empty(gaps.size, dtype=float)
+    # 段数受 max_points 限制，逐段计算即可
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        seg = gaps[lo:hi]
+        med = float(np.median(seg))
+        scale = max(MAD_SCALE * float(np.median(np.abs(seg - med))), min_scale)
+        thr[lo:hi] = med + k * scale
+    return _result(gaps > thr, thr,
+                   f"change-point segments + {k:g}·MAD ({len(points)} change points)", points)
+
+
+# ============================== 注册表 ==============================
+
+DETECTORS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "std": detect_std,
+    "mad": detect_mad,
+    "ewma": detect_ewma,
+    "changepoint": detect_changepoint,
+}
+
+
+def run_detectors(gaps: np.ndarray, names: List[str], params: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    依次运行多个检测器并合并：mask 取并集，阈值取逐间隔最小值，变点取并集。
+
+    Args:
+        names: 检测器名称（DETECTORS 的键）
+        params: {检测器名称: 关键字参数}
+    """
+    gaps = np.asarray(gaps, dtype=float)
+    results = [DETECTORS[name](gaps, **params.get(name, {})) for name in names]
+    merged = results[0]
+    for r in results[1:]:
+        merged = _result(merged["mask"] | r["mask"],
+                         np.minimum(merged["threshold"], r["threshold"]),
+                         f"{merged['description']}; {r['description']}",
+                         sorted(set(merged["change_points"]) | set(r["change_points"])))
+    return merged
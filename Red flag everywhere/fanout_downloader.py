@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fanout_downloader.py
+
+一个进程同时同步多个 namespace（或多个接口地址）。
+
+- 每个 namespace 一个 BlobDownloader，各自的 output_dir 与 progress.json（默认 <output_dir>/<name>/），
+  可直接用 analyze_blobs.py --namespace_dir name=<output_dir>/<name> 分析
+- 所有 namespace 共用一个 HTTP 会话 / 传输层、一个自适应限速器和一个线程池（max_in_flight）
+- 也共用一个指标注册表（按 namespace 标签区分）；公共配置中的 metrics_file / metrics_port 对全部 namespace 生效
+- 调度：每个 namespace 同时最多一个在途分页（下一页取决于已提交的水位线）；空闲的请求槽位
+  优先分给落后最多（high_water 最旧）的 namespace，还没有数据的 namespace 排在最前
+- 同步方式与 blob_downloader.py --mode sync 相同：按时间升序 + from 水位线分页
+- --watch 模式常驻运行，每轮开始前检查配置文件，新增 / 删除 namespace 无需重启
+
+配置示例（namespaces 之外的键为公共配置，条目中的同名键覆盖公共配置）：
+{
+  "output_dir": "data", "log_file": "fanout.log", "batch_size": 100, "max_in_flight": 8,
+  "max_retries": 5, "retry_delay": 1, "request_timeout": 30, "rate_limit": 5,
+  "namespaces": [
+    {"name": "ecl3", "namespace_id": "00000000000000000000000000000000000000000000000000000000000000000000"},
+    {"name": "foo", "api_base_url": "https://api-mainnet.celenium.io/v1/namespace/<id>/0/blobs"}
+  ]
+}
+
+用法：
+  python fanout_downloader.py --config fanout.json
+  python fanout_downloader.py --config fanout.json --watch 60
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from blob_downloader import BlobDownloader
+
+
+DEFAULT_URL_TEMPLATE = "https://api-mainnet.celenium.io/v1/namespace/{namespace_id}/{version}/blobs"
+
+
+def namespace_configs(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    把 namespaces 列表展开为每个 namespace 的完整下载器配置
+
+    条目需要 name，以及 api_base_url 或 namespace_id（配合 api_url_template 与 version，默认 0）；
+    output_dir 默认为 <公共 output_dir>/<name>，progress_file 默认为其中的 progress.json。
+    """
+    base = {k: v for k, v in config.items() if k != "namespaces"}
+    out: Dict[str, Dict[str, Any]] = {}
+    for entry in config.get("namespaces", []):
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"namespace 条目缺少 name: {entry}")
+        if name in out:
+            raise ValueError(f"namespace 名称重复: {name}")
+        cfg = {**base, **entry}
+        if "api_base_url" not in entry:
+            if "namespace_id" not in entry:
+                raise ValueError(f"namespace {name} 需要 api_base_url 或 namespace_id")
+            cfg["api_base_url"] = cfg.get("api_url_template", DEFAULT_URL_TEMPLATE).format(
+                namespace_id=entry["namespace_id"], version=entry.get("version", 0))
+        cfg["output_dir"] = entry.get("output_dir") or os.path.join(base.get("output_dir", "data"), name)
+        cfg["progress_file"] = entry.get("progress_file") or os.path.join(cfg["output_dir"], "progress.json")
+        out[name] = cfg
+    return out
+
+
+@dataclass
+class NamespaceState:
+    """单个 namespace 在调度器中的状态"""
+    name: str
+    config: Dict[str, Any]
+    downloader: BlobDownloader
+    offset: int = 0                     # 当前 from 窗口内的偏移
+    last_from: Optional[int] = None
+    caught_up: bool = False             # 本轮已追平（或请求失败，留到下一轮）
+    added: int = 0                      # 本轮新增条数
+    failures: int = 0                   # 累计失败的分页数
+
+    def high_water_ts(self) -> float:
+        """最新水位的 unix 时间；还没有数据时为 -inf（优先级最高）"""
+        high = self.downloader.progress.get("high_water")
+        if high is None:
+            return -math.inf
+        return BlobDownloader._blob_key(high)[0].timestamp()
+
+
+class FanoutDownloader:
+    """
+    Args:
+        config_file: 含 namespaces 列表的配置文件
+    """
+
+    def __init__(self, config_file: str):
+        self.config_file = config_file
+        self.config: Dict[str, Any] = {}
+        self.states: Dict[str, NamespaceState] = {}
+        self._mtime_ns: Optional[int] = None
+        self._shared: Optional[BlobDownloader] = None
+        self.reload()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="fanout")
+
+    @property
+    def max_in_flight(self) -> int:
+        return max(1, int(self.config.get("max_in_flight", 4)))
+
+    @property
+    def logger(self):
+        return self._shared.logger
+
+    # ------------------------------ 配置 ------------------------------
+
+    def reload(self) -> bool:
+        """配置文件有变化时重新加载：新增、删除或重建（配置改动的）namespace"""
+        mtime = os.stat(self.config_file).st_mtime_ns
+        if mtime == self._mtime_ns:
+            return False
+        with open(self.config_file, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        configs = namespace_configs(config)
+        if not configs:
+            raise ValueError(f"{self.config_file} 中没有 namespaces")
+        self.config, self._mtime_ns = config, mtime
+
+        for name in [n for n in self.states if n not in configs]:
+            self.logger.info(f"移除 namespace: {name}")
+            self.states.pop(name).downloader._finalize()
+        for name, cfg in configs.items():
+            old = self.states.get(name)
+            if old is not None and old.config == cfg:
+                continue
+            if old is not None:
+                old.downloader._finalize()
+            # 第一个下载器持有共享的会话、传输层和限速器，其余下载器复用
+            downloader = BlobDownloader(config=cfg, shared=self._shared)
+            if self._shared is None:
+                self._shared = downloader
+            self.states[name] = NamespaceState(name, cfg, downloader)
+            self.logger.info(f"{'更新' if old else '新增'} namespace: {name} -> {cfg['output_dir']}")
+        return True
+
+    # ------------------------------ 调度 ------------------------------
+
+    def _next_request(self, st: NamespaceState) -> Tuple[Dict[str, Any], Optional[tuple]]:
+        """下一页的查询参数与提交时用于过滤的水位键"""
+        dl = st.downloader
+        high = dl.progress.get("high_water")
+        params: Dict[str, Any] = {"sort": "asc"}
+        high_key = None
+        from_ts = None
+        if high is not None:
+            high_key = dl._blob_key(high)
+            # from 为秒级时间戳，同一秒内已下载的 blob 在提交时剔除
+            from_ts = int(high_key[0].timestamp())
+            params["from"] = from_ts
+        # 水位线前进到新的一秒后窗口起点变了，偏移归零；否则在同一窗口内继续翻页
+        if from_ts != st.last_from:
+            st.offset, st.last_from = 0, from_ts
+        return params, high_key
+
+    def _commit(self, st: NamespaceState, data: Optional[List[Dict]], high_key: Optional[tuple], pbar: tqdm):
+        dl = st.downloader
+        if data is None:
+            st.failures += 1
+            st.caught_up = True
+            self.logger.warning(f"[{st.name}] 获取数据失败，本轮跳过，下一轮从水位线继续")
+            return
+        fresh = data if high_key is None else [b for b in data if dl._blob_key(b) > high_key]
+        if fresh:
+            dl._commit_batch(fresh, None, pbar)
+            st.added += len(fresh)
+        st.offset += len(data)
+        if len(data) < dl.config["batch_size"]:
+            st.caught_up = True
+
+    def run_round(self) -> Dict[str, int]:
+        """所有 namespace 各自追平一次，返回 {名称: 新增条数}"""
+        for st in self.states.values():
+            st.caught_up, st.added, st.offset, st.last_from = False, 0, 0, None
+
+        in_flight: Dict[Future, Tuple[NamespaceState, Optional[tuple]]] = {}
+        busy = set()
+        pbar = tqdm(desc="多 namespace 同步", unit="条")
+        try:
+            while True:
+                # 空闲槽位优先分给落后最多的 namespace
+                ready = sorted((st for st in self.states.values() if not st.caught_up and st.name not in busy),
+                               key=NamespaceState.high_water_ts)
+                for st in ready[:self.max_in_flight - len(in_flight)]:
+                    params, high_key = self._next_request(st)
+                    fut = self.executor.submit(st.downloader._make_api_request,
+                                               st.offset, st.downloader.config["batch_size"], params)
+                    in_flight[fut] = (st, high_key)
+                    busy.add(st.name)
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    st, high_key = in_flight.pop(fut)
+                    busy.discard(st.name)
+                    self._commit(st, fut.result(), high_key, pbar)
+        finally:
+            pbar.close()
+            for fut in in_flight:
+                fut.cancel()
+            for st in self.states.values():
+                st.downloader._save_progress()
+        return {name: st.added for name, st in self.states.items()}
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        rows = []
+        for st in sorted(self.states.values(), key=NamespaceState.high_water_ts):
+            ts = st.high_water_ts()
+            rows.append({
+                "name": st.name,
+                "high_water": None if ts == -math.inf else datetime.fromtimestamp(ts, timezone.utc),
+                "lag_hours": None if ts == -math.inf else (now - ts) / 3600,
+                "total": st.downloader.progress["total_downloaded"],
+                "added": st.added,
+                "failures": st.failures,
+            })
+        return rows
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for st in self.states.values():
+            st.downloader._finalize()
+        if self._shared.transport is not None:
+            self._shared.transport.close()
+
+
+def print_status(rows: List[Dict[str, Any]]):
+    print(f"{'namespace':<20} {'high water (UTC)':<20} {'lag h':>8} {'total':>10} {'added':>8} {'failed':>7}")
+    for r in rows:
+        hw = r["high_water"].strftime("%Y-%m-%d %H:%M:%S") if r["high_water"] else "-"
+        lag = f"{r['lag_hours']:8.2f}" if r["lag_hours"] is not None else f"{'-':>8}"
+        print(f"{r['name']:<20} {hw:<20} {lag} {r['total']:>10} {r['added']:>8} {r['failures']:>7}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sync many Celestia namespaces from one process.")
+    ap.add_argument("--config", type=str, default="fanout.json", help="含 namespaces 列表的配置文件")
+    ap.add_argument("--watch", type=float, default=0.0,
+                    help="常驻运行，每轮之间间隔的秒数；0 表示只同步一轮")
+    args = ap.parse_args()
+
+    fanout = FanoutDownloader(args.config)
+    try:
+        while True:
+            if fanout.reload():
+                print(f"Tracking {len(fanout.states)} namespaces: {', '.join(fanout.states)}")
+            added = fanout.run_round()
+            print_status(fanout.status())
+            print(f"Round done: {sum(added.values())} new blobs")
+            if args.watch <= 0:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fanout.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
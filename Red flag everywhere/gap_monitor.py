@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gap_monitor.py
+
+实时间隔监控：常驻运行，只轮询比上一条更新的 blob，在内存中维护最近一段间隔的
+滚动统计；距上一条 blob 的时间超过检测阈值时触发告警，新 blob 到达后发送恢复通知。
+
+- 复用 BlobDownloader 的配置、HTTP 会话、限速与重试（同步请求放在线程中执行）
+- 内存只有最近 window 个间隔和少量标量，长时间运行不增长
+- 每次轮询都带 from（水位线）：预热请求失败时按轮询间隔重试，预热成功前不轮询；
+  接口暂无数据时水位线取预热时刻减一个轮询间隔，不会从头翻页整个历史
+- 阈值检测器：mad（滚动中位数 + k·MAD）、ewma（对数间隔 EWMA 控制限）、std（窗口 mean + k·std）
+- 告警钩子：stdout、file:<路径>（追加 JSON Lines）、webhook:<URL>（POST JSON）
+
+用法：
+  python gap_monitor.py --config config.json
+  python gap_monitor.py --config config.json --detector ewma --alert stdout --alert file:alerts.jsonl
+  python gap_monitor.py --config config.json --alert webhook:https://hooks.example.com/xyz
+
+本地测试可先启动 mock_api.py 回放 data/ 中的批次，再把 config.json 的 api_base_url 指向它。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from blob_downloader import BlobDownloader
+from detectors import MAD_SCALE
+
+
+AlertHook = Callable[[Dict[str, Any]], Awaitable[None]]
+
+DEFAULT_K = {"mad": 5.0, "ewma": 3.0, "std": 3.0}
+
+
+# ============================== 在线阈值 ==============================
+
+class OverdueThreshold:
+    """
+    最近 window 个间隔上的在线阈值（秒）
+
+    Args:
+        method: mad / ewma / std
+        window: 保留的间隔个数（mad、std 的窗口，ewma 的预热长度）
+        k: 阈值倍数，默认 mad 5、ewma 3、std 3
+        alpha: ewma 平滑系数
+        min_scale: mad 的尺度下限（秒），出块极其规律时 MAD 可能为 0
+        min_threshold: 阈值下限（秒），避免在高频发布时频繁告警
+    """
+
+    def __init__(self, method: str = "mad", window: int = 100, k: Optional[float] = None,
+                 alpha: float = 0.05, min_scale: float = 1.0, min_threshold: float = 0.0):
+        if method not in DEFAULT_K:
+            raise ValueError(f"不支持的检测器: {method}")
+        self.method = method
+        self.k = DEFAULT_K[method] if k is None else k
+        self.alpha = alpha
+        self.min_scale = min_scale
+        self.min_threshold = min_threshold
+        self.min_samples = min(10, window)
+        self.recent: deque = deque(maxlen=window)
+        # ewma 状态（对数间隔）
+        self._m: Optional[float] = None
+        self._v = 0.0
+
+    def update(self, gap: float):
+        self.recent.append(gap)
+        if self.method != "ewma":
+            return
+        y = math.log(max(gap, 1e-3))
+        if self._m is None:
+            if len(self.recent) >= self.min_samples:
+                logs = [math.log(max(g, 1e-3)) for g in self.recent]
+                self._m, self._v = statistics.fmean(logs), statistics.pvariance(logs)
+            return
+        d = y - self._m
+        self._m += self.alpha * d
+        self._v = (1 - self.alpha) * (self._v + self.alpha * d * d)
+
+    def threshold(self) -> Optional[float]:
+        """当前阈值；样本不足时返回None"""
+        if len(self.recent) < self.min_samples:
+            return None
+        if self.method == "mad":
+            med = statistics.median(self.recent)
+            mad = statistics.median(abs(g - med) for g in self.recent)
+            thr = med + self.k * max(MAD_SCALE * mad, self.min_scale)
+        elif self.method == "ewma":
+            if self._m is None:
+                return None
+            thr = math.exp(self._m + self.k * math.sqrt(self._v))
+        else:
+            mean = statistics.fmean(self.recent)
+            std = math.sqrt(statistics.fmean((g - mean) ** 2 for g in self.recent))
+            thr = mean + self.k * std
+        return max(thr, self.min_threshold)
+
+    def describe(self) -> str:
+        return f"{self.method} (k={self.k:g}, window={self.recent.maxlen})"
+
+
+# ============================== 告警钩子 ==============================
+
+def stdout_alert() -> AlertHook:
+    async def hook(event: Dict[str, Any]):
+        if event["type"] == "overdue":
+            print(f"🚨 [{event['at']}] no blob for {event['elapsed_seconds']:.0f}s "
+                  f"(threshold {event['threshold_seconds']:.0f}s, last blob {event['last_blob_time']}, "
+                  f"height={event['last_height']})", flush=True)
+        else:
+            print(f"✅ [{event['at']}] blobs resumed after {event['elapsed_seconds']:.0f}s "
+                  f"(height={event['last_height']})", flush=True)
+    return hook
+
+
+def file_alert(path: str) -> AlertHook:
+    async def hook(event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+
+        def _append():
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        await asyncio.to_thread(_append)
+    return hook
+
+
+def webhook_alert(url: str, downloader: BlobDownloader) -> AlertHook:
+    async def hook(event: Dict[str, Any]):
+        try:
+            resp = await asyncio.to_thread(downloader.session.post, url, json=event,
+                                           timeout=downloader.config["request_timeout"])
+            resp.raise_for_status()
+        except Exception as e:
+            # 告警发送失败不影响监控本身
+            downloader.logger.error(f"webhook 告警发送失败: {e}")
+    return hook
+
+
+def build_hooks(specs: List[str], downloader: BlobDownloader) -> List[AlertHook]:
+    """stdout / file:<路径> / webhook:<URL>"""
+    hooks = []
+    for spec in specs:
+        kind, _, target = spec.partition(":")
+        if kind == "stdout":
+            hooks.append(stdout_alert())
+        elif kind == "file" and target:
+            hooks.append(file_alert(target))
+        elif kind == "webhook" and target:
+            hooks.append(webhook_alert(target, downloader))
+        else:
+            raise ValueError(f"无法识别的告警配置: {spec}")
+    return hooks
+
+
+# ============================== 监控 ==============================
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class GapMonitor:
+    """
+    常驻的 blob 间隔监控
+
+    Args:
+        downloader: 提供配置、会话、限速与重试
+        detector: 在线阈值
+        hooks: 告警钩子
+        poll_interval: 轮询间隔（秒）
+        clock: 当前 UTC 时间戳函数（测试时可替换）
+    """
+
+    def __init__(self, downloader: BlobDownloader, detector: OverdueThreshold,
+                 hooks: List[AlertHook], poll_interval: float = 10.0,
+                 clock: Callable[[], float] = time.time):
+        self.downloader = downloader
+        self.detector = detector
+        self.hooks = hooks
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.logger = downloader.logger
+
+        self.last_key = None            # 最新一条 blob 的 (time, id)
+        self.last_ts: Optional[float] = None
+        self.since: Optional[float] = None        # 还没有见到 blob 时的水位线（unix 秒）
+        self.last_height = None
+        self.alerting = False
+        self.polled_at: Optional[float] = None    # 最近一次成功轮询的发起时间
+        self.polls = 0
+        self.blobs_seen = 0
+
+    async def _fetch(self, offset: int, limit: int, params: Dict[str, Any]) -> Optional[List[Dict]]:
+        return await asyncio.to_thread(self.downloader._make_api_request, offset, limit, params)
+
+    def _advance(self, blob: Dict):
+        key = BlobDownloader._blob_key(blob)
+        ts = key[0].timestamp()
+        if self.last_ts is not None:
+            self.detector.update(max(0.0, ts - self.last_ts))
+        self.last_key, self.last_ts = key, ts
+        self.last_height = blob.get("height")
+        self.blobs_seen += 1
+
+    @property
+    def ready(self) -> bool:
+        """水位线已确定（预热成功），可以开始轮询"""
+        return self.last_key is not None or self.since is not None
+
+    async def bootstrap(self):
+        """
+        用最近 window+1 条 blob 预热阈值并确定水位线；请求失败时抛 RuntimeError，由 run 在下一轮重试。
+        接口可用但暂无数据时，水位线取当前时刻减一个轮询间隔。
+        """
+        started = self.clock()
+        limit = min(self.downloader.config["batch_size"], self.detector.recent.maxlen + 1)
+        data = await self._fetch(0, limit, {"sort": "desc"})
+        if data is None:
+            raise RuntimeError("预热请求失败，将在下一轮重试")
+        if not data:
+            self.since = started - self.poll_interval
+            self.logger.warning(f"暂无数据，从 {_iso(self.since)} 开始轮询")
+            return
+        for blob in sorted(data, key=BlobDownloader._blob_key):
+            self._advance(blob)
+        self.logger.info(f"预热完成: {len(data)} 条，最新 blob {_iso(self.last_ts)}，"
+                         f"当前阈值 {self.detector.threshold()}")
+
+    async def poll_once(self) -> int:
+        """拉取比 last_key（或 since）更新的 blob，返回新增条数；水位线未确定时抛 RuntimeError"""
+        if not self.ready:
+            raise RuntimeError("水位线未确定，需先完成预热")
+        batch_size = self.downloader.config["batch_size"]
+        started = self.clock()
+        since = self.last_key[0].timestamp() if self.last_key is not None else self.since
+        params: Dict[str, Any] = {"sort": "asc", "from": int(since)}
+        offset = added = 0
+        while True:
+            data = await self._fetch(offset, batch_size, params)
+            if data is None:
+                raise RuntimeError(f"请求失败（offset={offset}）")
+            if not data:
+                break
+            for blob in data:
+                if (BlobDownloader._blob_key(blob) > self.last_key if self.last_key is not None
+                        else BlobDownloader._blob_key(blob)[0].timestamp() >= self.since):
+                    prev_ts = self.last_ts
+                    self._advance(blob)
+                    added += 1
+                    if self.alerting:
+                        self.alerting = False
+                        await self._emit("recovered", self.last_ts - prev_ts)
+            offset += len(data)
+            if len(data) < batch_size:
+                break
+        self.polled_at = started
+        self.polls += 1
+        return added
+
+    async def check_overdue(self):
+        """
+        以最近一次成功轮询的时刻计算空窗：那时 API 已确认没有更新的 blob，
+        轮询间隔本身不会被算作空窗；API 不可用时也不会误报。
+        """
+        if self.last_ts is None or self.polled_at is None or self.alerting:
+            return
+        thr = self.detector.threshold()
+        elapsed = self.polled_at - self.last_ts
+        if thr is not None and elapsed > thr:
+            self.alerting = True
+            await self._emit("overdue", elapsed)
+
+    async def _emit(self, kind: str, elapsed: float):
+        thr = self.detector.threshold()
+        event = {
+            "type": kind,
+            "at": _iso(self.clock()),
+            "api": self.downloader.config["api_base_url"],
+            "last_blob_time": _iso(self.last_ts),
+            "last_height": self.last_height,
+            "elapsed_seconds": round(elapsed, 3),
+            "threshold_seconds": round(thr, 3) if thr is not None else None,
+            "detector": self.detector.describe(),
+        }
+        self.logger.warning(f"告警 {kind}: {event}")
+        await asyncio.gather(*(hook(event) for hook in self.hooks))
+
+    async def run(self, duration: float = 0.0):
+        """
+        主循环：每 poll_interval 秒轮询一次并检查空窗，告警延迟不超过一个轮询间隔。
+        预热失败时每个轮询间隔重试一次预热，成功之前不轮询。
+        duration > 0 时运行指定秒数后退出（测试用）。
+        """
+        deadline = time.monotonic() + duration if duration > 0 else math.inf
+        while time.monotonic() < deadline:
+            tick = time.monotonic()
+            try:
+                if not self.ready:
+                    await self.bootstrap()
+                else:
+                    await self.poll_once()
+                    await self.check_overdue()
+            except Exception as e:
+                self.logger.error(f"{'轮询' if self.ready else '预热'}失败: {e}")
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.monotonic() - tick)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Monitor live Celestia blob gaps and alert on overdue blobs.")
+    ap.add_argument("--config", type=str, default="config.json", help="BlobDownloader 配置文件路径")
+    ap.add_argument("--detector", choices=sorted(DEFAULT_K), default="mad", help="阈值检测器（默认 mad）")
+    ap.add_argument("--window", type=int, default=100, help="滚动窗口的间隔个数（默认 100）")
+    ap.add_argument("--k", type=float, default=None, help="阈值倍数（默认 mad 5 / ewma 3 / std 3）")
+    ap.add_argument("--min_threshold", type=float, default=0.0, help="阈值下限（秒）")
+    ap.add_argument("--poll_interval", type=float, default=10.0, help="轮询间隔（秒，默认 10）")
+    ap.add_argument("--alert", action="append", default=None, metavar="SPEC",
+                    help="告警钩子，可重复：stdout / file:<路径> / webhook:<URL>（默认 stdout）")
+    ap.add_argument("--duration", type=float, default=0.0, help="运行秒数，0 表示一直运行")
+    args = ap.parse_args()
+
+    downloader = BlobDownloader(args.config)
+    detector = OverdueThreshold(args.detector, window=args.window, k=args.k,
+                                min_threshold=args.min_threshold)
+    hooks = build_hooks(args.alert or ["stdout"], downloader)
+    monitor = GapMonitor(downloader, detector, hooks, poll_interval=args.poll_interval)
+
+    try:
+        asyncio.run(monitor.run(duration=args.duration))
+    except KeyboardInterrupt:
+        pass
+    print(f"Monitor stopped after {monitor.polls} polls, {monitor.blobs_seen} blobs seen.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
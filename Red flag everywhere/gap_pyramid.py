@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gap_pyramid.py
+
+多分辨率间隔金字塔与可交互的 HTML 时间线。
+
+- build_pyramid：把每个发布间隔（归到后一条 blob 的时间）按分钟 / 小时 / 天分桶，
+  每桶记 count / min / max / mean 与异常间隔数 outliers。只保存有数据的桶；上一层由下一层的桶合并得到，
+  整个金字塔只扫描一遍原始间隔
+- save_pyramid / load_pyramid：npz（start 为 int64 epoch 秒，count / outliers 为 int32，min / max / mean 为 float32 秒）
+- write_gap_viewer：analyze_blobs 的 pyramid 输出（gaps_interactive.html + gap_pyramid.npz）
+- render_pyramid_html：HTML（无外部依赖），桶数不超过 embed_max 的粗层以 base64 编码的定长数组内嵌；
+  更细的层按时间切块写到旁边的 <页面名>_tiles/ 目录（JSONP 脚本，file:// 下也能加载），缩放到该层时才加载可见的块。
+  浏览器端按当前缩放范围选择最细的、可见桶数不超过画布像素宽度两倍的一层来绘制（块未到时先画更粗的一层），
+  因此一年的逐 blob 数据（约 260 万个间隔）页面本身只内嵌小时层和天层，分钟层的约 50 万个桶按需加载
+
+每个桶画一条从 min 到 max 的竖线和 mean 点：长间隔（停摆）在任何缩放级别下都不会被平均掉。
+"""
+
+import base64
+import glob
+import json
+import os
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+
+# (层名, 桶长秒数)；由细到粗，每层桶长是上一层的整数倍
+LEVELS: Tuple[Tuple[str, int], ...] = (("minute", 60), ("hour", 3600), ("day", 86400))
+PYRAMID_FIELDS = ("start", "count", "outliers", "min", "max", "mean")
+_FIELD_DTYPES = (np.int64, np.int32, np.int32, np.float32, np.float32, np.float32)
+# 内嵌进 HTML 的层最多这么多个桶（最粗的一层总是内嵌）；更细的层切块写成旁路文件
+EMBED_MAX_BUCKETS = 50_000
+# 每块覆盖的时长为桶长的这么多倍（分钟层约 2.8 天一块，每块不超过 4096 个桶）
+TILE_SPAN = 4096
+
+
+def _merge(keys: np.ndarray, count: np.ndarray, outliers: np.ndarray, vmin: np.ndarray, vmax: np.ndarray,
+           vsum: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """keys 已升序：相同键的相邻段合并为一个桶"""
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return (keys[starts],
+            np.add.reduceat(count, starts),
+            np.add.reduceat(outliers, starts),
+            np.minimum.reduceat(vmin, starts),
+            np.maximum.reduceat(vmax, starts),
+            np.add.reduceat(vsum, starts))
+
+
+def build_pyramid(timestamps: np.ndarray,
+                  gaps: np.ndarray,
+                  outliers: Optional[np.ndarray] = None,
+                  levels: Sequence[Tuple[str, int]] = LEVELS) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Args:
+        timestamps: 已排序的 blob 时间（datetime64[ns]，长度为 len(gaps) + 1），与 create_time_plot 相同
+        gaps: 相邻间隔（秒）；gaps[i] 归到 timestamps[i + 1]
+        outliers: 逐间隔的异常标记（analyze_blobs.outlier_mask），缺省时 outliers 列全为 0
+
+    Returns:
+        {层名: {start（桶起点，epoch 秒）, count, outliers, min, max, mean}}，按层由细到粗
+    """
+    gaps = np.asarray(gaps, dtype=np.float64)
+    t = np.asarray(timestamps, dtype="datetime64[ns]")[1:].astype(np.int64) // 1_000_000_000
+    flags = np.zeros(t.size, dtype=np.int64) if outliers is None else np.asarray(outliers, dtype=np.int64)
+    if t.size and np.any(t[1:] < t[:-1]):
+        order = np.argsort(t, kind="stable")
+        t, gaps, flags = t[order], gaps[order], flags[order]
+
+    out: Dict[str, Dict[str, np.ndarray]] = {}
+    # 第一层从原始间隔开始，之后每层在上一层的桶上合并
+    start, count, vmin, vmax, vsum = t, np.ones(t.size, dtype=np.int64), gaps, gaps, gaps
+    for name, size in levels:
+        if not start.size:
+            out[name] = {f: np.array([], dtype=dt) for f, dt in zip(PYRAMID_FIELDS, _FIELD_DTYPES)}
+            continue
+        keys, count, flags, vmin, vmax, vsum = _merge(start // size, count, flags, vmin, vmax, vsum)
+        start = keys * size
+        out[name] = {
+            "start": start,
+            "count": count.astype(np.int32),
+            "outliers": flags.astype(np.int32),
+            "min": vmin.astype(np.float32),
+            "max": vmax.astype(np.float32),
+            "mean": (vsum / count).astype(np.float32),
+        }
+    return out
+
+
+def level_sizes(pyramid: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, int]:
+    """金字塔中各层的桶长（秒）；不在 LEVELS 中的层按相邻桶起点的最小差值推断"""
+    known = dict(LEVELS)
+    sizes = {}
+    for name, lv in pyramid.items():
+        if name in known:
+            sizes[name] = known[name]
+        else:
+            d = np.diff(lv["start"])
+            sizes[name] = int(d.min()) if d.size else 1
+    return sizes
+
+
+def save_pyramid(path: str, pyramid: Dict[str, Dict[str, np.ndarray]]):
+    """保存为 npz：键名 <层名>_<字段>"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(path, **{f"{name}_{f}": lv[f] for name, lv in pyramid.items() for f in PYRAMID_FIELDS})
+
+
+def load_pyramid(path: str) -> Dict[str, Dict[str, np.ndarray]]:
+    with np.load(path) as z:
+        names = []
+        for key in z.files:
+            name = key.rsplit("_", 1)[0]
+            if name not in names:
+                names.append(name)
+        return {name: {f: z[f"{name}_{f}"] for f in PYRAMID_FIELDS} for name in names}
+
+
+def write_gap_viewer(html_path: str,
+                     timestamps: np.ndarray,
+                     gaps: np.ndarray,
+                     analysis: Dict,
+                     outliers: Optional[np.ndarray] = None,
+                     npz_name: str = "gap_pyramid.npz") -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    构建金字塔，写出交互式时间线 html_path（细层的块在同目录的 <页面名>_tiles/ 下），
+    并把金字塔存为同目录下的 npz_name。
+    使用检测器时阈值因位置而异，不画阈值线，只按 outliers 标红。
+    """
+    pyramid = build_pyramid(timestamps, gaps, outliers)
+    save_pyramid(os.path.join(os.path.dirname(os.path.abspath(html_path)), npz_name), pyramid)
+    threshold = None if "detector" in analysis else analysis.get("outlier_threshold")
+    render_pyramid_html(html_path, pyramid, threshold=threshold)
+    return pyramid
+
+
+# ============================== HTML ==============================
+
+def _b64(arr: np.ndarray, dtype: str) -> str:
+    return base64.b64encode(np.ascontiguousarray(arr, dtype=dtype).tobytes()).decode("ascii")
+
+
+def _bucket_arrays(lv: Dict[str, np.ndarray], size: int, t0: int) -> Dict:
+    """一段桶的编码：桶起点存为相对 t0 的桶序号（uint32），数值为小端 float32 / uint32，base64"""
+    return {
+        "n": int(lv["start"].size),
+        "idx": _b64((lv["start"] - t0) // size, "<u4"),
+        "count": _b64(lv["count"], "<u4"),
+        "outliers": _b64(lv["outliers"], "<u4"),
+        "min": _b64(lv["min"], "<f4"),
+        "max": _b64(lv["max"], "<f4"),
+        "mean": _b64(lv["mean"], "<f4"),
+    }
+
+
+def _tile_bounds(lv: Dict[str, np.ndarray], size: int, tile_span: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按时间切块：块 k 覆盖 [t0 + k * tile_span * size, t0 + (k + 1) * tile_span * size)。返回 (块号, 各块起始行号)"""
+    k = (lv["start"] - lv["start"][0]) // (size * tile_span)
+    rows = np.flatnonzero(np.concatenate(([True], k[1:] != k[:-1])))
+    return k[rows], rows
+
+
+def _embedded(pyramid: Dict[str, Dict[str, np.ndarray]], embed_max: Optional[int]) -> set:
+    """内嵌的层：桶数不超过 embed_max 的层，以及最粗的非空层"""
+    sizes = level_sizes(pyramid)
+    names = sorted((name for name, lv in pyramid.items() if lv["start"].size), key=sizes.get)
+    keep = {name for name in names if embed_max is None or pyramid[name]["start"].size <= embed_max}
+    return keep | set(names[-1:])
+
+
+def pyramid_payload(pyramid: Dict[str, Dict[str, np.ndarray]],
+                    title: str = "",
+                    threshold: Optional[float] = None,
+                    embed_max: Optional[int] = None,
+                    tile_span: int = TILE_SPAN,
+                    tile_dir: str = "") -> Dict:
+    """
+    浏览器端使用的数据。内嵌层带有全部桶的编码（见 _bucket_arrays）；
+    其余层（embed_max 给出时桶数超过它的层）只带 tiles：[[块号, 桶数], ...]，块的数据由 pyramid_tiles 生成
+    """
+    sizes = level_sizes(pyramid)
+    embedded = _embedded(pyramid, embed_max)
+    levels = []
+    for name, lv in pyramid.items():
+        if not lv["start"].size:
+            continue
+        size = sizes[name]
+        t0 = int(lv["start"][0])
+        level = {"name": name, "size": size, "t0": t0, "t1": int(lv["start"][-1])}
+        if name in embedded:
+            level.update(_bucket_arrays(lv, size, t0))
+        else:
+            ks, rows = _tile_bounds(lv, size, tile_span)
+            counts = np.diff(np.append(rows, lv["start"].size))
+            level.update(n=int(lv["start"].size), tile_span=tile_span,
+                         tiles=[[int(k), int(c)] for k, c in zip(ks, counts)])
+        levels.append(level)
+    levels.sort(key=lambda lv: lv["size"])
+    return {
+        "title": title,
+        "threshold": None if threshold is None else float(threshold),
+        "tile_dir": tile_dir,
+        "levels": levels,
+    }
+
+
+def pyramid_tiles(pyramid: Dict[str, Dict[str, np.ndarray]],
+                  embed_max: Optional[int] = None,
+                  tile_span: int = TILE_SPAN) -> Iterator[Tuple[str, int, Dict]]:
+    """未内嵌的层按块产出 (层名, 块号, 该块桶的编码)；桶序号与 pyramid_payload 一样相对该层第一个桶"""
+    sizes = level_sizes(pyramid)
+    embedded = _embedded(pyramid, embed_max)
+    for name, lv in pyramid.items():
+        if not lv["start"].size or name in embedded:
+            continue
+        size, t0 = sizes[name], int(lv["start"][0])
+        ks, rows = _tile_bounds(lv, size, tile_span)
+        for k, lo, hi in zip(ks, rows, np.append(rows[1:], lv["start"].size)):
+            yield name, int(k), _bucket_arrays({f: lv[f][lo:hi] for f in PYRAMID_FIELDS}, size, t0)
+
+
+def render_pyramid_html(path: str,
+                        pyramid: Dict[str, Dict[str, np.ndarray]],
+                        title: str = "Celestia Blob Posting Gaps",
+                        threshold: Optional[float] = None,
+                        embed_max: Optional[int] = EMBED_MAX_BUCKETS,
+                        tile_span: int = TILE_SPAN):
+    """
+    写出交互式时间线（滚轮缩放、拖动平移、双击复位、悬停查看桶的统计）
+
+    Args:
+        threshold: 异常阈值（秒）；给出时画成红色虚线。含异常间隔（outliers > 0）的桶总是标红
+        embed_max: 内嵌层的桶数上限；更细的层写到 <页面名>_tiles/<层名>_<块号>.js。None 时全部内嵌（单文件）
+        tile_span: 每块覆盖的时长（桶长的倍数）
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tile_dir = os.path.splitext(os.path.basename(path))[0] + "_tiles"
+    tile_path = os.path.join(os.path.dirname(os.path.abspath(path)), tile_dir)
+    # 清掉上一次写出的块，避免页面引用到旧数据
+    for old in glob.glob(os.path.join(tile_path, "*_*.js")):
+        os.remove(old)
+    for name, k, tile in pyramid_tiles(pyramid, embed_max, tile_span):
+        os.makedirs(tile_path, exist_ok=True)
+        with open(os.path.join(tile_path, f"{name}_{k}.js"), "w", encoding="utf-8") as f:
+            f.write(f"gapTile({json.dumps(name)},{k},{json.dumps(tile, separators=(',', ':'))});\n")
+    if os.path.isdir(tile_path) and not os.listdir(tile_path):
+        os.rmdir(tile_path)
+
+    payload = pyramid_payload(pyramid, title, threshold, embed_max, tile_span, quote(tile_dir))
+    payload = json.dumps(payload, separators=(",", ":"))
+    # </script> 不会出现在 base64 与数字中；标题里的尖括号转义掉
+    payload = payload.replace("<", "\\u003c")
+    html = _HTML_TEMPLATE.replace("__TITLE__", title.replace("&", "&amp;").replace("<", "&lt;"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html.replace("__DATA__", payload))
+
+
+_HTML_TEMPLATE = r"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  body { font: 13px/1.4 -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; margin: 16px; color: #222; }
+  h2 { margin: 0 0 4px; font-size: 18px; }
+  #bar { margin: 6px 0 8px; display: flex; gap: 14px; align-items: center; flex-wrap: wrap; }
+  #info { color: #555; font-family: monospace; }
+  #wrap { position: relative; }
+  canvas { width: 100%; height: 560px; display: block; border: 1px solid #ddd; cursor: grab; }
+  canvas.drag { cursor: grabbing; }
+  #tip { position: absolute; pointer-events: none; display: none; white-space: pre; font: 12px monospace;
+         background: rgba(255, 255, 255, 0.96); border: 1px solid #888; padding: 4px 7px; }
+  .hint { color: #666; margin-top: 6px; }
+</style>
+</head>
+<body>
+<h2 id="title"></h2>
+<div id="bar">
+  <button id="reset">Reset zoom</button>
+  <label><input type="checkbox" id="logy"> log y</label>
+  <span id="info"></span>
+</div>
+<div id="wrap"><canvas id="c"></canvas><div id="tip"></div></div>
+<div class="hint">Wheel: zoom &middot; drag: pan &middot; double-click: reset &middot; hover: bucket stats.
+Each bar spans the min&ndash;max gap of a time bucket, the dot is the mean; red buckets contain outlier gaps.
+The finest level (minute / hour / day) that fits the current view is shown.</div>
+<script>
+"use strict";
+const DATA = __DATA__;
+
+function decode(b64, Type) {
+  const s = atob(b64), u = new Uint8Array(s.length);
+  for (let i = 0; i < s.length; i++) u[i] = s.charCodeAt(i);
+  return new Type(u.buffer);
+}
+
+// 一段桶（整层或一个块）解码为定长数组；桶序号相对该层的 t0
+function unpack(L, T) {
+  const idx = decode(T.idx, Uint32Array), start = new Float64Array(T.n);
+  for (let i = 0; i < T.n; i++) start[i] = L.t0 + idx[i] * L.size;
+  return { name: L.name, size: L.size, n: T.n, start: start,
+           count: decode(T.count, Uint32Array), outliers: decode(T.outliers, Uint32Array), min: decode(T.min, Float32Array),
+           max: decode(T.max, Float32Array), mean: decode(T.mean, Float32Array) };
+}
+
+// 未内嵌的层只有块号与桶数（tileN），块在缩放到该层时用 script 元素加载（file:// 下也可用）
+const levels = DATA.levels.map(L => L.tiles
+  ? { name: L.name, size: L.size, t0: L.t0, t1: L.t1, span: L.size * L.tile_span, tileN: new Map(L.tiles),
+      tiles: new Map(), pending: new Set(), joined: null, joinedKey: null }
+  : Object.assign(unpack(L, L), { t0: L.t0, t1: L.t1 }));
+const byName = new Map(levels.map(L => [L.name, L]));
+let loading = "";
+
+window.gapTile = (name, k, T) => {
+  const L = byName.get(name);
+  if (!L || !L.tileN) return;
+  L.tiles.set(k, unpack(L, T));
+  L.pending.delete(k);
+  draw();
+};
+
+function loadTile(L, k) {
+  if (L.pending.has(k)) return;
+  L.pending.add(k);
+  const el = document.createElement("script");
+  el.src = `${DATA.tile_dir}/${encodeURIComponent(L.name)}_${k}.js`;
+  // 加载失败时保持 pending，不反复重试；这一层在该范围内退回到更粗的层
+  el.onerror = () => { info.textContent = `failed to load ${el.src}`; };
+  document.head.appendChild(el);
+}
+
+// 可见范围内的块全部到齐时拼接成一段（按块号升序，与内嵌层结构相同），否则发起加载并返回 null
+function tileView(L, ks) {
+  const key = ks.join(",");
+  if (L.joinedKey === key) return L.joined;
+  const missing = ks.filter(k => !L.tiles.has(k));
+  if (missing.length) { missing.forEach(k => loadTile(L, k)); return null; }
+  const parts = ks.map(k => L.tiles.get(k)), n = parts.reduce((s, P) => s + P.n, 0);
+  const J = { name: L.name, size: L.size, n: n, start: new Float64Array(n), count: new Uint32Array(n),
+              outliers: new Uint32Array(n), min: new Float32Array(n), max: new Float32Array(n), mean: new Float32Array(n) };
+  let o = 0;
+  for (const P of parts) {
+    for (const f of ["start", "count", "outliers", "min", "max", "mean"]) J[f].set(P[f], o);
+    o += P.n;
+  }
+  L.joined = J; L.joinedKey = key;
+  return J;
+}
+const thr = DATA.threshold;
+const canvas = document.getElementById("c"), ctx = canvas.getContext("2d");
+const tip = document.getElementById("tip"), info = document.getElementById("info");
+const logy = document.getElementById("logy");
+document.getElementById("title").textContent = DATA.title || "Blob posting gaps";
+document.title = DATA.title || document.title;
+
+const M = { left: 64, right: 16, top: 14, bottom: 42 };
+let full = [0, 1], view = [0, 1], cur = null, W = 0, H = 0;
+if (levels.length) {
+  const fine = levels[0];
+  full = [fine.t0, fine.t1 + fine.size];
+  const pad = Math.max((full[1] - full[0]) * 0.01, fine.size);
+  full = [full[0] - pad, full[1] + pad];
+  view = full.slice();
+}
+
+function lowerBound(a, x) {
+  let lo = 0, hi = a.length;
+  while (lo < hi) { const m = (lo + hi) >> 1; if (a[m] < x) lo = m + 1; else hi = m; }
+  return lo;
+}
+
+// 可见桶数不超过画布宽度两倍的最细一层（一个像素最多叠两个桶）；
+// 未内嵌的层先按块的桶数乘以块在可见范围内的比例估计，块到齐后再按实际桶数判断；块未到齐时先用更粗的一层
+function pickLevel() {
+  const width = W - M.left - M.right;
+  loading = "";
+  for (let L of levels) {
+    if (L.tileN) {
+      const v0 = view[0] - L.size, k0 = Math.floor((v0 - L.t0) / L.span), k1 = Math.floor((view[1] - L.t0) / L.span);
+      const ks = [];
+      let n = 0;
+      for (let k = Math.max(k0, 0); k <= k1; k++) {
+        if (!L.tileN.has(k)) continue;
+        const s0 = L.t0 + k * L.span, s1 = s0 + L.span;
+        ks.push(k);
+        n += L.tileN.get(k) * (Math.min(s1, view[1]) - Math.max(s0, v0)) / L.span;
+      }
+      if (n > 2 * width) continue;
+      const J = tileView(L, ks);
+      if (!J) { loading = L.name; continue; }
+      L = J;
+    }
+    const a = lowerBound(L.start, view[0] - L.size), b = lowerBound(L.start, view[1]);
+    if (b - a <= 2 * width) return [L, a, b];
+  }
+  const L = levels[levels.length - 1];
+  return [L, lowerBound(L.start, view[0] - L.size), lowerBound(L.start, view[1])];
+}
+
+const STEPS = [60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400, 172800, 604800,
+               1209600, 2592000, 7776000, 15552000, 31536000];
+function fmtTime(s, step) {
+  const d = new Date(s * 1000).toISOString();
+  if (step >= 86400) return d.slice(0, 10);
+  return d.slice(5, 10) + " " + d.slice(11, 16);
+}
+function fmtFull(s) { return new Date(s * 1000).toISOString().replace("T", " ").slice(0, 19) + " UTC"; }
+function fmtGap(s) {
+  if (s >= 3600) return (s / 3600).toFixed(2) + " h";
+  if (s >= 60) return (s / 60).toFixed(1) + " min";
+  return s.toFixed(1) + " s";
+}
+function niceStep(span, n) {
+  const raw = span / n, p = Math.pow(10, Math.floor(Math.log10(raw))), f = raw / p;
+  return (f < 1.5 ? 1 : f < 3.5 ? 2 : f < 7.5 ? 5 : 10) * p;
+}
+
+function resize() {
+  const dpr = window.devicePixelRatio || 1, r = canvas.getBoundingClientRect();
+  W = r.width; H = r.height;
+  canvas.width = Math.round(W * dpr); canvas.height = Math.round(H * dpr);
+  ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+  draw();
+}
+
+function draw() {
+  ctx.clearRect(0, 0, W, H);
+  if (!levels.length) { ctx.fillText("No gaps", M.left, M.top + 20); return; }
+  const [L, a, b] = pickLevel();
+  cur = [L, a, b];
+  const pw = W - M.left - M.right, ph = H - M.top - M.bottom;
+  const X = t => M.left + (t - view[0]) / (view[1] - view[0]) * pw;
+
+  // y 轴（小时）：可见范围内的最大值，线性或对数
+  let ymax = 0, ymin = Infinity;
+  for (let i = a; i < b; i++) { ymax = Math.max(ymax, L.max[i]); if (L.min[i] > 0) ymin = Math.min(ymin, L.min[i]); }
+  if (thr != null && !logy.checked) ymax = Math.max(ymax, thr * 1.05);
+  ymax = Math.max(ymax / 3600 * 1.08, 1e-6);
+  ymin = isFinite(ymin) ? ymin / 3600 : ymax / 1e3;
+  const log = logy.checked;
+  const lo = log ? Math.log10(Math.min(ymin, ymax / 10)) : 0, hi = log ? Math.log10(ymax) : ymax;
+  const Y = h => {
+    const v = log ? Math.log10(Math.max(h, Math.pow(10, lo))) : h;
+    return M.top + ph - (v - lo) / (hi - lo) * ph;
+  };
+
+  // 网格与坐标轴
+  ctx.font = "11px sans-serif"; ctx.strokeStyle = "#eee"; ctx.fillStyle = "#444"; ctx.lineWidth = 1;
+  const span = view[1] - view[0];
+  const step = STEPS.find(s => span / s <= 9) || STEPS[STEPS.length - 1];
+  ctx.textAlign = "center";
+  for (let t = Math.ceil(view[0] / step) * step; t <= view[1]; t += step) {
+    const x = X(t);
+    ctx.beginPath(); ctx.moveTo(x, M.top); ctx.lineTo(x, M.top + ph); ctx.stroke();
+    ctx.fillText(fmtTime(t, step), x, M.top + ph + 16);
+  }
+  ctx.textAlign = "right";
+  if (log) {
+    for (let e = Math.ceil(lo); e <= hi; e++) {
+      const y = Y(Math.pow(10, e));
+      ctx.beginPath(); ctx.moveTo(M.left, y); ctx.lineTo(M.left + pw, y); ctx.stroke();
+      ctx.fillText(Math.pow(10, e).toPrecision(1) + " h", M.left - 6, y + 4);
+    }
+  } else {
+    const ys = niceStep(hi, 6);
+    for (let v = 0; v <= hi; v += ys) {
+      const y = Y(v);
+      ctx.beginPath(); ctx.moveTo(M.left, y); ctx.lineTo(M.left + pw, y); ctx.stroke();
+      ctx.fillText((+v.toPrecision(6)) + " h", M.left - 6, y + 4);
+    }
+  }
+  ctx.strokeStyle = "#999";
+  ctx.strokeRect(M.left, M.top, pw, ph);
+  ctx.textAlign = "center";
+  ctx.fillText("Date (UTC)", M.left + pw / 2, H - 6);
+
+  // 桶：min-max 竖线 + mean 点
+  ctx.save();
+  ctx.beginPath(); ctx.rect(M.left, M.top, pw, ph); ctx.clip();
+  const bw = Math.max(1, L.size / span * pw * 0.8);
+  for (let i = a; i < b; i++) {
+    const x = X(L.start[i] + L.size / 2), y0 = Y(L.min[i] / 3600), y1 = Y(L.max[i] / 3600);
+    ctx.fillStyle = L.outliers[i] > 0 ? "#d62728" : "#7aa6d6";
+    ctx.fillRect(x - bw / 2, y1, bw, Math.max(1, y0 - y1));
+  }
+  ctx.fillStyle = "#1f3b63";
+  const r = Math.min(3, Math.max(1, bw / 2));
+  for (let i = a; i < b; i++) {
+    const x = X(L.start[i] + L.size / 2), y = Y(L.mean[i] / 3600);
+    ctx.fillRect(x - r / 2, y - r / 2, r, r);
+  }
+  if (thr != null) {
+    ctx.strokeStyle = "#d62728"; ctx.setLineDash([6, 4]);
+    const y = Y(thr / 3600);
+    ctx.beginPath(); ctx.moveTo(M.left, y); ctx.lineTo(M.left + pw, y); ctx.stroke();
+    ctx.setLineDash([]);
+  }
+  ctx.restore();
+
+  let gaps = 0, outl = 0;
+  for (let i = a; i < b; i++) { gaps += L.count[i]; outl += L.outliers[i]; }
+  info.textContent = `level: ${L.name} (${b - a} buckets, ${gaps} gaps, ${outl} outliers)  ` +
+                     `${fmtFull(Math.max(view[0], full[0]))} → ${fmtFull(Math.min(view[1], full[1]))}` +
+                     (loading ? `  loading ${loading}…` : "");
+}
+
+function timeAt(px) {
+  const pw = W - M.left - M.right;
+  return view[0] + (px - M.left) / pw * (view[1] - view[0]);
+}
+
+function clampView(v) {
+  const minSpan = levels.length ? levels[0].size * 10 : 1, fullSpan = full[1] - full[0];
+  let span = Math.min(Math.max(v[1] - v[0], minSpan), fullSpan);
+  let s = Math.min(Math.max(v[0], full[0]), full[1] - span);
+  return [s, s + span];
+}
+
+canvas.addEventListener("wheel", e => {
+  e.preventDefault();
+  const r = canvas.getBoundingClientRect(), t = timeAt(e.clientX - r.left);
+  const k = Math.pow(1.0015, e.deltaY);
+  view = clampView([t - (t - view[0]) * k, t + (view[1] - t) * k]);
+  draw(); hover(e);
+}, { passive: false });
+
+let dragFrom = null;
+canvas.addEventListener("mousedown", e => { dragFrom = [e.clientX, view.slice()]; canvas.classList.add("drag"); });
+window.addEventListener("mouseup", () => { dragFrom = null; canvas.classList.remove("drag"); });
+window.addEventListener("mousemove", e => {
+  if (!dragFrom) return;
+  const pw = W - M.left - M.right, dt = (e.clientX - dragFrom[0]) / pw * (dragFrom[1][1] - dragFrom[1][0]);
+  view = clampView([dragFrom[1][0] - dt, dragFrom[1][1] - dt]);
+  draw();
+});
+canvas.addEventListener("dblclick", () => { view = full.slice(); draw(); });
+document.getElementById("reset").addEventListener("click", () => { view = full.slice(); draw(); });
+logy.addEventListener("change", draw);
+
+function hover(e) {
+  if (!cur || dragFrom) { tip.style.display = "none"; return; }
+  const r = canvas.getBoundingClientRect(), px = e.clientX - r.left, t = timeAt(px);
+  const [L, a, b] = cur;
+  let i = lowerBound(L.start, t - L.size);
+  if (i >= b || L.start[i] > t) {
+    // 不在任何桶内：取最近的桶（像素距离 <= 6）
+    const cands = [i - 1, i].filter(j => j >= a && j < b);
+    if (!cands.length) { tip.style.display = "none"; return; }
+    const pw = W - M.left - M.right, d = j => Math.abs(L.start[j] + L.size / 2 - t) / (view[1] - view[0]) * pw;
+    i = cands.reduce((p, q) => d(p) <= d(q) ? p : q);
+    if (d(i) > 6 + L.size / (view[1] - view[0]) * pw / 2) { tip.style.display = "none"; return; }
+  }
+  tip.textContent = `${L.name} from ${fmtFull(L.start[i])}\ngaps: ${L.count[i]}  outliers: ${L.outliers[i]}\n` +
+                    `min:  ${fmtGap(L.min[i])}\nmean: ${fmtGap(L.mean[i])}\nmax:  ${fmtGap(L.max[i])}`;
+  tip.style.display = "block";
+  tip.style.left = Math.min(px + 14, W - tip.offsetWidth - 4) + "px";
+  tip.style.top = (e.clientY - r.top + 14) + "px";
+}
+canvas.addEventListener("mousemove", hover);
+canvas.addEventListener("mouseleave", () => { tip.style.display = "none"; });
+window.addEventListener("resize", resize);
+resize();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+grouped_gaps.py
+
+分组间隔分析：把记录按分组编码（signer、namespace 或二者组合）拆成多条时间序列，
+一次向量化计算出每组的间隔、统计量和异常，不对分组做 Python 循环。
+
+做法：
+1. np.lexsort 按 (group, time, height) 排序，同组记录连续排列
+2. np.diff 后只保留前后两条属于同一组的差值（分段差分）
+3. 各组的计数/均值/方差用 np.bincount 聚合；中位数、分位数和极值在
+   按 (group, gap) 排序后的数组上按段起点直接索引
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+
+def _segment_quantile(sorted_vals: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """每段（已升序）的分位数，线性插值，与 np.percentile 默认方法一致；空段为 nan"""
+    out = np.full(counts.size, np.nan)
+    has = counts > 0
+    pos = (counts[has] - 1) * q
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    base = starts[has]
+    v_lo = sorted_vals[base + lo]
+    v_hi = sorted_vals[base + hi]
+    out[has] = v_lo + (pos - lo) * (v_hi - v_lo)
+    return out
+
+
+def grouped_gap_stats(time_ns: np.ndarray,
+                      height: np.ndarray,
+                      codes: np.ndarray,
+                      n_groups: int,
+                      std_k: float = 2.0) -> Dict[str, Any]:
+    """
+    按组计算间隔统计
+
+    Args:
+        time_ns: 每条记录的时间（epoch 纳秒）
+        height: 每条记录的高度（同一时间内的次序）
+        codes: 每条记录的分组编码，取值 0..n_groups-1
+        n_groups: 分组个数
+        std_k: 组内异常阈值 = 组均值 + std_k * 组标准差
+
+    Returns:
+        dict，逐组数组（长度 n_groups）：
+          blobs / gaps / mean / median / p95 / std / min / max / threshold / outlier_count /
+          max_prev_row / max_next_row（最大间隔两端记录在原表中的行号，无间隔时为 -1）
+        以及逐间隔数组（按 组、时间 排序）：
+          gap_seconds / gap_group / prev_row / next_row / is_outlier
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    blobs = np.bincount(codes, minlength=n_groups)
+
+    order = np.lexsort((height, time_ns, codes))
+    c = codes[order]
+    t = time_ns[order]
+
+    # 分段差分：只保留同组相邻记录的间隔
+    pair = np.flatnonzero(c[1:] == c[:-1])
+    gaps = (t[pair + 1] - t[pair]).astype(np.float64) / 1e9
+    gap_group = c[pair]
+    prev_row = order[pair]
+    next_row = order[pair + 1]
+
+    n = np.bincount(gap_group, minlength=n_groups)
+    has = n > 0
+    safe_n = np.maximum(n, 1)
+    mean = np.bincount(gap_group, weights=gaps, minlength=n_groups) / safe_n
+    # 两遍法求方差（ddof=0，与 np.std 一致），避免 E[x^2]-E[x]^2 的抵消误差
+    dev = gaps - mean[gap_group]
+    std = np.sqrt(np.bincount(gap_group, weights=dev * dev, minlength=n_groups) / safe_n)
+    threshold = mean + std_k * std
+
+    is_outlier = gaps > threshold[gap_group]
+    outlier_count = np.bincount(gap_group, weights=is_outlier, minlength=n_groups).astype(np.int64)
+
+    # 组内按间隔大小排序；gap_group 本身已非降序，各组的段起点即 n 的前缀和
+    vorder = np.lexsort((gaps, gap_group))
+    sv = gaps[vorder]
+    starts = np.concatenate(([0], np.cumsum(n)[:-1])).astype(np.int64)
+    last = starts + n - 1
+
+    gmin = np.full(n_groups, np.nan)
+    gmax = np.full(n_groups, np.nan)
+    gmin[has] = sv[starts[has]]
+    gmax[has] = sv[last[has]]
+    max_prev_row = np.full(n_groups, -1, dtype=np.int64)
+    max_next_row = np.full(n_groups, -1, dtype=np.int64)
+    max_prev_row[has] = prev_row[vorder[last[has]]]
+    max_next_row[has] = next_row[vorder[last[has]]]
+
+    return {
+        "n_groups": n_groups,
+        "blobs": blobs,
+        "gaps": n,
+        "mean": np.where(has, mean, np.nan),
+        "median": _segment_quantile(sv, starts, n, 0.5),
+        "p95": _segment_quantile(sv, starts, n, 0.95),
+        "std": np.where(has, std, np.nan),
+        "min": gmin,
+        "max": gmax,
+        "threshold": np.where(has, threshold, np.nan),
+        "outlier_count": outlier_count,
+        "max_prev_row": max_prev_row,
+        "max_next_row": max_next_row,
+        "gap_seconds": gaps,
+        "gap_group": gap_group,
+        "prev_row": prev_row,
+        "next_row": next_row,
+        "is_outlier": is_outlier,
+    }
+
+
+def group_outliers(stats: Dict[str, Any], group: int) -> np.ndarray:
+    """某一组的异常间隔在逐间隔数组中的下标（按时间顺序）"""
+    gg = stats["gap_group"]
+    lo = int(np.searchsorted(gg, group, side="left"))
+    hi = int(np.searchsorted(gg, group, side="right"))
+    return lo + np.flatnonzero(stats["is_outlier"][lo:hi])
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metrics.py
+
+运行指标：计数器 / 仪表 / 直方图，输出 Prometheus 文本格式（text exposition format 0.0.4）。
+
+- MetricsRegistry：线程安全，写文件（临时文件 + 改名，可直接交给 node_exporter 的 textfile collector）
+  或在本地端口上提供 /metrics
+- StageMetrics：分阶段记录耗时与峰值 RSS（analyze_blobs.main 使用）
+- profiled：按需开启 cProfile + tracemalloc，结束时写出 <prefix>.prof 与 <prefix>.txt
+
+只依赖标准库；http.server 与 cProfile / tracemalloc 在用到时才导入，不增加调用方的冷启动时间。
+"""
+
+import io
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# 请求延迟的默认分桶（秒）
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if math.isnan(v):
+        return "NaN"
+    if float(v).is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], lock: threading.Lock):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = lock
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    """可任意设置的当前值"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """分桶直方图；输出累计桶计数、_sum 与 _count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], lock: threading.Lock,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames, lock)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # 落在第一个 >= value 的桶；最后一格为 +Inf
+        i = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[i] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def snapshot(self, **labels) -> Tuple[int, float]:
+        """(观测次数, 观测值之和)"""
+        key = self._key(labels)
+        with self._lock:
+            return sum(self._counts.get(key, ())), self._sums.get(key, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, counts in sorted(self._counts.items()):
+            cum = 0
+            for b, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                le = f'le="{_fmt_value(b)}"'
+                yield f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cum}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(self._sums[key])}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cum}"
+
+
+class MetricsRegistry:
+    """
+    一组指标。counter / gauge / histogram 按名称取已有的指标或新建，
+    多个组件（如多 namespace 下载器）可以共用一个注册表。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, self._lock, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同的类型或标签注册")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._metrics):
+                m = self._metrics[name]
+                lines.append(f"# HELP {name} {m.help}")
+                lines.append(f"# TYPE {name} {m.kind}")
+                lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """原子写出（读取方不会看到写了一半的文件）"""
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """在后台线程中提供 GET /metrics；port 为 0 时由系统分配（见 server.server_address）"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+# ============================== 峰值 RSS ==============================
+
+class PeakRSS:
+    """进程的峰值常驻内存（MB）；支持按阶段重置时 resettable 为 True"""
+
+    def __init__(self):
+        self.resettable = self._clear()
+
+    @staticmethod
+    def _clear() -> bool:
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+
+    def reset(self):
+        if self.resettable:
+            self._clear()
+
+    def peak_mb(self) -> float:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 为 KB，macOS 为字节
+        return peak / (2 ** 20 if sys.platform == "darwin" else 1024)
+
+
+class StageMetrics:
+    """
+    分阶段计时：每个阶段的耗时与期间的峰值 RSS 记为 <prefix>_stage_seconds / <prefix>_stage_peak_rss_bytes
+
+    Linux 上每个阶段开始前重置 VmHWM，峰值是该阶段内的；其他平台为进程启动以来的峰值。
+    只统计当前进程，子进程（如并行绘图）的内存不计入。
+    """
+
+    def __init__(self, registry: MetricsRegistry, prefix: str):
+        self.registry = registry
+        self._seconds = registry.gauge(f"{prefix}_stage_seconds", "Wall time of each stage", ("stage",))
+        self._peak = registry.gauge(f"{prefix}_stage_peak_rss_bytes", "Peak resident memory during each stage",
+                                    ("stage",))
+        self._rss = PeakRSS()
+        self.stages: Dict[str, Tuple[float, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        self._rss.reset()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0, self._rss.peak_mb())
+
+    def record(self, name: str, seconds: float, peak_mb: Optional[float] = None):
+        self.stages[name] = (seconds, peak_mb)
+        self._seconds.set(seconds, stage=name)
+        if peak_mb is not None:
+            self._peak.set(peak_mb * 2 ** 20, stage=name)
+
+    def summary(self) -> str:
+        return "  ".join(f"{name} {s:.2f} s" + (f" / {mb:.0f} MB" if mb is not None else "")
+                         for name, (s, mb) in self.stages.items())
+
+
+# ============================== 性能剖析 ==============================
+
+@contextmanager
+def profiled(prefix: Optional[str], top: int = 40):
+    """
+    prefix 非空时在块内开启 cProfile 与 tracemalloc，结束后写出：
+      <prefix>.prof  pstats 二进制（python -m pstats / snakeviz 查看）
+      <prefix>.txt   按累计耗时排序的前 top 个函数，以及按分配位置汇总的前 top 处内存
+
+    cProfile 只记录调用线程；线程池中的工作（如并发下载）体现为主线程上的等待时间。
+    tracemalloc 记录所有线程，但会让分配密集的代码慢数倍。
+    """
+    if not prefix:
+        yield
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    tracemalloc.start()
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        prof.dump_stats(prefix + ".prof")
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        with open(prefix + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"# cProfile (top {top} by cumulative time)\n")
+            f.write(buf.getvalue())
+            f.write(f"\n# tracemalloc: current {current / 2 ** 20:.1f} MB, peak {peak / 2 ** 20:.1f} MB "
+                    f"(top {top} by allocation site)\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+        print(f"Profile written to {prefix}.prof / {prefix}.txt", file=sys.stderr)
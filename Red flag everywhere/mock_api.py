@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mock_api.py
+
+本地模拟的 Celenium blobs 接口：回放 data/ 下的批次文件，供 gap_monitor.py 与
+blob_downloader.py 离线测试。
+
+回放时把原始时间线平移到当前时刻并按 --speed 倍速压缩：启动时只有最早的
+--lead 秒（原始时间）数据可见，之后的 blob 按压缩后的时间陆续“发布”，
+返回的 time / tx.time 字段也改写为回放后的时间，因此客户端看到的是一条
+与真实时钟一致的实时序列。--stall_at / --stall_for 可以注入一次停摆。
+
+支持的查询参数：sort（asc/desc，默认 desc）、limit（上限 --max_limit，默认 100）、offset、
+from / to（unix 秒，from 含、to 不含），其余参数忽略。
+响应使用 HTTP/1.1 长连接；加 --gzip 时对声明了 Accept-Encoding: gzip 的请求压缩响应体。
+
+用法：
+  python mock_api.py --data_dir data --port 8765 --speed 60
+  python mock_api.py --data_dir data --speed 60 --stall_at 120 --stall_for 90
+  # config.json: "api_base_url": "http://127.0.0.1:8765/v1/namespace/mock/0/blobs"
+"""
+
+import argparse
+import bisect
+import copy
+import gzip
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import analyze_blobs
+import blob_store
+
+
+MAX_LIMIT = 100
+
+
+def _fmt(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class ReplayFeed:
+    """
+    按回放时钟逐步可见的 blob 序列（按时间升序）
+
+    Args:
+        blobs: 原始 blob 列表
+        speed: 回放倍速
+        lead: 启动时即可见的原始时间长度（秒）
+        stall_at: 回放开始后第几秒（墙钟）起停止发布，None 表示不注入停摆
+        stall_for: 停摆持续秒数（墙钟）
+        start: 回放起点的墙钟时间
+        max_limit: 单页条数上限
+    """
+
+    def __init__(self, blobs: List[Dict[str, Any]], speed: float = 60.0, lead: float = 600.0,
+                 stall_at: float = None, stall_for: float = 0.0, start: float = None,
+                 max_limit: int = MAX_LIMIT):
+        self.max_limit = max_limit
+        self.blobs = sorted(blobs, key=lambda b: (b["time"], b.get("id") or 0))
+        orig = blob_store.iso_to_ns([b["time"] for b in self.blobs]).astype(np.float64) / 1e9
+        start = time.time() if start is None else start
+        # 原始时间 -> 回放墙钟时间；lead 之内的数据出现在启动之前
+        replay = start + (orig - orig[0] - lead) / speed
+        if stall_at is not None:
+            replay = np.where(replay >= start + stall_at, replay + stall_for, replay)
+        self.times = replay.tolist()
+
+    def visible(self, now: float) -> int:
+        """当前可见的条数（前缀长度）"""
+        return bisect.bisect_right(self.times, now)
+
+    def query(self, params: Dict[str, str], now: float) -> List[Dict[str, Any]]:
+        hi = self.visible(now)
+        lo = 0
+        if "from" in params:
+            lo = bisect.bisect_left(self.times, float(params["from"]), 0, hi)
+        if "to" in params:
+            hi = bisect.bisect_left(self.times, float(params["to"]), lo, hi)
+        limit = min(int(params.get("limit", 10)), self.max_limit)
+        offset = int(params.get("offset", 0))
+
+        if params.get("sort", "desc") == "asc":
+            idx = range(lo + offset, min(hi, lo + offset + limit))
+        else:
+            idx = range(hi - 1 - offset, max(lo - 1, hi - 1 - offset - limit), -1)
+        return [self._render(i) for i in idx]
+
+    def _render(self, i: int) -> Dict[str, Any]:
+        blob = copy.deepcopy(self.blobs[i])
+        blob["time"] = _fmt(self.times[i])
+        if isinstance(blob.get("tx"), dict):
+            blob["tx"]["time"] = blob["time"]
+        return blob
+
+
+def load_blobs(data_dir: str) -> List[Dict[str, Any]]:
+    """读取 data_dir 下所有 JSON 批次文件与 NDJSON 分段的原始记录"""
+    blobs: List[Dict[str, Any]] = []
+    for fp in analyze_blobs.list_batch_files(data_dir):
+        if fp.endswith(".ndjson.gz"):
+            blobs.extend(json.loads(line) for line in blob_store.read_ndjson_lines(fp))
+        elif fp.endswith(".json"):
+            with open(fp, "r", encoding="utf-8") as f:
+                blobs.extend(analyze_blobs.json_fragments_to_list(f.read()))
+    return [b for b in blobs if b.get("time")]
+
+
+def make_handler(feed: ReplayFeed, compress: bool = False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头与响应体分两次写出，关闭 Nagle 避免与客户端的延迟 ACK 叠加出 40ms 停顿
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            try:
+                body = json.dumps(feed.query(params, time.time())).encode("utf-8")
+            except (TypeError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=5)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(feed: ReplayFeed, host: str = "127.0.0.1", port: int = 8765,
+          compress: bool = False) -> ThreadingHTTPServer:
+    """在后台线程中启动服务，返回 server（port=0 时由系统分配端口）"""
+    server = ThreadingHTTPServer((host, port), make_handler(feed, compress))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay data/ batches as a local mock Celenium blobs API.")
+    ap.add_argument("--data_dir", type=str, default="data", help="批次文件目录")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--speed", type=float, default=60.0, help="回放倍速（默认 60）")
+    ap.add_argument("--lead", type=float, default=600.0, help="启动时即可见的原始时间长度（秒，默认 600）")
+    ap.add_argument("--stall_at", type=float, default=None, help="回放开始后第几秒注入停摆")
+    ap.add_argument("--stall_for", type=float, default=0.0, help="停摆持续秒数")
+    ap.add_argument("--max_limit", type=int, default=MAX_LIMIT, help=f"单页条数上限（默认 {MAX_LIMIT}）")
+    ap.add_argument("--gzip", action="store_true", help="按 Accept-Encoding 压缩响应体")
+    args = ap.parse_args()
+
+    blobs = load_blobs(args.data_dir)
+    if not blobs:
+        print(f"❌ {args.data_dir} 中没有可回放的 blob")
+        return 1
+    feed = ReplayFeed(blobs, speed=args.speed, lead=args.lead,
+                      stall_at=args.stall_at, stall_for=args.stall_for, max_limit=args.max_limit)
+    server = serve(feed, args.host, args.port, compress=args.gzip)
+    print(f"Replaying {len(blobs)} blobs at {args.speed:g}x on "
+          f"http://{args.host}:{server.server_address[1]}/v1/namespace/mock/0/blobs "
+          f"(visible now: {feed.visible(time.time())})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
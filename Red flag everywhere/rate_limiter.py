@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应令牌桶限速器
+
+供 BlobDownloader 的所有请求线程共享：
+- 令牌桶控制平均请求速率，允许少量突发
+- 连续成功时线性提高速率（加性增），遇到 429/5xx 时按比例降低（乘性减）
+- 遵守服务端返回的 Retry-After，暂停期间所有线程一起等待
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 头，支持秒数和 HTTP-date 两种格式
+
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """
+    线程安全的 AIMD 令牌桶
+
+    Args:
+        rate: 初始速率（请求/秒）
+        min_rate: 速率下限
+        max_rate: 速率上限
+        burst: 桶容量，默认等于初始速率
+        increase_step: 每次成功后增加的速率
+        decrease_factor: 每次被限流后速率乘以该系数
+        base_backoff: 没有 Retry-After 时的指数退避基数（秒）
+        max_backoff: 单次退避上限（秒）
+    """
+
+    def __init__(self,
+                 rate: float = 10.0,
+                 min_rate: float = 0.5,
+                 max_rate: float = 50.0,
+                 burst: Optional[float] = None,
+                 increase_step: float = 0.5,
+                 decrease_factor: float = 0.5,
+                 base_backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._capacity = max(1.0, burst if burst is not None else self._rate)
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.successes = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "AdaptiveRateLimiter":
+        """按 BlobDownloader 的配置项创建限速器"""
+        return cls(
+            rate=config.get("rate_limit", 10.0),
+            min_rate=config.get("rate_limit_min", 0.5),
+            max_rate=config.get("rate_limit_max", 50.0),
+            base_backoff=config.get("retry_delay", 1.0),
+            max_backoff=config.get("max_backoff", 60.0),
+        )
+
+    @property
+    def rate(self) -> float:
+        """当前速率（请求/秒）"""
+        return self._rate
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def acquire(self):
+        """阻塞直到拿到一个令牌"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """请求成功：加性增加速率"""
+        with self._lock:
+            self.successes += 1
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def on_throttle(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        请求被限流或失败：乘性降低速率，并让所有线程暂停一段时间
+
+        Args:
+            attempt: 当前是第几次重试（从 0 开始）
+            retry_after: 服务端给出的 Retry-After 秒数
+
+        Returns:
+            本次暂停的秒数
+        """
+        if retry_after is not None:
+            delay = min(retry_after, self.max_backoff)
+        else:
+            # 带抖动的指数退避，避免多个线程同时重试
+            delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)
+
+        with self._lock:
+            self.throttled += 1
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + delay)
+            self._tokens = 0.0
+            self._last_refill = now
+        return delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前限速状态，作为指标输出"""
+        with self._lock:
+            return {
+                "request_rate": round(self._rate, 3),
+                "successes": self.successes,
+                "throttled": self.throttled,
+            }
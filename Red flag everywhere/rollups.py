@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rollups.py
+
+吞吐与费用汇总：按小时、按天、按 signer 统计 blob 数、字节数、fee 总和、gas 效率和 blob 大小分位数。
+
+输入是 BlobTable 的 size / fee / gas_used / gas_wanted 列（analyze_blobs 从批次文件中提取），
+做法与 grouped_gaps 相同，不对分组做 Python 循环：
+1. 按 (分组键, size) 排序，同组记录连续排列、组内 size 升序：size 的排序结果在各种分组间共用
+   （by_size），每种分组只需在其上按键再做一次稳定排序；键的取值范围小于 2^16 时（小时 / 天 /
+   signer 都是如此）转成 uint16，NumPy 对它的稳定排序是 O(n) 的基数排序
+2. 组边界处 np.add.reduceat 一次求出各组的和
+3. 分位数在组内已排序的 size 上按下标直接插值
+缺失值（-1）不计入对应的和与分位数；gas 效率只统计 gas_used 与 gas_wanted 都已知的记录。
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from grouped_gaps import _segment_quantile
+
+
+HOUR_NS = 3600 * 1_000_000_000
+DAY_NS = 24 * HOUR_NS
+
+# 逐组数组的列名（rollup 的返回值，key 之外）
+ROLLUP_COLUMNS = ("blobs", "bytes", "fee", "gas_used", "gas_wanted", "gas_efficiency", "size_p50", "size_p99")
+_FLOAT_COLUMNS = ("gas_efficiency", "size_p50", "size_p99")
+
+
+def size_order(size: np.ndarray) -> np.ndarray:
+    """按 size 升序的稳定排序下标，可在多次 rollup 之间共用"""
+    return np.argsort(size, kind="stable")
+
+
+def _group_order(keys: np.ndarray, by_size: np.ndarray) -> np.ndarray:
+    """按 (key, size) 排序的下标，与 np.lexsort((size, keys)) 相同"""
+    k = keys[by_size]
+    k -= k.min()
+    if k.max() < 1 << 16:
+        k = k.astype(np.uint16)
+    return by_size[np.argsort(k, kind="stable")]
+
+
+def rollup(keys: np.ndarray,
+           size: np.ndarray,
+           fee: np.ndarray,
+           gas_used: np.ndarray,
+           gas_wanted: np.ndarray,
+           by_size: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    按整数键分组汇总
+
+    Args:
+        by_size: size_order(size) 的结果；多次汇总同一张表时传入以免重复排序
+
+    Returns:
+        dict，逐组数组（按键升序，只含出现过的键）：
+          key / blobs / bytes / fee（utia）/ gas_used / gas_wanted / gas_efficiency（used / wanted）/
+          size_p50 / size_p99（没有已知值的组为 nan）
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    if not keys.size:
+        return {"key": keys,
+                **{c: np.array([], dtype=np.float64 if c in _FLOAT_COLUMNS else np.int64) for c in ROLLUP_COLUMNS}}
+
+    order = _group_order(keys, size_order(size) if by_size is None else by_size)
+    k = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], k[1:] != k[:-1])))
+    blobs = np.diff(np.append(starts, k.size))
+
+    s = size[order]
+    known_size = s >= 0
+    n_size = np.add.reduceat(known_size.astype(np.int64), starts)
+    gu, gw = gas_used[order], gas_wanted[order]
+    both = (gu >= 0) & (gw >= 0)
+    f = fee[order]
+    gas_used_sum = np.add.reduceat(np.where(both, gu, 0), starts)
+    gas_wanted_sum = np.add.reduceat(np.where(both, gw, 0), starts)
+
+    # 组内 -1 排在最前，跳过后在已知的 size 上取分位数
+    size_starts = starts + blobs - n_size
+    with np.errstate(invalid="ignore", divide="ignore"):
+        efficiency = np.where(gas_wanted_sum > 0, gas_used_sum / gas_wanted_sum, np.nan)
+    return {
+        "key": k[starts],
+        "blobs": blobs,
+        "bytes": np.add.reduceat(np.where(known_size, s, 0), starts),
+        "fee": np.add.reduceat(np.where(f >= 0, f, 0), starts),
+        "gas_used": gas_used_sum,
+        "gas_wanted": gas_wanted_sum,
+        "gas_efficiency": efficiency,
+        "size_p50": _segment_quantile(s, size_starts, n_size, 0.5),
+        "size_p99": _segment_quantile(s, size_starts, n_size, 0.99),
+    }
+
+
+def time_rollup(time_ns: np.ndarray,
+                bucket_ns: int,
+                size: np.ndarray,
+                fee: np.ndarray,
+                gas_used: np.ndarray,
+                gas_wanted: np.ndarray,
+                by_size: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    按固定长度的时间桶（UTC 对齐）汇总，首尾之间没有 blob 的桶也各占一行（计数为 0），
+    便于直接看出吞吐的空档。key 为桶起点（epoch 纳秒）。
+    """
+    r = rollup(np.floor_divide(time_ns, bucket_ns), size, fee, gas_used, gas_wanted, by_size)
+    if not r["key"].size:
+        return r
+    full = np.arange(r["key"][0], r["key"][-1] + 1, dtype=np.int64)
+    pos = r["key"] - full[0]
+    out = {"key": full * bucket_ns}
+    for c in ROLLUP_COLUMNS:
+        col = np.full(full.size, np.nan if r[c].dtype.kind == "f" else 0, dtype=r[c].dtype)
+        col[pos] = r[c]
+        out[c] = col
+    return out
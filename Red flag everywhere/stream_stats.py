@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stream_stats.py
+
+常数内存的在线统计量，用于流式分析：
+- RunningStats：Welford/Chan 合并公式的均值、方差，以及精确的 min/max
+- GapSketch   ：对数分桶的可合并分位数草图（相对误差 ≤ relative_accuracy）
+- TopK        ：保留最大的 K 个间隔及其附带信息的有界小顶堆
+
+三者都支持按批（NumPy 数组）更新和相互合并。
+"""
+
+import heapq
+import math
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+
+class RunningStats:
+    """总体均值/方差（ddof=0，与 np.std 一致）+ 精确极值"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x: np.ndarray):
+        x = np.asarray(x, dtype=float)
+        if not x.size:
+            return
+        other = RunningStats()
+        other.n = int(x.size)
+        other.mean = float(x.mean())
+        other.m2 = float(((x - other.mean) ** 2).sum())
+        other.min = float(x.min())
+        other.max = float(x.max())
+        self.merge(other)
+
+    def merge(self, other: "RunningStats"):
+        if not other.n:
+            return
+        if not self.n:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def var(self) -> float:
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, float]) -> "RunningStats":
+        out = cls()
+        out.n, out.mean, out.m2 = int(d["n"]), float(d["mean"]), float(d["m2"])
+        out.min, out.max = float(d["min"]), float(d["max"])
+        return out
+
+
+class GapSketch:
+    """
+    对数分桶分位数草图（DDSketch 思路）
+
+    值 x 落入桶 k = ceil(log_gamma(x))，gamma = (1 + a) / (1 - a)；
+    以桶的代表值作答时相对误差不超过 a。小于 min_value 的值（含 0）单独计数。
+    桶计数只是一个整数数组，合并即逐桶相加。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero_count = 0
+        self.offset = 0                       # counts[i] 对应桶 k = offset + i
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + int(self.counts.sum())
+
+    def _ensure(self, kmin: int, kmax: int):
+        if not self.counts.size:
+            self.offset = kmin
+            self.counts = np.zeros(kmax - kmin + 1, dtype=np.int64)
+            return
+        lo = min(kmin, self.offset)
+        hi = max(kmax, self.offset + self.counts.size - 1)
+        if lo == self.offset and hi == self.offset + self.counts.size - 1:
+            return
+        grown = np.zeros(hi - lo + 1, dtype=np.int64)
+        grown[self.offset - lo:self.offset - lo + self.counts.size] = self.counts
+        self.offset, self.counts = lo, grown
+
+    def update(self, x: np.ndarray):
+        x = np.asarray(x, dtype=float)
+        small = x < self.min_value
+        self.zero_count += int(small.sum())
+        x = x[~small]
+        if not x.size:
+            return
+        k = np.ceil(np.log(x) / self._log_gamma).astype(np.int64)
+        kmin, kmax = int(k.min()), int(k.max())
+        self._ensure(kmin, kmax)
+        self.counts[kmin - self.offset:kmax - self.offset + 1] += np.bincount(k - kmin)
+
+    def merge(self, other: "GapSketch"):
+        self.zero_count += other.zero_count
+        if not other.counts.size:
+            return
+        self._ensure(other.offset, other.offset + other.counts.size - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + other.counts.size] += other.counts
+
+    def _bucket_value(self, k: int) -> float:
+        return 2.0 * self.gamma ** k / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        n = self.count
+        if not n:
+            return float("nan")
+        rank = q * (n - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cum = np.cumsum(self.counts) + self.zero_count
+        i = int(np.searchsorted(cum, rank, side="right"))
+        return self._bucket_value(self.offset + min(i, self.counts.size - 1))
+
+    def count_above(self, threshold: float) -> int:
+        """估计大于 threshold 的值个数（阈值所在的桶按线性插值计入）"""
+        if not self.counts.size or threshold < self.min_value:
+            return self.count - (self.zero_count if threshold >= 0 else 0)
+        k = int(math.ceil(math.log(threshold) / self._log_gamma))
+        i = k - self.offset
+        if i < 0:
+            return int(self.counts.sum())
+        if i >= self.counts.size:
+            return 0
+        lo, hi = self.gamma ** (k - 1), self.gamma ** k
+        partial = self.counts[i] * (hi - threshold) / (hi - lo)
+        return int(round(self.counts[i + 1:].sum() + partial))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"relative_accuracy": self.relative_accuracy, "min_value": self.min_value,
+                "zero_count": self.zero_count, "offset": self.offset,
+                "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "GapSketch":
+        out = cls(d["relative_accuracy"], d["min_value"])
+        out.zero_count = int(d["zero_count"])
+        out.offset = int(d["offset"])
+        out.counts = np.asarray(d["counts"], dtype=np.int64)
+        return out
+
+
+class TopK:
+    """保留最大的 k 个值；payload 只在值真正进入堆时才构造"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def floor(self) -> float:
+        """堆满时的最小值，未满时为 -inf"""
+        return self._heap[0][0] if len(self._heap) >= self.k else -math.inf
+
+    def push(self, value: float, payload: Any):
+        item = (float(value), self._seq, payload)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def push_many(self, values: np.ndarray, make_payload: Callable[[int], Any]):
+        """批量更新：先用 argpartition 选出候选，避免逐个入堆"""
+        values = np.asarray(values, dtype=float)
+        idx = np.flatnonzero(values > self.floor)
+        if idx.size > self.k:
+            idx = idx[np.argpartition(values[idx], -self.k)[-self.k:]]
+        for i in idx:
+            self.push(values[i], make_payload(int(i)))
+
+    def merge(self, other: "TopK"):
+        for value, _, payload in other._heap:
+            self.push(value, payload)
+
+    def items(self) -> List[Tuple[float, Any]]:
+        """按值从大到小"""
+        return [(v, p) for v, _, p in sorted(self._heap, key=lambda t: (-t[0], t[1]))]
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+间隔检测器：间隔恒定（方差 / MAD 为 0）时任何检测器都不应报异常；
+真正的长间隔仍能被检出。
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detectors import DETECTORS, detect_ewma, run_detectors  # noqa: E402
+
+
+@pytest.mark.parametrize("name", sorted(DETECTORS))
+@pytest.mark.parametrize("value, n", [(6.0, 10), (10.0, 150), (13.0, 150), (12.0, 5000)])
+def test_constant_series_flags_nothing(name, value, n):
+    result = DETECTORS[name](np.full(n, value))
+    assert not result["mask"].any()
+    assert np.all(result["threshold"] >= value)
+
+
+def test_ewma_still_flags_outage_after_constant_run():
+    gaps = np.full(500, 12.0)
+    gaps[300] = 600.0
+    mask = detect_ewma(gaps)["mask"]
+    assert np.flatnonzero(mask).tolist() == [300]
+
+
+def test_run_detectors_merges_masks():
+    gaps = np.full(500, 12.0)
+    gaps[[100, 400]] = 900.0
+    merged = run_detectors(gaps, ["mad", "ewma"], {})
+    assert np.flatnonzero(merged["mask"]).tolist() == [100, 400]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时间隔监控：在本地 mock_api 上以 100 倍速回放样例数据并注入一次停摆，
+监控应先发出 overdue 告警、停摆结束后发出 recovered；预热失败时不轮询，
+预热成功后的每次轮询都带水位线；滚动状态不随运行时间增长。
+"""
+
+import asyncio
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock_api  # noqa: E402
+from blob_downloader import BlobDownloader  # noqa: E402
+from gap_monitor import GapMonitor, OverdueThreshold  # noqa: E402
+
+
+DATA_DIR = os.path.join(ROOT, "data")
+# 样例间隔约 12–36 s，100 倍速下约 0.1–0.4 s 一条；阈值约 0.5 s
+SPEED = 100.0
+POLL_INTERVAL = 0.1
+STALL_AT, STALL_FOR = 1.5, 2.0
+
+
+def make_downloader(tmp_path, url: str) -> BlobDownloader:
+    return BlobDownloader(config={
+        "api_base_url": url,
+        "batch_size": 50,
+        "max_retries": 0,
+        "retry_delay": 0.01,
+        "request_timeout": 5,
+        "rate_limit": 1000.0,
+        "rate_limit_max": 1000.0,
+        "output_dir": str(tmp_path / "data"),
+        "progress_file": str(tmp_path / "progress.json"),
+        "log_file": str(tmp_path / "monitor.log"),
+    })
+
+
+@pytest.fixture
+def stalled_api():
+    # lead 600 s：启动时约 25 条可见，够预热 window=20 的阈值
+    feed = mock_api.ReplayFeed(mock_api.load_blobs(DATA_DIR), speed=SPEED, lead=600.0,
+                               stall_at=STALL_AT, stall_for=STALL_FOR)
+    server = mock_api.serve(feed, port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/namespace/mock/0/blobs"
+    server.shutdown()
+
+
+def make_monitor(tmp_path, url: str):
+    events = []
+
+    async def collect(event):
+        events.append(event)
+
+    detector = OverdueThreshold("mad", window=20, min_scale=0.05)
+    monitor = GapMonitor(make_downloader(tmp_path, url), detector, [collect], poll_interval=POLL_INTERVAL)
+    return monitor, events
+
+
+def test_overdue_alert_fires_and_recovers(tmp_path, stalled_api):
+    monitor, events = make_monitor(tmp_path, stalled_api)
+    asyncio.run(monitor.run(duration=STALL_AT + STALL_FOR + 1.5))
+
+    assert [e["type"] for e in events] == ["overdue", "recovered"]
+    overdue, recovered = events
+    assert overdue["threshold_seconds"] < STALL_FOR
+    assert overdue["threshold_seconds"] < overdue["elapsed_seconds"] < recovered["elapsed_seconds"]
+    assert recovered["elapsed_seconds"] >= STALL_FOR
+    assert monitor.polls > 0 and not monitor.alerting
+
+
+def test_failed_bootstrap_retries_before_polling(tmp_path, stalled_api):
+    monitor, events = make_monitor(tmp_path, stalled_api)
+    request = monitor.downloader._make_api_request
+    calls = []
+
+    def flaky(offset, limit, params=None):
+        calls.append(dict(params or {}))
+        # 前两次预热请求失败
+        return None if len(calls) <= 2 else request(offset, limit, params)
+
+    monitor.downloader._make_api_request = flaky
+    asyncio.run(monitor.run(duration=1.0))
+
+    assert [c["sort"] for c in calls[:3]] == ["desc", "desc", "desc"]
+    assert monitor.ready and monitor.polls > 0
+    polls = calls[3:]
+    assert polls and all(c["sort"] == "asc" and "from" in c for c in polls)
+    assert events == []
+
+
+def test_poll_requires_watermark(tmp_path):
+    monitor, _ = make_monitor(tmp_path, "http://127.0.0.1:9/unused")
+    with pytest.raises(RuntimeError):
+        asyncio.run(monitor.poll_once())
+
+
+@pytest.mark.parametrize("method", ["mad", "ewma", "std"])
+def test_rolling_state_is_constant_memory(method):
+    detector = OverdueThreshold(method, window=100)
+    for i in range(1000):
+        detector.update(10.0 + i % 7)
+    detector.threshold()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(20000):
+        detector.update(10.0 + i % 7)
+        if i % 100 == 0:
+            detector.threshold()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    growth = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    assert len(detector.recent) == 100
+    assert growth < 16 * 1024
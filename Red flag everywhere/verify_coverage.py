@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+verify_coverage.py
+
+下载结果的去重与覆盖校验。
+
+按 offset 分页的实时降序接口会让批次文件出现重复 blob 和静默缺口（新 blob 发布后
+offset 整体后移；请求失败时 download_all_blobs 还会直接跳过 batch_size 条）。
+缺口在分析中表现为假的长间隔，重复则产生 0 秒间隔。
+
+校验流程：
+1. 读取 data_dir 全部批次（列式，可用 --workers / --cache_dir），按 id 排序去重
+2. 在去重后的时间序列上找出可疑间隔：检测器（默认 mad）判为异常，或不短于 --min_gap 秒
+3. 只重新请求这些间隔对应的时间窗口（sort=asc + from/to，窗口固定，offset 不会漂移）：
+   - 返回了本地没有的 blob：确认是下载缺口，补齐的数据按批次写回 data_dir
+   - 窗口内确实没有其他 blob：真实的发布停顿
+   - 请求失败：未校验，下次再试
+4. 输出 coverage_report.md 与 coverage_holes.csv
+
+namespace 的 blob 并不出现在每个高度上，单看高度不连续无法区分缺口与停顿，
+因此以间隔为候选、以接口的窗口查询为准；报告中给出每个间隔覆盖的高度范围。
+
+用法：
+  python verify_coverage.py --config config.json
+  python verify_coverage.py --config config.json --min_gap 600 --no_refetch
+  python verify_coverage.py --config config.json --detector mad,changepoint --workers 4 --cache_dir output/.cache
+"""
+
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from tqdm import tqdm
+
+import blob_store
+from analysis_cache import AnalysisCache
+from analyze_blobs import BlobTable, gaps_from_sorted, list_batch_files, load_from_data_dir, unique_rows
+from blob_downloader import BlobDownloader
+from detectors import DETECTORS, run_detectors
+
+
+# 间隔状态
+HOLE = "hole"              # 接口返回了本地缺失的 blob
+REAL = "real"              # 窗口内确实没有其他 blob
+UNVERIFIED = "unverified"  # 请求失败
+SKIPPED = "skipped"        # 未重新请求（--no_refetch）
+
+
+def find_candidates(gaps: np.ndarray, detectors: List[str], params: Dict[str, Dict[str, Any]],
+                    min_gap: float = 0.0, max_holes: int = 1000) -> np.ndarray:
+    """
+    可疑间隔的下标（升序）。超过 max_holes 个时只保留最长的 max_holes 个。
+    """
+    mask = run_detectors(gaps, detectors, params)["mask"] if detectors else np.zeros(gaps.size, dtype=bool)
+    if min_gap > 0:
+        mask |= gaps >= min_gap
+    idx = np.flatnonzero(mask)
+    if idx.size > max_holes:
+        idx = np.sort(idx[np.argsort(gaps[idx], kind="stable")[::-1][:max_holes]])
+    return idx
+
+
+def fetch_window(downloader: BlobDownloader, from_ts: int, to_ts: int) -> Optional[List[Dict[str, Any]]]:
+    """按 offset 分页取完 [from_ts, to_ts) 窗口内的全部 blob；任一页失败返回 None"""
+    batch_size = downloader.config["batch_size"]
+    params = {"sort": "asc", "from": from_ts, "to": to_ts}
+    out: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        data = downloader._make_api_request(offset, batch_size, params)
+        if data is None:
+            return None
+        out.extend(data)
+        offset += len(data)
+        if len(data) < batch_size:
+            return out
+
+
+def _known(ids_sorted: np.ndarray, blob_id: int) -> bool:
+    i = int(np.searchsorted(ids_sorted, blob_id))
+    return i < ids_sorted.size and int(ids_sorted[i]) == blob_id
+
+
+def verify_holes(downloader: BlobDownloader, table: BlobTable, gaps: np.ndarray,
+                 candidates: np.ndarray, max_in_flight: int = 1) -> List[Dict[str, Any]]:
+    """
+    重新请求每个可疑间隔的时间窗口并补齐缺失的 blob。
+
+    Args:
+        table: 去重并按时间排序后的表，gaps[i] 位于 table 第 i 与 i+1 行之间
+        candidates: 可疑间隔下标
+
+    Returns:
+        每个间隔一条记录（见 write_holes_csv 的列）
+    """
+    ids_sorted = np.sort(table.id)
+    recovered_ids = set()
+    # 补齐的数据接在已有批次之后，不能覆盖（progress.json 缺失时 batch_count 从 0 开始）
+    existing = [blob_store.segment_index(fp) for fp in list_batch_files(downloader.config["output_dir"])]
+    downloader.progress["batch_count"] = max([downloader.progress["batch_count"]] + [i + 1 for i in existing])
+    holes: List[Dict[str, Any]] = []
+
+    def window(i: int):
+        # from 向下取整、to 向上取整：窗口可能多包含边界上已有的 blob，按 id 剔除
+        return (int(table.time[i] // 1_000_000_000),
+                int(math.ceil(table.time[i + 1] / 1e9)) + 1)
+
+    pbar = tqdm(desc="补齐缺口", unit="条")
+    executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="coverage")
+    try:
+        futures = [executor.submit(fetch_window, downloader, *window(i)) for i in candidates.tolist()]
+        # 按间隔顺序提交，批次文件与进度的写入顺序确定
+        for n, (i, fut) in enumerate(zip(candidates.tolist(), futures), 1):
+            data = fut.result()
+            fresh = []
+            if data is not None:
+                for blob in data:
+                    bid = blob_store._to_int(blob.get("id"))
+                    if bid < 0 or bid in recovered_ids or _known(ids_sorted, bid):
+                        continue
+                    recovered_ids.add(bid)
+                    fresh.append(blob)
+            if fresh:
+                downloader._commit_batch(fresh, None, pbar)
+            pbar.set_description(f"补齐缺口（已校验 {n}/{len(futures)} 个间隔）")
+            holes.append(_hole_row(table, gaps, i,
+                                   UNVERIFIED if data is None else (HOLE if fresh else REAL), len(fresh)))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        pbar.close()
+        downloader._finalize()
+    return holes
+
+
+def _hole_row(table: BlobTable, gaps: np.ndarray, i: int, status: str, recovered: int = 0) -> Dict[str, Any]:
+    ids = table.id_labels(slice(i, i + 2))
+    return {
+        "gap_index": int(i),
+        "gap_seconds": float(gaps[i]),
+        "prev_time": blob_store.ns_to_iso(table.time[i]),
+        "next_time": blob_store.ns_to_iso(table.time[i + 1]),
+        "prev_height": int(table.height[i]),
+        "next_height": int(table.height[i + 1]),
+        "prev_id": ids[0],
+        "next_id": ids[1],
+        "status": status,
+        "recovered": recovered,
+    }
+
+
+HOLE_COLUMNS = ["gap_index", "gap_seconds", "prev_time", "next_time", "prev_height", "next_height",
+                "prev_id", "next_id", "status", "recovered"]
+
+
+def write_holes_csv(path: str, holes: List[Dict[str, Any]]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=HOLE_COLUMNS)
+        w.writeheader()
+        for h in holes:
+            w.writerow({**h, "gap_seconds": f"{h['gap_seconds']:.3f}"})
+
+
+def write_report(path: str, summary: Dict[str, Any], holes: List[Dict[str, Any]], top_n: int = 50):
+    counts = {s: sum(1 for h in holes if h["status"] == s) for s in (HOLE, REAL, UNVERIFIED, SKIPPED)}
+    lines = [
+        "# Blob Coverage Report",
+        "",
+        f"**Data Directory**: `{summary['data_dir']}`",
+        f"**Generated**: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC",
+        "",
+        "## Deduplication",
+        "",
+        f"- **Records Loaded**: {summary['loaded']}",
+        f"- **Duplicates Dropped**: {summary['duplicates']} (same id)",
+        f"- **Unique Blobs**: {summary['unique']}",
+        f"- **Time Range (UTC)**: {summary['first_time']} → {summary['last_time']}",
+        f"- **Height Range**: {summary['min_height']} → {summary['max_height']}",
+        "",
+        "## Coverage",
+        "",
+        f"- **Candidate Gaps**: {len(holes)} (detector: {summary['detector']}"
+        + (f", or ≥ {summary['min_gap']:g} s" if summary["min_gap"] > 0 else "") + ")",
+        f"- **Confirmed Holes**: {counts[HOLE]} ({summary['recovered']} blobs recovered)",
+        f"- **Real Gaps**: {counts[REAL]}",
+        f"- **Unverified**: {counts[UNVERIFIED]}",
+        f"- **Not Re-fetched**: {counts[SKIPPED]}",
+        "",
+        "Confirmed holes were download artifacts: re-analyze after this run to drop the fake gaps.",
+        "Real gaps had no other blob in their window and are genuine publishing pauses.",
+        "",
+    ]
+    shown = sorted(holes, key=lambda h: (h["status"] != HOLE, -h["gap_seconds"]))[:top_n]
+    if shown:
+        lines += [
+            f"## Candidate Gaps (top {len(shown)})",
+            "",
+            "| Status | Gap (h) | From (UTC) | To (UTC) | Heights | Recovered |",
+            "|---|---:|---|---|---|---:|",
+        ]
+        for h in shown:
+            lines.append(f"| {h['status']} | {h['gap_seconds'] / 3600:.3f} | {h['prev_time'][:19].replace('T', ' ')} "
+                         f"| {h['next_time'][:19].replace('T', ' ')} | {h['prev_height']} → {h['next_height']} "
+                         f"| {h['recovered']} |")
+        lines.append("")
+    lines.append("Full list: `coverage_holes.csv`.")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Deduplicate downloaded blobs and verify / repair coverage holes.")
+    ap.add_argument("--config", type=str, default="config.json", help="BlobDownloader 配置文件路径")
+    ap.add_argument("--data_dir", type=str, default=None, help="批次目录（默认取配置中的 output_dir）")
+    ap.add_argument("--out_dir", type=str, default="output", help="报告输出目录")
+    ap.add_argument("--detector", type=str, default="mad",
+                    help=f"选取可疑间隔的检测器，逗号分隔：{','.join(DETECTORS)}；传空串只用 --min_gap")
+    ap.add_argument("--window", type=int, default=100, help="mad / ewma 的窗口（默认 100）")
+    ap.add_argument("--k", type=float, default=None, help="检测器阈值倍数（默认取各检测器默认值）")
+    ap.add_argument("--min_gap", type=float, default=0.0, help="不短于该秒数的间隔一律校验（默认 0，不启用）")
+    ap.add_argument("--max_holes", type=int, default=1000, help="最多重新请求的间隔数（取最长的，默认 1000）")
+    ap.add_argument("--no_refetch", action="store_true", help="只去重与列出可疑间隔，不请求接口")
+    ap.add_argument("--workers", type=int, default=1, help="并行解析批次文件的进程数")
+    ap.add_argument("--cache_dir", type=str, default=None, help="增量分析缓存目录（同 analyze_blobs.py）")
+    args = ap.parse_args()
+
+    detectors = [d.strip() for d in args.detector.split(",") if d.strip()]
+    unknown = [d for d in detectors if d not in DETECTORS]
+    if unknown:
+        ap.error(f"未知检测器: {', '.join(unknown)}")
+
+    downloader = None if args.no_refetch else BlobDownloader(args.config)
+    data_dir = args.data_dir or (downloader.config["output_dir"] if downloader else "data")
+    cache = AnalysisCache(args.cache_dir) if args.cache_dir else None
+
+    t0 = time.perf_counter()
+    table = load_from_data_dir(data_dir, workers=args.workers, cache=cache)
+    if len(table) < 2:
+        print(f"❌ {data_dir} 中的记录不足（<2）")
+        return 1
+    keep = unique_rows(table)
+    unique = table.take(keep).sorted_by_time()
+    gaps, _ = gaps_from_sorted(unique)
+    print(f"Loaded {len(table)} blobs, {len(table) - keep.size} duplicates dropped  "
+          f"({time.perf_counter() - t0:.2f} s)")
+
+    k = {} if args.k is None else {"k": args.k}
+    params = {"std": k, "mad": {"window": args.window, **k}, "ewma": {"warmup": args.window, **k},
+              "changepoint": k}
+    candidates = find_candidates(gaps, detectors, params, min_gap=args.min_gap, max_holes=args.max_holes)
+    print(f"{candidates.size} candidate gaps")
+
+    if downloader is None:
+        holes = [_hole_row(unique, gaps, i, SKIPPED) for i in candidates.tolist()]
+    else:
+        holes = verify_holes(downloader, unique, gaps, candidates,
+                             max_in_flight=int(downloader.config.get("max_in_flight", 1)))
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    summary = {
+        "data_dir": data_dir,
+        "loaded": len(table),
+        "duplicates": len(table) - int(keep.size),
+        "unique": int(keep.size),
+        "first_time": blob_store.ns_to_iso(unique.time[0]),
+        "last_time": blob_store.ns_to_iso(unique.time[-1]),
+        "min_height": int(unique.height.min()),
+        "max_height": int(unique.height.max()),
+        "detector": ", ".join(detectors) or "none",
+        "min_gap": args.min_gap,
+        "recovered": sum(h["recovered"] for h in holes),
+    }
+    report_path = os.path.join(args.out_dir, "coverage_report.md")
+    csv_path = os.path.join(args.out_dir, "coverage_holes.csv")
+    write_report(report_path, summary, holes)
+    write_holes_csv(csv_path, holes)
+
+    n_holes = sum(1 for h in holes if h["status"] == HOLE)
+    print(f"✅ {n_holes} holes confirmed, {summary['recovered']} blobs recovered "
+          f"({time.perf_counter() - t0:.2f} s)")
+    print(f"📄 Report: {report_path}")
+    print(f"🧾 Holes CSV: {csv_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())